@@ -0,0 +1,117 @@
+"""
+Azure Functions for the asynchronous analysis job API.
+
+submit_analysis validates the deck, creates its report if needed and queues
+the analysis, returning a job id immediately; analysis_status returns the
+job's progress and, once done, its result (optionally long-polling for up to
+_MAX_WAIT_SECONDS). The model runs in the run_analysis_job queue worker, so
+these endpoints never hold a connection for the model's latency and client
+retries map to the same job instead of duplicating work.
+"""
+import asyncio
+import logging
+import azure.functions as func
+from azure.functions import Blueprint
+
+from shared.analysis_jobs import DONE, FAILED, JOB_FIELDS, JOB_QUEUE, get_job_status, submit_job
+from shared.card_registry import InvalidDeckError
+from shared.http_utils import parse_json_body, create_error_response, create_success_response
+
+# Azure Functions Blueprint
+analysis_jobs_bp = Blueprint()
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Longest long-poll a status request may ask for (stays under proxy timeouts)
+_MAX_WAIT_SECONDS = 25
+
+# Seconds between status checks while long-polling
+_POLL_INTERVAL_SECONDS = 1
+
+
+# ---------------------------------------------------------------------------
+# Azure Function Routes
+# ---------------------------------------------------------------------------
+
+@analysis_jobs_bp.route(route="submit_analysis", methods=["POST"], auth_level=func.AuthLevel.FUNCTION)
+@analysis_jobs_bp.queue_output(
+    arg_name="jobs",
+    queue_name=JOB_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def submit_analysis(req: func.HttpRequest, jobs: func.Out[str]) -> func.HttpResponse:
+    """
+    HTTP-triggered Azure Function that submits an analysis job.
+
+    Request body should contain:
+        - deckToAnalyze: Deck string
+        - category: "offense", "defense", "synergy", "versatility" or "optimize"
+        - for "optimize", the analysis scores and summaries (see optimize_deck)
+
+    Returns:
+        202 with {"jobId", "category", "status"} while the job is pending, or
+        200 with the result if the deck was already analyzed
+    """
+    logging.info("Submit analysis request received")
+
+    body, error_response = parse_json_body(req)
+    if error_response:
+        return error_response
+
+    deck = body.get("deckToAnalyze")
+    category = body.get("category")
+    if not deck or not category:
+        return create_error_response("Missing 'deckToAnalyze' or 'category'", 400)
+
+    if category not in JOB_FIELDS:
+        return create_error_response("Invalid category", 400)
+
+    try:
+        status, message = submit_job(deck, category, body)
+    except InvalidDeckError as e:
+        return create_error_response(str(e), 400, log_error=False)
+    except Exception as e:
+        return create_error_response(f"Error submitting analysis: {e}")
+
+    if message:
+        jobs.set(message)
+
+    return create_success_response(status, status_code=200 if status["status"] == DONE else 202)
+
+
+@analysis_jobs_bp.route(route="analysis_status", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+async def analysis_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    HTTP-triggered Azure Function that returns an analysis job's status.
+
+    Query parameters:
+        - jobId: Id returned by submit_analysis
+        - wait: Optional seconds to wait for the job to finish (long-poll,
+          capped at _MAX_WAIT_SECONDS)
+
+    Returns:
+        JSON with "jobId", "category", "status" ("queued", "running", "done"
+        or "failed") and "content" (when done) or "error" (when failed)
+    """
+    job = req.params.get("jobId")
+    if not job:
+        return create_error_response("Missing 'jobId'", 400)
+
+    try:
+        wait = min(max(int(req.params.get("wait", "0")), 0), _MAX_WAIT_SECONDS)
+    except ValueError:
+        return create_error_response("Invalid 'wait'", 400)
+
+    status = get_job_status(job)
+    if status is None:
+        return create_error_response("Job not found", 404, log_error=False)
+
+    for _ in range(wait // _POLL_INTERVAL_SECONDS):
+        if status["status"] in (DONE, FAILED):
+            break
+        await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+        status = get_job_status(job)
+
+    return create_success_response(status)
@@ -12,15 +12,24 @@ import azure.functions as func
 from azure.functions import Blueprint
 from typing import Optional
 
-from shared.table_utils import get_report_by_deck, update_report_field
+from shared.table_utils import claim_report_field, get_report_by_deck, update_report_field
 from shared.prompts import (
     offense_prompt,
     defense_prompt,
     synergy_prompt,
-    versatility_prompt
+    versatility_prompt,
+    narrative_prompt
 )
+from shared.schemas import offense_schema, defense_schema, synergy_schema, versatility_schema
+from shared.model_routing import maybe_shadow, model_for
 from shared.langchain_utils import build_chain
-from shared.rag_utils import card_to_namespace
+from shared.card_registry import UnknownCardError, format_key, get_registry, pack
+from shared.scoring import apply_scores, score_deck
+from shared.card_synergy import get_synergy
+from shared.archetypes import classify_deck
+from shared.analysis_cache import get_result, put_result, result_key
+from shared.namespace_registry import get_namespace_registry
+from shared.telemetry import span
 
 # Azure Functions Blueprint
 analyze_deck_bp = Blueprint()
@@ -29,27 +38,28 @@ analyze_deck_bp = Blueprint()
 # Configuration Constants
 # ---------------------------------------------------------------------------
 
-# Category configuration mapping category keys to their table fields, prompts, and models
+# Category configuration mapping category keys to their table fields, prompts
+# and output schemas (models are chosen per category by shared/model_routing)
 CATEGORY_CONFIG = {
     "offense": {
         "field": "Offense",
         "prompt": offense_prompt,
-        "model": "gpt-5.1"
+        "schema": offense_schema
     },
     "defense": {
         "field": "Defense",
         "prompt": defense_prompt,
-        "model": "gpt-5.1"
+        "schema": defense_schema
     },
     "synergy": {
         "field": "Synergy",
         "prompt": synergy_prompt,
-        "model": "gpt-5"
+        "schema": synergy_schema
     },
     "versatility": {
         "field": "Versatility",
         "prompt": versatility_prompt,
-        "model": "gpt-5"
+        "schema": versatility_schema
     },
 }
 
@@ -58,11 +68,25 @@ _DEFAULT_TIMEOUT_SECONDS = 120
 _DEFAULT_POLL_INTERVAL_SECONDS = 1
 _RETRIEVER_TOP_K = 5
 
+# Input sections left out of the stored result's key. Pair lifts are
+# recomputed by every deck refresh, so keying on them would orphan every
+# stored synergy result each refresh; a result is reused until the deck,
+# prompt, model, card knowledge or another section changes (the reused
+# result may then cite the lifts of an earlier refresh).
+_UNKEYED_SECTIONS = frozenset({"Meta Pair Synergy"})
+
 
 # ---------------------------------------------------------------------------
 # Helper Functions
 # ---------------------------------------------------------------------------
 
+def _format_user_input(deck: str, sections: dict) -> str:
+    """Append titled JSON sections to the deck string given to the model."""
+    return deck + "".join(
+        f"\n\n{title}:\n{json.dumps(value, ensure_ascii=False)}" for title, value in sections.items()
+    )
+
+
 async def wait_for_analysis(
     resolved_rowkey: str,
     field: str,
@@ -109,19 +133,43 @@ async def wait_for_analysis(
     return None  # timeout expired
 
 
-def perform_analysis(deck: str, category_key: str) -> str:
+def prepare_analysis(deck: str, category_key: str, fast: bool = False) -> dict:
     """
-    Run model inference for a deck category and update the report record.
+    Resolve everything needed to analyze a deck category.
     
-    Resolves the deck's canonical form, marks the field as loading, invokes
-    the LangChain model with the appropriate prompt, and stores the result.
+    The report field is claimed first (marked "loading" with an
+    etag-conditional write, see claim_report_field), so of several
+    concurrent requests for the same deck and category only one goes on.
+    The claimant then reuses a stored result when the same deck was already
+    analyzed with the same prompt, model and card knowledge (see
+    analysis_cache) and copies it to the report right away; otherwise the
+    model must run. A request that loses the claim gets "running" (or the
+    result another request already wrote) and must not run the model.
+    
+    Scores are computed locally from the category's rubric when every card
+    of the deck has known roles (see shared/scoring); the model is then
+    given the scores and only writes the summaries. Otherwise the model
+    applies the full rubric prompt. The deck's archetype (see
+    shared/archetypes) is given when a rule classifies it, and synergy
+    analyses are also given the deck's meta pair synergy (see
+    shared/card_synergy). The pair synergy is not part of the stored
+    result's key (see _UNKEYED_SECTIONS).
+    
+    Fast mode uses the fast model tier. Its results are stored and returned
+    but never written to the report, which keeps the category's own tier,
+    and it never claims the field.
     
     Args:
         deck: Deck string to analyze
         category_key: Category key from CATEGORY_CONFIG (e.g., "offense")
+        fast: Use the fast model tier
     
     Returns:
-        The analysis result as a JSON string
+        Analysis job: "rowkey", "deck_key", "cache_key", "chain_inputs",
+        "model", "persist", "scores" (computed scores, or None),
+        "running" (True if another request holds the field) and "result"
+        (the stored result, or None if the model must run or is running);
+        only "rowkey", "running" and "result" are set when the claim is lost
     
     Raises:
         ValueError: If the report is not found for the deck
@@ -132,46 +180,203 @@ def perform_analysis(deck: str, category_key: str) -> str:
     cfg = CATEGORY_CONFIG[category_key]
     field = cfg["field"]
     prompt = cfg["prompt"]
+    model = model_for(category_key, fast)
 
     # Resolve the actual RowKey in table (canonical match)
-    report, resolved_rowkey = get_report_by_deck(deck)
+    with span("report_lookup", category=category_key):
+        report, resolved_rowkey = get_report_by_deck(deck)
 
     if not report:
         raise ValueError("Report not found for this deck")
 
-    # Mark as loading
-    update_report_field(resolved_rowkey, field, "loading")
-
-    retrievers = []
-    card_namespaces = [
-        card_to_namespace(card.strip())
-        for card in deck.replace("[", "").replace("]", "").split(",")
-    ]
-    for ns in card_namespaces:
-        retrievers.append({
-            "k": _RETRIEVER_TOP_K,
-            "metadata": {
-                "namespace": ns
+    # Claim the field before any lookup so concurrent requests do not all miss
+    if not fast:
+        with span("claim", category=category_key, field=field) as attrs:
+            claimed, current = claim_report_field(resolved_rowkey, field, report)
+            attrs["claimed"] = claimed
+        if not claimed:
+            if current is None:
+                raise ValueError("Report not found for this deck")
+            logging.info(f"{category_key} analysis of deck {resolved_rowkey} is already running or done")
+            running = current == "loading"
+            return {
+                "category": category_key,
+                "rowkey": resolved_rowkey,
+                "running": running,
+                "result": None if running else current,
             }
-        })
-        
-    logging.info(f"Retrievers: {retrievers}")
 
+    with span("retriever_config", category=category_key) as attrs:
+        retrievers = []
+        namespaces = get_namespace_registry()
+        card_ids = namespaces.resolve(deck)
+        card_namespaces = namespaces.card_namespaces(card_ids)
+        for ns in card_namespaces:
+            retrievers.append({
+                "k": _RETRIEVER_TOP_K,
+                "metadata": {
+                    "namespace": ns
+                }
+            })
+        attrs["retrievers"] = len(retrievers)
+
+    logging.debug(f"Retrievers: {retrievers}")
+
+    cards = get_registry().decode(card_ids)
+
+    # Rubric scores computed locally (None → the model scores the deck)
+    with span("local_scoring", category=category_key) as attrs:
+        scores = score_deck(category_key, cards)
+        attrs["scored"] = scores is not None
+
+    sections = {}
+    archetype = classify_deck(cards)
+    if archetype is not None:
+        sections["Archetype"] = archetype
+    if scores is not None:
+        prompt = narrative_prompt
+        sections["Computed Scores"] = scores
+
+    # Pair synergy of the deck from the matrix precomputed by the deck refresh
+    if category_key == "synergy":
+        with span("pair_synergy", category=category_key) as attrs:
+            synergy = get_synergy()
+            pairs = synergy.deck_pairs(cards) if synergy is not None else []
+            attrs["pairs"] = len(pairs)
+        if pairs:
+            sections["Meta Pair Synergy"] = [{"Cards": p["cards"], "Lift": p["lift"]} for p in pairs]
+
+    user_input = _format_user_input(deck, sections)
+    keyed = {title: value for title, value in sections.items() if title not in _UNKEYED_SECTIONS}
+
+    # Reuse a result computed from identical inputs (any user, any month)
+    with span("result_lookup", category=category_key) as attrs:
+        deck_key = format_key(pack(card_ids))
+        cache_key = result_key(
+            deck_key, category_key, prompt, model, card_namespaces,
+            user_input=_format_user_input(deck, keyed) if keyed else "", response_format=cfg["schema"]
+        )
+        stored = get_result(deck_key, cache_key)
+        attrs["hit"] = stored is not None
+
+    # Stored result → copy it to the report (the field is already "loading")
+    if stored is not None and not fast:
+        with span("table_write", category=category_key, field=field):
+            update_report_field(resolved_rowkey, field, stored)
+
+    if stored is not None:
+        logging.info(f"Reusing stored {category_key} analysis for deck {deck_key} ({model})")
+
+    return {
+        "category": category_key,
+        "rowkey": resolved_rowkey,
+        "deck_key": deck_key,
+        "cache_key": cache_key,
+        "model": model,
+        "persist": not fast,
+        "running": False,
+        "scores": scores,
+        "chain_inputs": {
+            "system_instructions": prompt,
+            "user_input": user_input,
+            # Retrieve on the deck alone, not the computed sections
+            "query": deck,
+            "retrievers": retrievers
+        },
+        "result": stored,
+    }
+
+
+def complete_analysis(job: dict, results: str) -> str:
+    """
+    Store a model result in the result store and the report.
+    
+    Locally computed scores replace any the model changed.
+    
+    Args:
+        job: Analysis job from prepare_analysis
+        results: Model output
+    
+    Returns:
+        The stored result
+    """
+    category_key = job["category"]
+    cfg = CATEGORY_CONFIG[category_key]
+    field = cfg["field"]
+
+    if job["scores"] is not None:
+        results = apply_scores(results, job["scores"])
+
+    with span("table_write", category=category_key, field=field):
+        put_result(job["deck_key"], job["cache_key"], category_key, results)
+        if job["persist"]:
+            update_report_field(job["rowkey"], field, results)
+
+    # Shadow runs compare model scores, so only for model-scored analyses
+    if job["persist"] and job["scores"] is None:
+        maybe_shadow(category_key, job["model"], job["chain_inputs"], cfg["schema"], results)
+
+    return results
+
+
+def perform_analysis(deck: str, category_key: str, fast: bool = False) -> Optional[str]:
+    """
+    Run model inference for a deck category and update the report record.
+    
+    Args:
+        deck: Deck string to analyze
+        category_key: Category key from CATEGORY_CONFIG (e.g., "offense")
+        fast: Use the fast model tier (see prepare_analysis)
+    
+    Returns:
+        The analysis result as a JSON string, or None if another request is
+        already running the analysis (its result lands in the report)
+    
+    Raises:
+        ValueError: If the report is not found for the deck
+    """
+    job = prepare_analysis(deck, category_key, fast)
+    if job["result"] is not None or job["running"]:
+        return job["result"]
 
     # Build and run the LangChain model
-    chain = build_chain()
-    results = chain.invoke({
-        "system_instructions": prompt,
-        "user_input": deck,
-        "retrievers": retrievers
-    })
+    with span("chain_invoke", category=category_key, model=job["model"]):
+        chain = build_chain(model=job["model"], response_format=CATEGORY_CONFIG[category_key]["schema"], cache_key=category_key)
+        results = chain.invoke(job["chain_inputs"])
 
     logging.info(f"Model response received for {category_key} analysis")
 
-    # Store result
-    update_report_field(resolved_rowkey, field, results)
+    return complete_analysis(job, results)
 
-    return results
+
+def check_analysis_request(body: dict) -> tuple[Optional[str], int]:
+    """
+    Validate an analysis request body before any table, Pinecone or LLM work.
+    
+    Args:
+        body: Request body with "deckToAnalyze" and "category"
+    
+    Returns:
+        Tuple of (error message, HTTP status), or (None, 200) if valid
+    """
+    deck = body.get("deckToAnalyze")
+    category = body.get("category")
+
+    if not deck or not category:
+        logging.warning("Missing required fields in request")
+        return "Missing 'deckToAnalyze' or 'category'", 400
+
+    if category not in CATEGORY_CONFIG:
+        logging.warning(f"Invalid category requested: {category}")
+        return "Invalid category", 400
+
+    try:
+        get_namespace_registry().resolve(deck)
+    except UnknownCardError as e:
+        logging.warning(f"Invalid deck: {e}")
+        return str(e), 400
+
+    return None, 200
 
 
 # ---------------------------------------------------------------------------
@@ -191,6 +396,8 @@ async def analyze_deck(req: func.HttpRequest) -> func.HttpResponse:
     Request body should contain:
         - deckToAnalyze: Deck string to analyze
         - category: Category key ("offense", "defense", "synergy", "versatility")
+        - fast: Optional; when true and no result exists yet, answer now from
+          the fast model tier instead of running or waiting for the full one
     
     Returns:
         HTTP response with JSON containing category and content
@@ -208,25 +415,16 @@ async def analyze_deck(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="text/plain"
         )
 
-    deck = body.get("deckToAnalyze")
-    category = body.get("category")
-
-    if not deck or not category:
-        logging.warning("Missing required fields in request")
+    error, status_code = check_analysis_request(body)
+    if error:
         return func.HttpResponse(
-            "Missing 'deckToAnalyze' or 'category'",
-            status_code=400,
-            mimetype="text/plain"
-        )
-
-    if category not in CATEGORY_CONFIG:
-        logging.warning(f"Invalid category requested: {category}")
-        return func.HttpResponse(
-            "Invalid category",
-            status_code=400,
+            error,
+            status_code=status_code,
             mimetype="text/plain"
         )
 
+    deck = body["deckToAnalyze"]
+    category = body["category"]
     cfg = CATEGORY_CONFIG[category]
     field = cfg["field"]
 
@@ -241,9 +439,10 @@ async def analyze_deck(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     current_value = report.get(field)
+    fast = bool(body.get("fast"))
 
     # Case 1: Analysis already running → wait for it
-    if current_value == "loading":
+    if current_value == "loading" and not fast:
         logging.info(
             f"Analysis already running for deck '{resolved_rowkey}', "
             f"category '{category}'. Waiting..."
@@ -264,10 +463,20 @@ async def analyze_deck(req: func.HttpRequest) -> func.HttpResponse:
             status_code=200,
         )
 
-    # Case 2: No analysis yet → perform now
-    if current_value == "no":
+    # Case 2: No analysis yet (or fast mode) → perform now
+    if current_value in ("no", "loading"):
         try:
-            content = perform_analysis(deck, category)
+            content = perform_analysis(deck, category, fast)
+            if content is None:
+                # Another request claimed the analysis first → wait for it
+                content = await wait_for_analysis(resolved_rowkey, field)
+            if content is None:
+                logging.error(f"Timeout waiting for analysis: {resolved_rowkey}, {field}")
+                return func.HttpResponse(
+                    "Timeout waiting for analysis",
+                    status_code=504,
+                    mimetype="text/plain"
+                )
             return func.HttpResponse(
                 json.dumps({"category": category, "content": content}),
                 mimetype="application/json",
@@ -282,6 +491,9 @@ async def analyze_deck(req: func.HttpRequest) -> func.HttpResponse:
             )
         except Exception as e:
             logging.error(f"Unexpected error during analysis: {e}")
+            # Reset loading state on error (fast-mode runs never marked the report)
+            if not fast:
+                update_report_field(resolved_rowkey, field, "no")
             return func.HttpResponse(
                 "Internal server error",
                 status_code=500,
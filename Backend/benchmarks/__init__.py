@@ -0,0 +1,13 @@
+"""
+Local benchmarks for the ClashOps backend.
+
+The benchmarks drive blueprint handlers in-process with real
+func.HttpRequest objects against local stand-ins (in-memory tables and
+blobs, a stub LLM with configurable latency and a fake Pinecone index), so
+they run without Azure, OpenAI or Pinecone credentials.
+
+Run from the Backend directory, e.g.:
+
+    python -m benchmarks.bench_endpoints --iterations 50
+    python -m benchmarks.load_meta_deck --users 200
+"""
@@ -0,0 +1,309 @@
+"""
+Cold-start and per-endpoint latency benchmark.
+
+Reports, for every scenario, p50/p95/p99 latency and the storage, LLM,
+embedding and Pinecone round trips per request, plus the cold-start import
+time of each app profile. Results can be saved as JSON and compared against
+a previous run to fail on hot-path regressions before deploy.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_endpoints --iterations 50 --llm-latency 0.05
+    python -m benchmarks.bench_endpoints --output bench.json
+    python -m benchmarks.bench_endpoints --baseline bench.json --tolerance 0.25
+
+Stripe and email endpoints are not covered because they call third-party
+APIs that have no local stand-in.
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+from typing import Any, Callable, Optional
+
+from benchmarks import stubs
+from benchmarks.harness import (
+    call_handler,
+    make_request,
+    measure_import_time,
+    resolve_handler,
+    summarize,
+    timed,
+)
+from shared.table_metrics import begin_invocation, end_invocation
+
+# App profiles whose cold-start import time is measured
+_IMPORT_PROFILES = ("crud", "ai", "stream", "all")
+
+# Seed identities used by account, category and player deck scenarios
+_USER_ID = "benchmark-user"
+_EMAIL = "benchmark@clashops.dev"
+_PASSWORD = "benchmark-password"
+_CATEGORY_ID = "benchmark-category"
+
+# Deck analyzed by the analysis scenarios
+_DECK = stubs.deck_string(stubs.SEED_DECKS[0])
+
+# Report fields reset before each uncached analysis
+_ANALYSIS_FIELDS = ("Offense", "Defense", "Synergy", "Versatility", "Optimize")
+
+
+class Scenario:
+    """One benchmarked handler invocation pattern."""
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        handler: str,
+        body: Callable[[int], Optional[dict[str, Any]]],
+        setup: Optional[Callable[[stubs.StubStack, int], None]] = None,
+    ) -> None:
+        self.name = name
+        self.module = module
+        self.handler = handler
+        self.body = body
+        self.setup = setup
+
+
+def _ensure_report(stack: stubs.StubStack, value: str) -> None:
+    """Create the benchmark report with every analysis field set to value."""
+    from shared.table_utils import report_key
+
+    entity = {
+        "PartitionKey": "Default",
+        "RowKey": report_key(_DECK),
+        "Deck": _DECK,
+    }
+    entity.update({field: value for field in _ANALYSIS_FIELDS})
+    stack.tables["reports"].seed([entity])
+
+
+def _new_analysis(stack: stubs.StubStack) -> None:
+    """Reset the benchmark report and forget stored results (forces a model call)."""
+    _ensure_report(stack, "no")
+    stack.tables["analysiscache"].clear()
+
+
+def _delete_reports(stack: stubs.StubStack, _: int) -> None:
+    stack.tables["reports"].clear()
+
+
+def _seed_user(stack: stubs.StubStack) -> None:
+    """Seed the account, category and player deck used by CRUD scenarios."""
+    stack.tables["accounts"].seed([{
+        "PartitionKey": "Default",
+        "RowKey": _USER_ID,
+        "Email": _EMAIL,
+        "Password": _PASSWORD,
+    }])
+    stack.tables["categories"].seed([{
+        "PartitionKey": "Default",
+        "RowKey": _CATEGORY_ID,
+        "UserID": _USER_ID,
+        "CategoryName": "Ladder",
+        "CategoryIcon": "trophy",
+        "CategoryColor": "#ffcc00",
+    }])
+    stack.tables["playerdecks"].seed([{
+        "PartitionKey": "Default",
+        "RowKey": "benchmark-deck",
+        "DeckID": "benchmark-deck",
+        "Cards": _DECK,
+        "UserID": _USER_ID,
+        "CategoryID": _CATEGORY_ID,
+        "DeckName": "Hog Cycle",
+    }])
+
+
+def _optimize_body(_: int) -> dict[str, Any]:
+    body = {"deckToAnalyze": _DECK}
+    for category in ("offense", "defense", "synergy", "versatility"):
+        body[f"{category}Score"] = 3.0
+        body[f"{category}Summary"] = "✅ Stub summary"
+    return body
+
+
+SCENARIOS = [
+    Scenario("get_decks", "get_decks", "get_decks", lambda i: None),
+    Scenario("get_cards", "get_cards", "get_cards", lambda i: None),
+    Scenario("get_features", "get_features", "get_features", lambda i: None),
+    Scenario("get_account", "get_account", "get_account",
+             lambda i: {"email": _EMAIL, "password": _PASSWORD}),
+    Scenario("add_account", "add_account", "add_account",
+             lambda i: {"email": f"user{i}@clashops.dev", "password": _PASSWORD}),
+    Scenario("get_categories", "get_categories", "get_categories",
+             lambda i: {"userID": _USER_ID}),
+    Scenario("save_category", "save_category", "save_category",
+             lambda i: {"userID": _USER_ID, "categoryName": f"Category {i}",
+                        "categoryIcon": "trophy", "categoryColor": "#ffcc00"}),
+    Scenario("get_player_decks", "get_player_decks", "get_player_decks",
+             lambda i: {"userID": _USER_ID}),
+    Scenario("save_player_deck", "save_player_deck", "save_player_deck",
+             lambda i: {"cards": _DECK, "userID": _USER_ID, "categoryID": _CATEGORY_ID}),
+    Scenario("create_report", "create_report", "create_report",
+             lambda i: {"deck": _DECK}, setup=_delete_reports),
+    Scenario("create_report_existing", "create_report", "create_report",
+             lambda i: {"deck": _DECK}, setup=lambda s, i: _ensure_report(s, "no")),
+    Scenario("analyze_deck", "analyze_deck", "analyze_deck",
+             lambda i: {"deckToAnalyze": _DECK, "category": "offense"},
+             setup=lambda s, i: _new_analysis(s)),
+    Scenario("analyze_deck_reused", "analyze_deck", "analyze_deck",
+             lambda i: {"deckToAnalyze": _DECK, "category": "offense"},
+             setup=lambda s, i: _ensure_report(s, "no")),
+    Scenario("analyze_deck_cached", "analyze_deck", "analyze_deck",
+             lambda i: {"deckToAnalyze": _DECK, "category": "offense"},
+             setup=lambda s, i: _ensure_report(s, stubs.STUB_RESPONSE)),
+    Scenario("optimize_deck", "optimize_deck", "optimize_deck", _optimize_body,
+             setup=lambda s, i: _new_analysis(s)),
+    Scenario("optimize_deck_reused", "optimize_deck", "optimize_deck", _optimize_body,
+             setup=lambda s, i: _ensure_report(s, "no")),
+    Scenario("optimize_deck_cached", "optimize_deck", "optimize_deck", _optimize_body,
+             setup=lambda s, i: _ensure_report(s, stubs.STUB_RESPONSE)),
+]
+
+
+def run_scenario(scenario: Scenario, stack: stubs.StubStack, iterations: int) -> dict[str, Any]:
+    """
+    Run one scenario and summarize latency and round trips per request.
+
+    Setup runs untimed before each iteration, and counters are reset after it
+    so only the handler's own round trips are counted.
+    """
+    module = importlib.import_module(scenario.module)
+    handler = resolve_handler(getattr(module, scenario.handler))
+
+    latencies = []
+    totals: dict[str, int] = {}
+    statuses: dict[int, int] = {}
+
+    for i in range(iterations):
+        if scenario.setup:
+            scenario.setup(stack, i)
+        req = make_request(scenario.name, scenario.body(i))
+        stack.counters.reset()
+
+        begin_invocation(scenario.name)
+        response, elapsed = timed(lambda: call_handler(handler, req))
+        table_stats = end_invocation()
+
+        latencies.append(elapsed)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        counters = stack.counters.snapshot()
+        counters["entities_scanned"] = table_stats.entities_scanned
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+
+    result = summarize(latencies)
+    result["statuses"] = statuses
+    result["per_request"] = {
+        name: value / iterations
+        for name, value in sorted(totals.items())
+        if "." not in name
+    }
+    result["storage_breakdown"] = {
+        name: value / iterations
+        for name, value in sorted(totals.items())
+        if "." in name
+    }
+    return result
+
+
+def compare_to_baseline(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Compare p95 latency and round trips against a previous run.
+
+    Returns:
+        Human-readable descriptions of every regression beyond tolerance
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance) and current["p95_ms"] - previous["p95_ms"] > 1.0:
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms"
+            )
+
+        for counter, value in current["per_request"].items():
+            before = previous.get("per_request", {}).get(counter, 0)
+            if value > before:
+                regressions.append(f"{name}: {counter} per request {before:g} -> {value:g}")
+
+    return regressions
+
+
+def print_report(results: dict[str, Any]) -> None:
+    """Print import times and per-scenario results as a table."""
+    print("Cold-start import time (function_app)")
+    for profile, ms in results["import_ms"].items():
+        print(f"  {profile:<6} {ms:8.1f} ms")
+    print()
+
+    header = f"{'scenario':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  round trips per request"
+    print(header)
+    print("-" * len(header))
+    for name, result in results["scenarios"].items():
+        trips = ", ".join(f"{k}={v:g}" for k, v in result["per_request"].items()) or "-"
+        print(
+            f"{name:<24}{result['p50_ms']:9.2f}{result['p95_ms']:9.2f}{result['p99_ms']:9.2f}  {trips}"
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20, help="requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stub LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per embedding call")
+    parser.add_argument("--pinecone-latency", type=float, default=0.0, help="seconds per Pinecone query")
+    parser.add_argument("--storage-latency", type=float, default=0.0, help="seconds per storage round trip")
+    parser.add_argument("--scenario", action="append", help="only run the named scenario(s)")
+    parser.add_argument("--skip-import", action="store_true", help="skip cold-start import timing")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression ratio")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+
+    results: dict[str, Any] = {"import_ms": {}, "scenarios": {}}
+    if not args.skip_import:
+        for profile in _IMPORT_PROFILES:
+            results["import_ms"][profile] = measure_import_time(profile)
+
+    stack = stubs.install_stubs(
+        llm_latency=args.llm_latency,
+        embedding_latency=args.embedding_latency,
+        pinecone_latency=args.pinecone_latency,
+        storage_latency=args.storage_latency,
+    )
+    _seed_user(stack)
+
+    for scenario in SCENARIOS:
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        results["scenarios"][scenario.name] = run_scenario(scenario, stack, args.iterations)
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
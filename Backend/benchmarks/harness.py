@@ -0,0 +1,129 @@
+"""
+Helpers for driving blueprint handlers in-process and summarizing timings.
+"""
+import asyncio
+import inspect
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import azure.functions as func
+
+# Percentiles reported for every scenario
+PERCENTILES = (50, 95, 99)
+
+
+def make_request(
+    route: str,
+    body: Optional[dict[str, Any]] = None,
+    params: Optional[dict[str, str]] = None,
+    method: str = "POST"
+) -> func.HttpRequest:
+    """
+    Build a func.HttpRequest as the Functions host would deliver it.
+
+    Args:
+        route: Function route (e.g., "get_decks")
+        body: JSON body (omitted when None)
+        params: Query string parameters
+        method: HTTP method (default: "POST")
+
+    Returns:
+        HTTP request object
+    """
+    return func.HttpRequest(
+        method=method,
+        url=f"http://localhost:7071/api/{route}",
+        headers={"Content-Type": "application/json"},
+        params=params or {},
+        body=json.dumps(body).encode("utf-8") if body is not None else b"",
+    )
+
+
+def resolve_handler(decorated: Any) -> Callable:
+    """
+    Get the user function behind a blueprint-decorated handler.
+
+    Blueprint decorators return a FunctionBuilder; the original function is
+    kept on its Function object.
+    """
+    function = getattr(decorated, "_function", None)
+    if function is not None and hasattr(function, "get_user_function"):
+        return function.get_user_function()
+    return decorated
+
+
+def call_handler(handler: Callable, req: func.HttpRequest) -> func.HttpResponse:
+    """Invoke a sync or async handler and return its response."""
+    result = handler(req)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Summarize latencies (seconds) as milliseconds."""
+    summary = {f"p{pct}_ms": percentile(latencies, pct) * 1000 for pct in PERCENTILES}
+    summary["mean_ms"] = (sum(latencies) / len(latencies) * 1000) if latencies else 0.0
+    summary["count"] = len(latencies)
+    return summary
+
+
+def timed(fn: Callable[[], Any]) -> tuple[Any, float]:
+    """Run fn and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def measure_import_time(profile: str, repeats: int = 3) -> float:
+    """
+    Measure the cold-start import time of function_app for an app profile.
+
+    Each sample runs in a fresh interpreter so module caches are cold.
+
+    Args:
+        profile: App profile passed through CLASHOPS_APP_PROFILE
+        repeats: Number of fresh interpreters to sample
+
+    Returns:
+        Median import time in milliseconds
+    """
+    script = (
+        "import time\n"
+        "from benchmarks.stubs import prepare_environment\n"
+        "prepare_environment()\n"
+        "start = time.perf_counter()\n"
+        "import function_app\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, CLASHOPS_APP_PROFILE=profile)
+
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=backend_dir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if output.returncode != 0:
+            raise RuntimeError(f"Importing function_app ({profile}) failed:\n{output.stderr}")
+        samples.append(float(output.stdout.strip().splitlines()[-1]))
+
+    return percentile(samples, 50) * 1000
@@ -0,0 +1,215 @@
+"""
+Load scenario: many users analyzing the same meta deck right after a refresh.
+
+Each virtual user follows the frontend flow: create_report, then the four
+analyze_deck categories concurrently, then optimize_deck. Users run on a
+thread pool that stands in for Function workers, against the local stub
+stack. The scenario runs once with every user on the same deck and once
+with users spread across different decks, and reports:
+
+- LLM invocations and duplicates beyond one per (deck, category)
+- polling reads of the reports table while waiting on "loading" fields
+- storage round trips in total and per user
+- p50/p95/p99 latency per endpoint and per user flow, and status codes
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.load_meta_deck --users 200 --llm-latency 2.0
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from benchmarks import stubs
+from benchmarks.harness import call_handler, make_request, resolve_handler, summarize, timed
+
+# Analysis categories requested by every user (as AnalyzeLoading does)
+_CATEGORIES = ("offense", "defense", "synergy", "versatility")
+
+# LLM calls one deck needs: four analyses plus one optimization
+_LLM_CALLS_PER_DECK = len(_CATEGORIES) + 1
+
+
+class LoadRecorder:
+    """Thread-safe collector of per-endpoint latencies and status codes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[int, int]] = {}
+
+    def record(self, endpoint: str, elapsed: float, status_code: int) -> None:
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            codes = self.statuses.setdefault(endpoint, {})
+            codes[status_code] = codes.get(status_code, 0) + 1
+
+
+def _call(recorder: LoadRecorder, endpoint: str, handler, body: dict[str, Any]):
+    req = make_request(endpoint, body)
+    response, elapsed = timed(lambda: call_handler(handler, req))
+    recorder.record(endpoint, elapsed, response.status_code)
+    return response
+
+
+def _scores_from(response) -> tuple[Any, str]:
+    """Extract (Score, Summary) from an analyze_deck response, tolerating failures."""
+    if response.status_code != 200:
+        return 0, ""
+    content = json.loads(response.get_body()).get("content")
+    try:
+        parsed = json.loads(content) if isinstance(content, str) else content
+    except ValueError:
+        return 0, ""
+    return parsed.get("Score", 0), parsed.get("Summary", "")
+
+
+def user_flow(
+    deck: str,
+    handlers: dict[str, Any],
+    recorder: LoadRecorder,
+    request_pool: ThreadPoolExecutor
+) -> None:
+    """Run one user's create_report → 4× analyze_deck → optimize_deck flow."""
+    def run() -> None:
+        _call(recorder, "create_report", handlers["create_report"], {"deck": deck})
+
+        futures = {
+            category: request_pool.submit(
+                _call, recorder, "analyze_deck", handlers["analyze_deck"],
+                {"deckToAnalyze": deck, "category": category}
+            )
+            for category in _CATEGORIES
+        }
+
+        body: dict[str, Any] = {"deckToAnalyze": deck}
+        for category, future in futures.items():
+            score, summary = _scores_from(future.result())
+            body[f"{category}Score"] = score
+            body[f"{category}Summary"] = summary
+
+        _call(recorder, "optimize_deck", handlers["optimize_deck"], body)
+
+    _, elapsed = timed(run)
+    recorder.record("user_flow", elapsed, 200)
+
+
+def run_load(
+    stack: stubs.StubStack,
+    handlers: dict[str, Any],
+    decks: list[str],
+    users: int,
+    workers: int
+) -> dict[str, Any]:
+    """
+    Fire all user flows concurrently and summarize the run.
+
+    Args:
+        stack: Installed stub stack (reports table is cleared first)
+        handlers: Resolved handlers keyed by endpoint name
+        decks: Decks assigned to users round-robin
+        users: Number of concurrent users
+        workers: Worker threads serving analyze_deck calls
+
+    Returns:
+        Summary dictionary for this run
+    """
+    stack.tables["reports"].clear()
+    stack.counters.reset()
+    recorder = LoadRecorder()
+
+    with ThreadPoolExecutor(max_workers=workers) as request_pool, \
+            ThreadPoolExecutor(max_workers=users) as user_pool:
+        flows = [
+            user_pool.submit(user_flow, decks[i % len(decks)], handlers, recorder, request_pool)
+            for i in range(users)
+        ]
+        for flow in flows:
+            flow.result()
+
+    counters = stack.counters.snapshot()
+    distinct_decks = min(users, len(decks))
+    llm_calls = counters.get("llm_calls", 0)
+
+    return {
+        "users": users,
+        "distinct_decks": distinct_decks,
+        "llm_calls": llm_calls,
+        "duplicate_llm_calls": max(0, llm_calls - distinct_decks * _LLM_CALLS_PER_DECK),
+        "polling_reads": counters.get("storage.reports.get_entity", 0),
+        "storage_calls": counters.get("storage_calls", 0),
+        "storage_calls_per_user": counters.get("storage_calls", 0) / users,
+        "pinecone_queries": counters.get("pinecone_queries", 0),
+        "endpoints": {
+            endpoint: {**summarize(latencies), "statuses": recorder.statuses[endpoint]}
+            for endpoint, latencies in recorder.latencies.items()
+        },
+    }
+
+
+def print_run(name: str, run: dict[str, Any]) -> None:
+    """Print one load run."""
+    print(f"== {name}: {run['users']} users, {run['distinct_decks']} distinct deck(s)")
+    print(
+        f"   LLM calls {run['llm_calls']} (duplicates {run['duplicate_llm_calls']}), "
+        f"polling reads {run['polling_reads']}, storage calls {run['storage_calls']} "
+        f"({run['storage_calls_per_user']:.1f}/user), Pinecone queries {run['pinecone_queries']}"
+    )
+    for endpoint, result in run["endpoints"].items():
+        print(
+            f"   {endpoint:<14} p50 {result['p50_ms']:9.1f} ms  p95 {result['p95_ms']:9.1f} ms  "
+            f"p99 {result['p99_ms']:9.1f} ms  statuses {result['statuses']}"
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50, help="concurrent users")
+    parser.add_argument("--workers", type=int, default=32, help="worker threads for analyze_deck calls")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--pinecone-latency", type=float, default=0.02, help="seconds per Pinecone query")
+    parser.add_argument("--storage-latency", type=float, default=0.005, help="seconds per storage round trip")
+    parser.add_argument("--mode", choices=("same", "different", "both"), default="both")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+
+    stack = stubs.install_stubs(
+        llm_latency=args.llm_latency,
+        pinecone_latency=args.pinecone_latency,
+        storage_latency=args.storage_latency,
+    )
+
+    import analyze_deck
+    import create_report
+    import optimize_deck
+
+    handlers = {
+        "create_report": resolve_handler(create_report.create_report),
+        "analyze_deck": resolve_handler(analyze_deck.analyze_deck),
+        "optimize_deck": resolve_handler(optimize_deck.optimize_deck),
+    }
+
+    decks = [stubs.deck_string(cards) for cards in stubs.SEED_DECKS]
+    runs = {}
+    if args.mode in ("same", "both"):
+        runs["same_deck"] = run_load(stack, handlers, decks[:1], args.users, args.workers)
+        print_run("same deck", runs["same_deck"])
+    if args.mode in ("different", "both"):
+        runs["different_decks"] = run_load(stack, handlers, decks, args.users, args.workers)
+        print_run("different decks", runs["different_decks"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
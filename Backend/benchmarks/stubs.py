@@ -0,0 +1,617 @@
+"""
+Local stand-ins for the services used by the backend.
+
+Provides an in-memory Table Storage fake, an in-memory blob fake, a stub
+chat model with configurable latency, fake embeddings and a fake Pinecone
+vector store. Every stand-in records its round trips in a shared counter so
+benchmarks can report storage, LLM and vector queries per request.
+
+Call prepare_environment() before importing any backend module, then
+install_stubs() before importing the blueprint modules being measured.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import types
+import uuid
+from datetime import datetime, timezone
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableEntity, TableTransactionError
+
+# Azurite's well-known development connection string. Building clients from it
+# does not open any connection, so shared modules import offline.
+AZURITE_CONNECTION_STRING = "UseDevelopmentStorage=true"
+
+# Environment required by shared modules at import time
+_BENCHMARK_ENV = {
+    "STORAGE_CONNECTION_STRING": AZURITE_CONNECTION_STRING,
+    "PINECONE_KEY": "benchmark",
+    "OPENAI_API_KEY": "benchmark",
+    "CLASH_ROYALE_KEY": "benchmark",
+    "STRIPE_SECRET_KEY": "sk_test_benchmark",
+    "STRIPE_PRICE_ID": "price_benchmark",
+}
+
+# Simulated latency (seconds) of each remote dependency
+LATENCY = {
+    "llm": 0.0,
+    "embedding": 0.0,
+    "pinecone": 0.0,
+    "storage": 0.0,
+}
+
+# Documents returned by each fake Pinecone query
+_DOCS_PER_QUERY = 5
+
+# Canned LLM answer (valid JSON so callers that parse content keep working)
+STUB_RESPONSE = json.dumps({"Score": 3.0, "Summary": "✅ Stub analysis"})
+
+# Matches "<Field> eq '<value>'" terms of an OData filter ('' escapes a quote)
+_FILTER_TERM = re.compile(r"(\w+)\s+eq\s+'((?:[^']|'')*)'")
+
+
+class Counters:
+    """Thread-safe named counters shared by all stand-ins."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[str, int] = {}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def snapshot(self) -> dict[str, int]:
+        """Return a copy of all counters."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Reset all counters to zero."""
+        with self._lock:
+            self._values.clear()
+
+
+# Counters shared by every stand-in
+COUNTERS = Counters()
+
+
+def _simulate(dependency: str) -> None:
+    """Sleep for the configured latency of a dependency."""
+    delay = LATENCY.get(dependency, 0.0)
+    if delay > 0:
+        time.sleep(delay)
+
+
+# ---------------------------------------------------------------------------
+# Azure Table Storage
+# ---------------------------------------------------------------------------
+
+class InMemoryTable:
+    """
+    In-memory replacement for azure.data.tables.TableClient.
+
+    Entities are returned as TableEntity objects carrying an etag, and
+    writes honour etag/match_condition like the service does.
+    """
+
+    def __init__(self, table_name: str) -> None:
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self._rows: dict[tuple[str, str], dict] = {}
+        self._etags: dict[tuple[str, str], str] = {}
+
+    def _record(self, operation: str) -> None:
+        COUNTERS.incr("storage_calls")
+        COUNTERS.incr(f"storage.{self.table_name}.{operation}")
+        _simulate("storage")
+
+    @staticmethod
+    def _key(entity: dict) -> tuple[str, str]:
+        return entity["PartitionKey"], entity["RowKey"]
+
+    def _entity(self, key: tuple[str, str]) -> TableEntity:
+        entity = TableEntity(self._rows[key])
+        entity._metadata = {"etag": self._etags.get(key), "timestamp": None}
+        return entity
+
+    def _check_etag(self, key: tuple[str, str], kwargs: dict) -> None:
+        if kwargs.get("match_condition") == MatchConditions.IfNotModified:
+            if self._etags.get(key) != kwargs.get("etag"):
+                raise ResourceModifiedError("The update condition specified in the request was not satisfied.")
+
+    def _write(self, key: tuple[str, str], entity: dict, mode) -> None:
+        if "replace" in str(mode).lower() or key not in self._rows:
+            self._rows[key] = dict(entity)
+        else:
+            self._rows[key].update(entity)
+        self._etags[key] = uuid.uuid4().hex
+
+    def create_entity(self, entity: dict, **kwargs) -> dict:
+        self._record("create_entity")
+        with self._lock:
+            key = self._key(entity)
+            if key in self._rows:
+                raise ResourceExistsError("The specified entity already exists.")
+            self._write(key, entity, "replace")
+            return {"etag": self._etags[key]}
+
+    def upsert_entity(self, entity: dict, mode="merge", **kwargs) -> dict:
+        self._record("upsert_entity")
+        with self._lock:
+            key = self._key(entity)
+            self._write(key, entity, mode)
+            return {"etag": self._etags[key]}
+
+    def update_entity(self, entity: dict, mode="merge", **kwargs) -> dict:
+        self._record("update_entity")
+        with self._lock:
+            key = self._key(entity)
+            if key not in self._rows:
+                raise ResourceNotFoundError("The specified resource does not exist.")
+            self._check_etag(key, kwargs)
+            self._write(key, entity, mode)
+            return {"etag": self._etags[key]}
+
+    def get_entity(self, partition_key: str, row_key: str, **kwargs) -> TableEntity:
+        self._record("get_entity")
+        with self._lock:
+            if (partition_key, row_key) not in self._rows:
+                raise ResourceNotFoundError("The specified resource does not exist.")
+            return self._entity((partition_key, row_key))
+
+    def delete_entity(self, partition_key=None, row_key=None, **kwargs) -> None:
+        self._record("delete_entity")
+        if isinstance(partition_key, dict):
+            partition_key, row_key = self._key(partition_key)
+        with self._lock:
+            key = (partition_key, row_key)
+            if key in self._rows:
+                self._check_etag(key, kwargs)
+            self._rows.pop(key, None)
+            self._etags.pop(key, None)
+
+    def query_entities(self, query_filter: str, **kwargs):
+        self._record("query_entities")
+        terms = [(field, value.replace("''", "'")) for field, value in _FILTER_TERM.findall(query_filter)]
+        with self._lock:
+            rows = [self._entity(key) for key in self._rows]
+        return iter([e for e in rows if all(str(e.get(f)) == v for f, v in terms)])
+
+    def list_entities(self, **kwargs):
+        self._record("list_entities")
+        with self._lock:
+            return iter([self._entity(key) for key in self._rows])
+
+    def submit_transaction(self, operations, **kwargs) -> list:
+        """Apply every operation or none (create, update and delete conditions are checked first)."""
+        self._record("submit_transaction")
+        operations = [(op[0], op[1], op[2] if len(op) > 2 else {}) for op in operations]
+        with self._lock:
+            for index, (action, entity, options) in enumerate(operations):
+                key = self._key(entity)
+                try:
+                    if action == "create" and key in self._rows:
+                        raise ResourceExistsError("The specified entity already exists.")
+                    if action == "update" and key not in self._rows:
+                        raise ResourceNotFoundError("The specified resource does not exist.")
+                    if action in ("update", "delete") and key in self._rows:
+                        self._check_etag(key, options)
+                except (ResourceExistsError, ResourceNotFoundError, ResourceModifiedError) as e:
+                    raise TableTransactionError(message=f"{index}:{e.message}", index=index) from e
+
+            for action, entity, options in operations:
+                key = self._key(entity)
+                if action == "delete":
+                    self._rows.pop(key, None)
+                    self._etags.pop(key, None)
+                else:
+                    self._write(key, entity, "replace" if action == "create" else options.get("mode", "merge"))
+        return []
+
+    def seed(self, entities: list[dict]) -> None:
+        """Insert entities without recording round trips."""
+        with self._lock:
+            for entity in entities:
+                self._write(self._key(entity), entity, "replace")
+
+    def clear(self) -> None:
+        """Remove all entities without recording round trips."""
+        with self._lock:
+            self._rows.clear()
+            self._etags.clear()
+
+
+# ---------------------------------------------------------------------------
+# Azure Blob Storage
+# ---------------------------------------------------------------------------
+
+class _Download:
+    """Minimal StorageStreamDownloader replacement."""
+
+    def __init__(self, data: bytes, etag: str) -> None:
+        self._data = data
+        self.properties = types.SimpleNamespace(etag=etag, size=len(data))
+
+    def readall(self) -> bytes:
+        return self._data
+
+
+class InMemoryBlob:
+    """In-memory replacement for azure.storage.blob.BlobClient."""
+
+    def __init__(self, blob_name: str, data: bytes = b"") -> None:
+        self.blob_name = blob_name
+        self._data = data
+        self._staged: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.last_modified = datetime.now(timezone.utc)
+        self.etag = uuid.uuid4().hex
+
+    def _record(self, operation: str) -> None:
+        COUNTERS.incr("storage_calls")
+        COUNTERS.incr(f"blob.{self.blob_name}.{operation}")
+        _simulate("storage")
+
+    def download_blob(self, **kwargs) -> _Download:
+        self._record("download_blob")
+        if not self._data:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return _Download(self._data, self.etag)
+
+    def upload_blob(self, data, overwrite: bool = False, **kwargs) -> dict:
+        self._record("upload_blob")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif not isinstance(data, bytes):
+            data = data.read()
+        with self._lock:
+            if self._data and not overwrite:
+                raise ResourceExistsError("The specified blob already exists.")
+            if kwargs.get("match_condition") == MatchConditions.IfNotModified and kwargs.get("etag") != self.etag:
+                raise ResourceModifiedError("The condition specified using HTTP conditional header(s) is not met.")
+            self._data = data
+            self.last_modified = datetime.now(timezone.utc)
+            self.etag = uuid.uuid4().hex
+        return {}
+
+    def stage_block(self, block_id: str, data: bytes, **kwargs) -> dict:
+        self._record("stage_block")
+        with self._lock:
+            self._staged[block_id] = bytes(data)
+        return {}
+
+    def commit_block_list(self, block_list: list, **kwargs) -> dict:
+        self._record("commit_block_list")
+        with self._lock:
+            ids = [getattr(block, "id", block) for block in block_list]
+            self._data = b"".join(self._staged[block_id] for block_id in ids)
+            self._staged.clear()
+            self.etag = uuid.uuid4().hex
+        self.last_modified = datetime.now(timezone.utc)
+        return {}
+
+    def get_blob_properties(self, **kwargs) -> types.SimpleNamespace:
+        self._record("get_blob_properties")
+        return types.SimpleNamespace(last_modified=self.last_modified, size=len(self._data), etag=self.etag)
+
+    def exists(self, **kwargs) -> bool:
+        self._record("exists")
+        return bool(self._data)
+
+    def delete_blob(self, **kwargs) -> None:
+        self._record("delete_blob")
+        with self._lock:
+            if not self._data:
+                raise ResourceNotFoundError("The specified blob does not exist.")
+            self._data = b""
+            self._staged.clear()
+
+
+# ---------------------------------------------------------------------------
+# OpenAI and Pinecone
+# ---------------------------------------------------------------------------
+
+class FakeEmbeddings:
+    """Stand-in for OpenAIEmbeddings returning fixed-size zero vectors."""
+
+    dimensions = 8
+
+    def embed_query(self, text: str) -> list[float]:
+        COUNTERS.incr("embeddings")
+        _simulate("embedding")
+        return [0.0] * self.dimensions
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        COUNTERS.incr("embeddings", len(texts))
+        _simulate("embedding")
+        return [[0.0] * self.dimensions for _ in texts]
+
+
+class FakeIndex:
+    """Stand-in for a Pinecone Index."""
+
+    def upsert(self, vectors: list, **kwargs) -> dict:
+        COUNTERS.incr("pinecone_upserts")
+        _simulate("pinecone")
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, **kwargs) -> dict:
+        COUNTERS.incr("pinecone_deletes")
+        _simulate("pinecone")
+        return {}
+
+    def query(self, **kwargs) -> dict:
+        COUNTERS.incr("pinecone_queries")
+        _simulate("pinecone")
+        return {"matches": []}
+
+
+class FakeVectorStore:
+    """Stand-in for PineconeVectorStore returning canned documents per namespace."""
+
+    def __init__(self, index=None, embedding=None, text_key: str = "text", namespace: str = None, **kwargs) -> None:
+        self._embedding = embedding or FakeEmbeddings()
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict | None = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict | None = None, **kwargs) -> list:
+        from langchain_core.documents import Document
+
+        COUNTERS.incr("pinecone_queries")
+        _simulate("pinecone")
+        namespace = ((filter or {}).get("namespace") or {}).get("$eq", "__default__")
+        return [
+            (Document(page_content=f"*{namespace} fact {i}", metadata={"namespace": namespace}), 1.0 - i / 10)
+            for i in range(min(k, _DOCS_PER_QUERY))
+        ]
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
+        from langchain_core.runnables import RunnableLambda
+
+        search_kwargs = dict(search_kwargs or {})
+
+        def _retrieve(query: str) -> list:
+            vector = self._embedding.embed_query(query)
+            return self.similarity_search_by_vector(vector, **search_kwargs)
+
+        return RunnableLambda(_retrieve)
+
+
+def _stub_chat_model_class():
+    """Build the stub chat model class (deferred so langchain imports lazily)."""
+    from langchain_core.language_models.chat_models import SimpleChatModel
+
+    class StubChatModel(SimpleChatModel):
+        """Chat model that sleeps for the configured LLM latency and returns canned JSON."""
+
+        model_name: str = "stub"
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub-chat"
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+            COUNTERS.incr("llm_calls")
+            _simulate("llm")
+            return STUB_RESPONSE
+
+    return StubChatModel
+
+
+# ---------------------------------------------------------------------------
+# Seed Data
+# ---------------------------------------------------------------------------
+
+# Cards used by the seed decks (cards.csv columns mirror the production blob)
+SEED_CARDS = [
+    ("Hog Rider", 4, "Rare", "Troop"), ("Ice Spirit", 1, "Common", "Troop"),
+    ("Skeletons", 1, "Common", "Troop"), ("Cannon", 3, "Common", "Building"),
+    ("Musketeer", 4, "Rare", "Troop"), ("Fireball", 4, "Rare", "Spell"),
+    ("The Log", 2, "Legendary", "Spell"), ("Ice Golem", 2, "Rare", "Troop"),
+    ("Golem", 8, "Epic", "Troop"), ("Night Witch", 4, "Legendary", "Troop"),
+    ("Baby Dragon", 4, "Epic", "Troop"), ("Lightning", 6, "Epic", "Spell"),
+    ("Tornado", 3, "Epic", "Spell"), ("Lumberjack", 4, "Legendary", "Troop"),
+    ("Mega Minion", 3, "Rare", "Troop"), ("Barbarian Barrel", 2, "Epic", "Spell"),
+    ("X-Bow", 6, "Epic", "Building"), ("Tesla", 4, "Common", "Building"),
+    ("Archers", 3, "Common", "Troop"), ("Knight", 3, "Common", "Troop"),
+    ("Electro Spirit", 1, "Common", "Troop"), ("Rocket", 6, "Rare", "Spell"),
+    ("Goblin Barrel", 3, "Epic", "Spell"), ("Princess", 3, "Legendary", "Troop"),
+    ("Goblin Gang", 3, "Common", "Troop"), ("Inferno Tower", 5, "Rare", "Building"),
+    ("Rascals", 5, "Common", "Troop"), ("Miner", 3, "Legendary", "Troop"),
+    ("Poison", 4, "Epic", "Spell"), ("Valkyrie", 4, "Rare", "Troop"),
+    ("Mini P.E.K.K.A", 4, "Rare", "Troop"), ("P.E.K.K.A", 7, "Epic", "Troop"),
+]
+
+# Popular decks used as benchmark inputs
+SEED_DECKS = [
+    ["Hog Rider", "Ice Spirit", "Skeletons", "Cannon", "Musketeer", "Fireball", "The Log", "Ice Golem"],
+    ["Golem", "Night Witch", "Baby Dragon", "Lightning", "Tornado", "Lumberjack", "Mega Minion", "Barbarian Barrel"],
+    ["X-Bow", "Tesla", "Archers", "Knight", "Skeletons", "Electro Spirit", "Rocket", "The Log"],
+    ["Goblin Barrel", "Princess", "Goblin Gang", "Inferno Tower", "Rascals", "Ice Spirit", "Rocket", "The Log"],
+    ["Miner", "Poison", "Valkyrie", "Mini P.E.K.K.A", "Musketeer", "Ice Spirit", "Skeletons", "The Log"],
+    ["P.E.K.K.A", "Miner", "Electro Spirit", "Baby Dragon", "Poison", "Barbarian Barrel", "Knight", "Archers"],
+]
+
+
+def deck_string(cards: list[str]) -> str:
+    """Format a card list the way the frontend sends decks ("[Card1, Card2, ...]")."""
+    return f"[{', '.join(cards)}]"
+
+
+def _seed_cards_csv() -> bytes:
+    lines = ["card_name,elixer_cost,rarity,type"]
+    lines += [f"{name},{cost},{rarity},{kind}" for name, cost, rarity, kind in SEED_CARDS]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _seed_decks_csv() -> bytes:
+    from shared.archetypes import classify_deck
+
+    now = datetime.now(timezone.utc).isoformat()
+    lines = ["deck_id,cards,score,last_entry,first_seen,runs,last_run_count,archetype"]
+    for deck_id, cards in enumerate(SEED_DECKS, start=1):
+        archetype = classify_deck(cards) or ""
+        lines.append(f"{deck_id},{'; '.join(cards)},{100 - deck_id},{now},{now},1,{100 - deck_id},{archetype}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# Cards with evolution knowledge ingested (evolution_<namespace>.txt)
+SEED_EVOLUTIONS = ["Skeletons", "Knight", "Archers", "Valkyrie", "Musketeer", "Tesla"]
+
+# Tower troop knowledge blobs
+SEED_TOWER_TROOPS = ["tower_princess", "cannoneer", "dagger_duchess", "royal_chef"]
+
+
+def _seed_knowledge_blobs() -> list[str]:
+    """Names of the knowledge blobs ingested into the fake Pinecone index."""
+    from shared.rag_utils import card_to_namespace
+
+    names = [f"{card_to_namespace(name)}.txt" for name, *_ in SEED_CARDS]
+    names += [f"evolution_{card_to_namespace(name)}.txt" for name in SEED_EVOLUTIONS]
+    names += [f"{ns}.txt" for ns in SEED_TOWER_TROOPS]
+    return names
+
+
+def _seed_snapshot() -> None:
+    """Publish decks.arrow and card_synergy.npz for the seed decks (API card ids are made up)."""
+    from shared.archetypes import classify_deck
+    from shared.card_synergy import upload_synergy
+    from shared.deck_snapshot import upload_snapshot
+
+    api_ids = {name: 26000000 + i for i, (name, *_) in enumerate(SEED_CARDS)}
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "deck_id": deck_id,
+            "cards": "; ".join(cards),
+            "card_ids": [api_ids[name] for name in cards],
+            "score": 100 - deck_id,
+            "runs": 1,
+            "last_run_count": 100 - deck_id,
+            "first_seen": now,
+            "last_entry": now,
+            "archetype": classify_deck(cards),
+        }
+        for deck_id, cards in enumerate(SEED_DECKS, start=1)
+    ]
+    upload_snapshot(rows)
+    upload_synergy(rows)
+
+
+def _seed_features_csv() -> bytes:
+    return b"feature,description\nanalysis,Deck analysis\noptimization,Deck optimization\n"
+
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+
+def prepare_environment() -> None:
+    """
+    Set the environment needed to import backend modules offline.
+
+    Registers a fake shared.pinecone_utils module, because the real one
+    resolves the index host over the network at import time. Cold-start
+    numbers therefore exclude the Pinecone client import.
+    """
+    for key, value in _BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+
+    import shared
+
+    fake_module = types.ModuleType("shared.pinecone_utils")
+    fake_module.index = FakeIndex()
+    sys.modules["shared.pinecone_utils"] = fake_module
+    shared.pinecone_utils = fake_module
+
+
+class StubStack:
+    """Handles to the installed stand-ins."""
+
+    def __init__(self, tables: dict[str, InMemoryTable], blobs: dict[str, InMemoryBlob]) -> None:
+        self.tables = tables
+        self.blobs = blobs
+        self.counters = COUNTERS
+
+
+def _replace_clients(module: types.ModuleType, attribute: str, factory, registry: dict) -> None:
+    """
+    Replace every module attribute holding a client with its in-memory stand-in.
+
+    Instrumented table wrappers are kept and only their inner client is
+    swapped, so round-trip instrumentation stays active in benchmarks.
+    """
+    from shared.table_metrics import InstrumentedTableClient
+
+    for name, value in list(vars(module).items()):
+        if isinstance(value, InstrumentedTableClient):
+            key = value.table_name
+            if key not in registry:
+                registry[key] = factory(key)
+            value._client = registry[key]
+        elif type(value).__module__.startswith("azure.") and hasattr(value, attribute):
+            key = getattr(value, attribute)
+            if key not in registry:
+                registry[key] = factory(key)
+            setattr(module, name, registry[key])
+
+
+def install_stubs(
+    llm_latency: float = 0.0,
+    embedding_latency: float = 0.0,
+    pinecone_latency: float = 0.0,
+    storage_latency: float = 0.0,
+) -> StubStack:
+    """
+    Replace storage, LLM, embedding and Pinecone clients with local stand-ins.
+
+    Must run before the blueprint modules are imported, because they bind the
+    shared clients with "from shared... import ..." at import time.
+
+    Args:
+        llm_latency: Seconds each LLM call takes
+        embedding_latency: Seconds each embedding call takes
+        pinecone_latency: Seconds each Pinecone query takes
+        storage_latency: Seconds each table/blob round trip takes
+
+    Returns:
+        StubStack with the in-memory tables and blobs
+    """
+    LATENCY.update({
+        "llm": llm_latency,
+        "embedding": embedding_latency,
+        "pinecone": pinecone_latency,
+        "storage": storage_latency,
+    })
+
+    prepare_environment()
+
+    from shared import table_utils, blobs_utils, card_registry, langchain_utils, namespace_registry
+
+    tables: dict[str, InMemoryTable] = {}
+    blobs: dict[str, InMemoryBlob] = {}
+    _replace_clients(table_utils, "table_name", InMemoryTable, tables)
+    _replace_clients(blobs_utils, "blob_name", InMemoryBlob, blobs)
+    _replace_clients(card_registry, "blob_name", InMemoryBlob, blobs)
+    namespace_registry.list_blob_names = lambda prefix=None: sorted(blobs) + _seed_knowledge_blobs()
+
+    blobs["cards.csv"].upload_blob(_seed_cards_csv())
+    blobs["decks.csv"].upload_blob(_seed_decks_csv())
+    blobs["features.csv"].upload_blob(_seed_features_csv())
+    _seed_snapshot()
+
+    stub_chat_model = _stub_chat_model_class()
+    langchain_utils.embedding_model = FakeEmbeddings()
+    langchain_utils.PineconeVectorStore = FakeVectorStore
+    langchain_utils.ChatOpenAI = lambda model="stub", **kwargs: stub_chat_model(model_name=model)
+
+    COUNTERS.reset()
+    return StubStack(tables, blobs)
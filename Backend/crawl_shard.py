@@ -0,0 +1,60 @@
+"""
+Azure Functions for the sharded deck crawl.
+
+The queue-triggered worker crawls one shard of a crawl run (a handful of
+clans) and checkpoints its result; the worker finishing the last shard merges
+the run into the deck store. A timer re-enqueues stalled shards and finishes
+runs whose workers died, so runs resume after failures.
+"""
+import json
+import logging
+import azure.functions as func
+from azure.functions import Blueprint
+
+from shared.crawl_runs import CRAWL_QUEUE, process_shard, resume_runs
+
+# Azure Functions Blueprint
+crawl_shard_bp = Blueprint()
+
+# Timer schedule for resuming stalled runs: every 15 minutes
+_RESUME_SCHEDULE = "0 */15 * * * *"
+
+
+@crawl_shard_bp.queue_trigger(
+    arg_name="msg",
+    queue_name=CRAWL_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def crawl_shard(msg: func.QueueMessage) -> None:
+    """
+    Queue-triggered Azure Function that crawls one shard of a crawl run.
+
+    Exceptions are re-raised so the queue retries the shard; the shard's
+    attempt count lets resume_crawl give up on shards that keep failing.
+    """
+    payload = json.loads(msg.get_body().decode("utf-8"))
+    run_id = payload["run_id"]
+    shard_id = int(payload["shard"])
+
+    logging.info(f"Crawling shard {shard_id} of run {run_id} (dequeue count {msg.dequeue_count})")
+    process_shard(run_id, shard_id)
+
+
+@crawl_shard_bp.timer_trigger(
+    schedule=_RESUME_SCHEDULE,
+    arg_name="myTimer",
+    run_on_startup=False,
+    use_monitor=False
+)
+@crawl_shard_bp.queue_output(
+    arg_name="shards",
+    queue_name=CRAWL_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def resume_crawl(myTimer: func.TimerRequest, shards: func.Out[list[str]]) -> None:
+    """
+    Timer-triggered Azure Function that resumes unfinished crawl runs.
+    """
+    messages = resume_runs()
+    if messages:
+        shards.set(messages)
@@ -1,66 +1,241 @@
-import azure.functions as func
-
-# Blueprints
-from analyze_deck import analyze_deck_bp
-from create_report import create_report_bp
-from optimize_deck import optimize_deck_bp
-from refresh_decks import refresh_decks_bp
-from refresh_decks_http import refresh_decks_http_bp
-from refresh_reports import refresh_reports_bp
-from add_account import add_account_bp
-from get_account import get_account_bp
-from delete_account import delete_account_bp
-from edit_account import edit_account_bp
-from save_category import save_category_bp
-from delete_category import delete_category_bp
-from edit_category import edit_category_bp
-from delete_player_deck import delete_player_deck_bp
-from edit_player_deck import edit_player_deck_bp
-from get_player_decks import get_player_decks_bp
-from get_categories import get_categories_bp
-from save_player_deck import save_player_deck_bp
-from get_features import get_features_bp
-from get_decks import get_decks_bp
-from get_cards import get_cards_bp
-from ingest_blob import ingest_blob_bp
-from remove_blob import remove_blob_bp
-from create_subscription import create_subscription_bp
-from cancel_subscription import cancel_subscription_bp
-from renew_subscription import renew_subscription_bp
-from get_subscription_status import get_subscription_status_bp
-from stripe_webhook import stripe_webhook_bp
-from send_verification_code import send_verification_code_bp
-
-# Create the main FunctionApp instance
-app = func.FunctionApp()
-
-# Register blueprints
-app.register_functions(analyze_deck_bp)
-app.register_functions(create_report_bp)
-app.register_functions(optimize_deck_bp)
-app.register_functions(refresh_decks_bp)
-app.register_functions(refresh_decks_http_bp)
-app.register_functions(refresh_reports_bp)
-app.register_functions(add_account_bp)
-app.register_functions(get_account_bp)
-app.register_functions(delete_account_bp)
-app.register_functions(edit_account_bp)
-app.register_functions(save_player_deck_bp)
-app.register_functions(save_category_bp)
-app.register_functions(delete_category_bp)
-app.register_functions(edit_category_bp)
-app.register_functions(delete_player_deck_bp)
-app.register_functions(edit_player_deck_bp)
-app.register_functions(get_player_decks_bp)
-app.register_functions(get_categories_bp)
-app.register_functions(get_features_bp)
-app.register_functions(get_decks_bp)
-app.register_functions(get_cards_bp)
-app.register_functions(ingest_blob_bp)
-app.register_functions(remove_blob_bp)
-app.register_functions(create_subscription_bp)
-app.register_functions(cancel_subscription_bp)
-app.register_functions(renew_subscription_bp)
-app.register_functions(get_subscription_status_bp)
-app.register_functions(stripe_webhook_bp)
-app.register_functions(send_verification_code_bp)
\ No newline at end of file
+"""
+Azure Functions entry point.
+
+Every blueprint is listed once in the registry below and assigned to an app
+profile. The same code can be deployed as several Function Apps that each
+register (and import) only the blueprints of their profile:
+
+- "crud": lightweight table/blob/Stripe endpoints that return in milliseconds
+- "ai": LLM, embedding and long-running crawl functions that hold a worker
+  for tens of seconds
+- "stream": the server-sent event routes (analyze_deck_stream,
+  optimize_deck_stream). They need the FastAPI HTTP extension, and once it is
+  loaded the worker serves every HTTP trigger of the app through its proxy,
+  so they get an app of their own and buffered routes never load it
+
+The profile is selected with the CLASHOPS_APP_PROFILE app setting. When it is
+unset, the "crud" and "ai" blueprints are registered in a single app (the
+original layout, without streaming).
+
+Each profile also carries the app settings that tune its concurrency. Print
+them for a deployment with:
+
+    python function_app.py <profile>
+
+The "all" profile (the single app) gets the union of the "crud" and "ai"
+settings; where they differ, the "ai" value wins because the single app must
+hold the long LLM and crawl functions.
+
+Every deployment, including the default single app, needs
+PYTHON_ENABLE_WORKER_EXTENSIONS=1: without it the table round-trip
+extension (shared.table_metrics) never loads and the instrumentation is
+silently off.
+"""
+import importlib
+import os
+import sys
+
+import azure.functions as func
+
+# Registers the per-invocation table round-trip worker extension (loaded by
+# the worker only with PYTHON_ENABLE_WORKER_EXTENSIONS=1, see _COMMON_APP_SETTINGS)
+import shared.table_metrics  # noqa: F401
+
+# ---------------------------------------------------------------------------
+# Blueprint Registry
+# ---------------------------------------------------------------------------
+
+# App setting used to select the profile for this deployment
+_PROFILE_SETTING = "CLASHOPS_APP_PROFILE"
+
+# Profile that registers every blueprint in one app
+_ALL_PROFILE = "all"
+
+# Blueprints served by the lightweight CRUD app: (module name, blueprint attribute)
+_CRUD_BLUEPRINTS = [
+    ("create_report", "create_report_bp"),
+    ("refresh_reports", "refresh_reports_bp"),
+    ("add_account", "add_account_bp"),
+    ("get_account", "get_account_bp"),
+    ("delete_account", "delete_account_bp"),
+    ("edit_account", "edit_account_bp"),
+    ("save_player_deck", "save_player_deck_bp"),
+    ("save_category", "save_category_bp"),
+    ("delete_category", "delete_category_bp"),
+    ("edit_category", "edit_category_bp"),
+    ("delete_player_deck", "delete_player_deck_bp"),
+    ("edit_player_deck", "edit_player_deck_bp"),
+    ("get_player_decks", "get_player_decks_bp"),
+    ("get_categories", "get_categories_bp"),
+    ("get_features", "get_features_bp"),
+    ("get_decks", "get_decks_bp"),
+    ("get_cards", "get_cards_bp"),
+    ("get_card_synergy", "get_card_synergy_bp"),
+    ("get_similar_decks", "get_similar_decks_bp"),
+    ("create_subscription", "create_subscription_bp"),
+    ("cancel_subscription", "cancel_subscription_bp"),
+    ("renew_subscription", "renew_subscription_bp"),
+    ("get_subscription_status", "get_subscription_status_bp"),
+    ("stripe_webhook", "stripe_webhook_bp"),
+    ("send_verification_code", "send_verification_code_bp"),
+    ("analysis_jobs", "analysis_jobs_bp"),
+]
+
+# Blueprints served by the streaming app: (module name, blueprint attribute)
+_STREAM_BLUEPRINTS = [
+    ("stream_deck", "stream_deck_bp"),
+]
+
+# Blueprints served by the heavy AI app: (module name, blueprint attribute)
+_AI_BLUEPRINTS = [
+    ("analyze_deck", "analyze_deck_bp"),
+    ("optimize_deck", "optimize_deck_bp"),
+    ("ingest_blob", "ingest_blob_bp"),
+    ("remove_blob", "remove_blob_bp"),
+    ("refresh_decks", "refresh_decks_bp"),
+    ("refresh_decks_http", "refresh_decks_http_bp"),
+    ("crawl_shard", "crawl_shard_bp"),
+    ("prewarm_decks", "prewarm_decks_bp"),
+    ("run_analysis_job", "run_analysis_job_bp"),
+]
+
+# App settings every deployment needs, whatever its profile
+_COMMON_APP_SETTINGS = {
+    # Loads worker extensions (the table round-trip instrumentation)
+    "PYTHON_ENABLE_WORKER_EXTENSIONS": "1",
+}
+
+# Profile configuration: blueprints to register and the app settings that
+# control concurrency for the Function App hosting the profile
+APP_PROFILES = {
+    "crud": {
+        "blueprints": _CRUD_BLUEPRINTS,
+        "app_settings": {
+            # Many short requests: several workers, high per-instance HTTP concurrency
+            "FUNCTIONS_WORKER_PROCESS_COUNT": "4",
+            "PYTHON_THREADPOOL_THREAD_COUNT": "16",
+            "AzureFunctionsJobHost__extensions__http__maxConcurrentRequests": "200",
+            "AzureFunctionsJobHost__functionTimeout": "00:00:30",
+        },
+    },
+    "ai": {
+        "blueprints": _AI_BLUEPRINTS,
+        "app_settings": {
+            # Few long LLM calls per instance: scale out instead of queueing behind them
+            "FUNCTIONS_WORKER_PROCESS_COUNT": "2",
+            "PYTHON_THREADPOOL_THREAD_COUNT": "8",
+            "AzureFunctionsJobHost__extensions__http__maxConcurrentRequests": "8",
+            "AzureFunctionsJobHost__extensions__http__maxOutstandingRequests": "64",
+            "AzureFunctionsJobHost__functionTimeout": "00:10:00",
+        },
+    },
+    "stream": {
+        "blueprints": _STREAM_BLUEPRINTS,
+        "app_settings": {
+            # Long-lived LLM streams: same limits as the AI app
+            "FUNCTIONS_WORKER_PROCESS_COUNT": "2",
+            "PYTHON_THREADPOOL_THREAD_COUNT": "8",
+            "AzureFunctionsJobHost__extensions__http__maxConcurrentRequests": "8",
+            "AzureFunctionsJobHost__extensions__http__maxOutstandingRequests": "64",
+            "AzureFunctionsJobHost__functionTimeout": "00:10:00",
+            # HTTP streaming through the FastAPI extension
+            "PYTHON_ENABLE_INIT_INDEXING": "1",
+        },
+    },
+}
+
+# Profiles the single "all" app combines (never "stream", see above)
+_SINGLE_APP_PROFILES = ("crud", "ai")
+
+
+def get_profile_blueprints(profile: str) -> list[tuple[str, str]]:
+    """
+    Get the blueprints registered by an app profile.
+
+    Args:
+        profile: Profile name ("crud", "ai", "stream" or "all")
+
+    Returns:
+        List of (module name, blueprint attribute) tuples
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile == _ALL_PROFILE:
+        return [bp for name in _SINGLE_APP_PROFILES for bp in APP_PROFILES[name]["blueprints"]]
+
+    if profile not in APP_PROFILES:
+        raise ValueError(
+            f"Unknown app profile: {profile}. "
+            f"Expected one of: {', '.join([*APP_PROFILES, _ALL_PROFILE])}"
+        )
+
+    return APP_PROFILES[profile]["blueprints"]
+
+
+def get_profile_settings(profile: str) -> dict[str, str]:
+    """
+    Get the app settings of a profile's Function App.
+
+    Args:
+        profile: Profile name ("crud", "ai", "stream" or "all")
+
+    Returns:
+        Settings shared by every deployment plus the profile's own; for
+        "all", the union of the combined profiles' settings (later
+        profiles win)
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile == _ALL_PROFILE:
+        settings = dict(_COMMON_APP_SETTINGS)
+        for name in _SINGLE_APP_PROFILES:
+            settings.update(APP_PROFILES[name]["app_settings"])
+        return settings
+
+    if profile not in APP_PROFILES:
+        raise ValueError(
+            f"Unknown app profile: {profile}. "
+            f"Expected one of: {', '.join([*APP_PROFILES, _ALL_PROFILE])}"
+        )
+
+    return {**_COMMON_APP_SETTINGS, **APP_PROFILES[profile]["app_settings"]}
+
+
+def build_app(profile: str = _ALL_PROFILE) -> func.FunctionApp:
+    """
+    Build a FunctionApp that registers the blueprints of one profile.
+
+    Blueprint modules are imported lazily so an app only pays the import
+    cost (LangChain, Pinecone, Stripe, ...) of the functions it serves.
+
+    Args:
+        profile: Profile name ("crud", "ai", "stream" or "all")
+
+    Returns:
+        FunctionApp with the profile's blueprints registered
+    """
+    function_app = func.FunctionApp()
+
+    for module_name, blueprint_name in get_profile_blueprints(profile):
+        module = importlib.import_module(module_name)
+        function_app.register_functions(getattr(module, blueprint_name))
+
+    return function_app
+
+
+if __name__ == "__main__":
+    # Print the app settings of a profile as KEY=VALUE lines, e.g. for
+    # `az functionapp config appsettings set --settings ...`. No blueprints
+    # are imported in this mode.
+    selected = sys.argv[1] if len(sys.argv) > 1 else ""
+    if selected not in APP_PROFILES and selected != _ALL_PROFILE:
+        sys.exit(f"Usage: python function_app.py [{'|'.join([*APP_PROFILES, _ALL_PROFILE])}]")
+
+    print(f"{_PROFILE_SETTING}={selected}")
+    for key, value in get_profile_settings(selected).items():
+        print(f"{key}={value}")
+else:
+    # Create the FunctionApp instance for this deployment
+    app = build_app(os.getenv(_PROFILE_SETTING, _ALL_PROFILE))
@@ -0,0 +1,81 @@
+"""
+Azure Function for card synergy lookups.
+
+Answers from the card co-occurrence / PMI matrix that every deck refresh
+precomputes (see shared/card_synergy), so no model is involved: either the
+best partners of one card or the pairwise synergy of a whole deck.
+"""
+import logging
+import azure.functions as func
+from azure.functions import Blueprint
+
+from shared.card_registry import parse_deck
+from shared.card_synergy import DEFAULT_PARTNERS, get_synergy
+from shared.http_utils import create_error_response, create_success_response
+
+# Azure Functions Blueprint
+get_card_synergy_bp = Blueprint()
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Most partners a request may ask for
+_MAX_PARTNERS = 50
+
+
+# ---------------------------------------------------------------------------
+# Azure Function Routes
+# ---------------------------------------------------------------------------
+
+@get_card_synergy_bp.route(route="get_card_synergy", auth_level=func.AuthLevel.FUNCTION)
+def get_card_synergy(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    HTTP-triggered Azure Function that returns precomputed card synergy.
+
+    Query parameters (one of):
+        - card: Card name; returns its best partners
+        - deck: Deck string (e.g., "[Hog Rider, Ice Spirit, ...]"); returns
+          every pair of its cards
+        - limit: Optional number of partners for "card" (default
+          DEFAULT_PARTNERS, capped at _MAX_PARTNERS)
+
+    Returns:
+        JSON with "created" (when the matrix was computed) and either "card"
+        and "partners" or "deck" and "pairs". Every entry holds the pair's
+        score-weighted "cooccurrence", "pmi" and "lift" (null for pairs never
+        seen together).
+    """
+    logging.info("Get card synergy request received")
+
+    card = req.params.get("card")
+    deck = req.params.get("deck")
+    if not card and not deck:
+        return create_error_response("Missing 'card' or 'deck'", 400)
+
+    try:
+        limit = min(max(int(req.params.get("limit", DEFAULT_PARTNERS)), 1), _MAX_PARTNERS)
+    except ValueError:
+        return create_error_response("Invalid 'limit'", 400)
+
+    synergy = get_synergy()
+    if synergy is None:
+        return create_error_response("Card synergy is not available yet", 503)
+
+    if deck:
+        cards = parse_deck(deck)
+        return create_success_response({
+            "created": synergy.created,
+            "deck": cards,
+            "pairs": synergy.deck_pairs(cards),
+        })
+
+    partners = synergy.partners(card, limit)
+    if partners is None:
+        return create_error_response(f"No synergy data for card: {card}", 404, log_error=False)
+
+    return create_success_response({
+        "created": synergy.created,
+        "card": card,
+        "partners": partners,
+    })
@@ -7,6 +7,7 @@ import csv
 import io
 import azure.functions as func
 from azure.functions import Blueprint
+from shared.archetypes import ARCHETYPES, find_archetype
 from shared.blobs_utils import decks
 
 get_decks_bp = Blueprint()
@@ -15,8 +16,23 @@ get_decks_bp = Blueprint()
 def get_decks(req: func.HttpRequest) -> func.HttpResponse:
     """
     HTTP-triggered Azure Function for getting all decks from the decks CSV blob.
+
+    Query parameters:
+        - archetype: Optional archetype (e.g., "Siege"); only decks classified
+          as that archetype are returned
     """
     logging.info("Get decks request received")
+
+    archetype = None
+    if req.params.get("archetype"):
+        archetype = find_archetype(req.params["archetype"])
+        if archetype is None:
+            return func.HttpResponse(
+                f"Unknown archetype. Expected one of: {', '.join(ARCHETYPES)}",
+                status_code=400,
+                mimetype="text/plain"
+            )
+
     try:
         # Download CSV bytes from blob
         blob_bytes = decks.download_blob().readall()
@@ -27,6 +43,8 @@ def get_decks(req: func.HttpRequest) -> func.HttpResponse:
         # Parse CSV rows into dictionaries
         reader = csv.DictReader(io.StringIO(csv_text))
         decks_list = list[dict[str | Any, str | Any]](reader)
+        if archetype is not None:
+            decks_list = [row for row in decks_list if row.get("archetype") == archetype]
     except Exception as e:
         logging.error(f"Error getting decks from blob: {e}")
         return func.HttpResponse(
@@ -0,0 +1,64 @@
+"""
+Azure Function for finding the popular decks closest to a deck.
+
+Searches the card bitmasks of every crawled deck (see shared/deck_similarity),
+so results come back without a model call or a decks.csv download.
+"""
+import logging
+import azure.functions as func
+from azure.functions import Blueprint
+
+from shared.card_registry import parse_deck
+from shared.deck_similarity import DEFAULT_SIMILAR_DECKS, get_deck_matrix
+from shared.http_utils import create_error_response, create_success_response
+
+# Azure Functions Blueprint
+get_similar_decks_bp = Blueprint()
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Most decks a request may ask for
+_MAX_SIMILAR_DECKS = 50
+
+
+# ---------------------------------------------------------------------------
+# Azure Function Routes
+# ---------------------------------------------------------------------------
+
+@get_similar_decks_bp.route(route="get_similar_decks", auth_level=func.AuthLevel.FUNCTION)
+def get_similar_decks(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    HTTP-triggered Azure Function that returns the meta decks closest to a deck.
+
+    Query parameters:
+        - deck: Deck string (e.g., "[Hog Rider, Ice Spirit, ...]")
+        - limit: Optional number of decks (default DEFAULT_SIMILAR_DECKS,
+          capped at _MAX_SIMILAR_DECKS)
+
+    Returns:
+        JSON with "deck" and "decks": entries with "deck_id", "cards",
+        "archetype", "score", "shared" (cards in common) and "similarity"
+        (Jaccard), most similar first
+    """
+    logging.info("Get similar decks request received")
+
+    deck = req.params.get("deck")
+    if not deck:
+        return create_error_response("Missing 'deck'", 400)
+
+    try:
+        limit = min(max(int(req.params.get("limit", DEFAULT_SIMILAR_DECKS)), 1), _MAX_SIMILAR_DECKS)
+    except ValueError:
+        return create_error_response("Invalid 'limit'", 400)
+
+    matrix = get_deck_matrix()
+    if matrix is None:
+        return create_error_response("Meta decks are not available yet", 503)
+
+    cards = parse_deck(deck)
+    return create_success_response({
+        "deck": cards,
+        "decks": matrix.similar(cards, limit),
+    })
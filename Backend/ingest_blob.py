@@ -12,6 +12,8 @@ from urllib.parse import urlparse
 from azure.storage.blob import BlobServiceClient
 from shared.langchain_utils import embedding_model, chunk_text
 from shared.pinecone_utils import index
+from shared.namespace_registry import blob_namespace, is_knowledge_blob
+from shared.analysis_cache import bump_knowledge_version
 
 ingest_blob_bp = func.Blueprint()
 
@@ -61,6 +63,11 @@ def ingest_blob(event: func.EventGridEvent):
             logging.info(f"Skipping blob from container: {container_name}")
             return
         
+        # App data (decks.csv, decks.arrow, crawl checkpoints) is not RAG knowledge
+        if not is_knowledge_blob(blob_name):
+            logging.info(f"Skipping data blob: {blob_name}")
+            return
+        
         # Download blob content
         service_client = BlobServiceClient.from_connection_string(_CONNECTION_STRING)
         blob_client = service_client.get_blob_client(container=container_name, blob=blob_name)
@@ -78,12 +85,16 @@ def ingest_blob(event: func.EventGridEvent):
                 "values": vector,
                 "metadata": {
                     "text": chunk,
-                    "namespace": blob_name.split(".")[0]
+                    "namespace": blob_namespace(blob_name)
                 }
             })
         
         # Upsert to Pinecone
         index.upsert(vectors=payload)
+
+        # Invalidate stored analyses that used this namespace's knowledge
+        bump_knowledge_version(blob_namespace(blob_name))
+
         logging.info(f"Blob ingestion process completed. Processed {len(payload)} chunks from {blob_name}")
         
     except Exception as e:
@@ -12,10 +12,19 @@ import azure.functions as func
 from azure.functions import Blueprint
 from typing import Optional
 
-from shared.table_utils import get_report_by_deck, update_report_field
-from shared.rag_utils import card_to_namespace
-from shared.prompts import optimize_prompt
+from shared.table_utils import claim_report_field, get_report_by_deck, update_report_field
+from shared.card_registry import UnknownCardError, format_key, pack, parse_deck
+from shared.analysis_cache import get_result, put_result, result_key
+from shared.namespace_registry import get_namespace_registry
+from shared.prompts import optimize_candidates_prompt, optimize_prompt
+from shared.schemas import optimize_schema
+from shared.model_routing import maybe_shadow, model_for
 from shared.langchain_utils import build_chain
+from shared.deck_index import get_deck_index
+from shared.deck_similarity import get_deck_matrix
+from shared.archetypes import classify_deck
+from shared.swap_search import describe_candidates, find_swaps
+from shared.telemetry import span
 
 # Azure Functions Blueprint
 optimize_deck_bp = Blueprint()
@@ -39,6 +48,10 @@ _TOWER_TROOP_NAMESPACES = [
 # RAG retrieval configuration
 _RETRIEVER_TOP_K = 5
 
+# Closest meta decks given to the model as context
+_SIMILAR_DECKS = 3
+
+
 
 # ---------------------------------------------------------------------------
 # Helper Functions
@@ -120,18 +133,22 @@ def build_retrievers(deck: str) -> list[dict]:
     
     Creates retriever configs for:
     - Tower troops (all types)
-    - Evolution namespaces (one per card in deck)
+    - Evolution namespaces (one per card in deck with ingested evolution knowledge)
     
     Args:
         deck: Deck string with comma-separated card names
     
     Returns:
         List of retriever configuration dictionaries
+    
+    Raises:
+        UnknownCardError: If any card is not in the card registry
     """
     retrievers = []
+    namespaces = get_namespace_registry()
 
     # Add tower troop retrievers
-    for ns in _TOWER_TROOP_NAMESPACES:
+    for ns in filter(namespaces.has, _TOWER_TROOP_NAMESPACES):
         retrievers.append({
             "k": _RETRIEVER_TOP_K,
             "metadata": {
@@ -139,11 +156,8 @@ def build_retrievers(deck: str) -> list[dict]:
             }
         })
 
-    # Add evolution namespace retrievers
-    evolution_namespaces = [
-        "evolution_" + card_to_namespace(card.strip())
-        for card in deck.replace("[", "").replace("]", "").split(",")
-    ]
+    # Add evolution namespace retrievers (only cards that have an evolution)
+    evolution_namespaces = namespaces.evolution_namespaces(namespaces.resolve(deck))
 
     for ns in evolution_namespaces:
         retrievers.append({
@@ -156,6 +170,257 @@ def build_retrievers(deck: str) -> list[dict]:
     return retrievers
 
 
+def _candidate_summary(candidate: dict) -> str:
+    """Describe a swap candidate from its computed scores (see describe_candidates)."""
+    swaps = " and ".join(f"{s['New Card']} for {s['Replaced Card']}" for s in candidate["Swaps"])
+    scores = ", ".join(f"{category} {score:g}" for category, score in candidate["Category Scores"].items())
+    return (
+        f"Playing {swaps} raises the average category score by {candidate['Category Score Gain']:+.2f} "
+        f"and the meta fit by {candidate['Meta Fit Gain']:+.2f}. Category scores after the swap: {scores}."
+    )
+
+
+def _ground_swaps(results: str, candidates: list[dict]) -> str:
+    """
+    Keep the recommended swaps to the locally searched candidates.
+
+    When the model proposed swaps outside the candidates, its Improvement
+    Summary explains those swaps, so it is replaced along with them by a
+    summary of the best candidate's computed scores.
+
+    Args:
+        results: Model output (JSON)
+        candidates: Candidates given to the model (see describe_candidates)
+
+    Returns:
+        Result whose "Swaps" are one of the candidates (the best one, with
+        its own summary, if the model proposed anything else), or the result
+        unchanged if it is not JSON
+    """
+    try:
+        data = json.loads(results)
+        swaps = data["Optimize"]["Recommended Swaps"]
+    except (ValueError, KeyError, TypeError):
+        logging.warning("Optimization result has no recommended swaps; candidates not applied")
+        return results
+
+    def _key(entries: list) -> set:
+        return {(e.get("Replaced Card"), e.get("New Card")) for e in entries if isinstance(e, dict)}
+
+    if any(_key(swaps.get("Swaps") or []) == _key(c["Swaps"]) for c in candidates):
+        return results
+
+    logging.warning("Model recommended swaps outside the candidates; using the best candidate")
+    swaps["Swaps"] = candidates[0]["Swaps"]
+    swaps["Improvement Summary"] = _candidate_summary(candidates[0])
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _lookup_result(deck_key: str, prompt: str, namespaces: list[str], user_input: str) -> tuple[str, Optional[str]]:
+    """Compute the result key of an optimization and look up its stored result."""
+    with span("result_lookup", category="optimize") as attrs:
+        cache_key = result_key(
+            deck_key,
+            "optimize",
+            prompt,
+            model_for("optimize"),
+            namespaces,
+            user_input=user_input,
+            response_format=optimize_schema
+        )
+        stored = get_result(deck_key, cache_key)
+        attrs["hit"] = stored is not None
+    return cache_key, stored
+
+
+def prepare_optimization(
+    deck: str,
+    resolved_rowkey: str,
+    user_prompt: str,
+    report: Optional[dict] = None
+) -> dict:
+    """
+    Resolve everything needed to optimize a deck.
+    
+    The Optimize field is claimed first (see claim_report_field), so of
+    several concurrent requests for the same deck only one goes on. The
+    claimant reuses a stored result when the same deck was already optimized
+    from the same analysis input, prompt, model and knowledge (see
+    analysis_cache) and copies it to the report right away; otherwise the
+    model must run. A request that loses the claim gets "running" (or the
+    result another request already wrote) and must not run the model.
+    
+    Card swaps are searched locally (see shared/swap_search) when a deck
+    snapshot is available; the model then picks and explains one of the
+    ranked candidates instead of searching the rubric itself. The closest
+    meta decks (see shared/deck_similarity) are added as context.
+    
+    Args:
+        deck: Deck string to optimize
+        resolved_rowkey: RowKey of the deck's report
+        user_prompt: Analysis input (see build_user_prompt)
+        report: Report entity as just read (read again if omitted)
+    
+    Returns:
+        Optimization job: "rowkey", "deck_key", "cache_key", "model",
+        "candidates" (swap candidates given to the model, may be empty),
+        "chain_inputs", "running" (True if another request holds the field)
+        and "result" (the stored result, or None if the model must run or is
+        running); only "rowkey", "running" and "result" are set when the
+        claim is lost
+    
+    Raises:
+        UnknownCardError: If any card is not in the card registry
+        ValueError: If the report no longer exists
+    """
+    # Claim the field before any lookup so concurrent requests do not all miss
+    with span("claim", category="optimize", field="Optimize") as attrs:
+        claimed, current = claim_report_field(resolved_rowkey, "Optimize", report)
+        attrs["claimed"] = claimed
+    if not claimed:
+        if current is None:
+            raise ValueError("Report not found for this deck")
+        logging.info(f"Optimization of deck {resolved_rowkey} is already running or done")
+        running = current == "loading"
+        return {"rowkey": resolved_rowkey, "running": running, "result": None if running else current}
+
+    with span("retriever_config", category="optimize") as attrs:
+        retrievers = build_retrievers(deck)
+        attrs["retrievers"] = len(retrievers)
+
+    # Swap candidates are derived from the deck and the meta snapshot, so the
+    # snapshot version stands in for them in the result key
+    index = get_deck_index()
+    meta_version = index.version if index is not None else ""
+    prompt = optimize_candidates_prompt if index is not None else optimize_prompt
+
+    # Reuse a result computed from identical inputs (any user, any month).
+    # With a snapshot the model usually gets swap candidates, so that result
+    # is looked up first and the swap search only runs on a miss.
+    deck_key = format_key(pack(get_namespace_registry().resolve(deck)))
+    namespaces = [r["metadata"]["namespace"] for r in retrievers]
+    user_input = f"{user_prompt}\n{meta_version}"
+    cache_key, stored = _lookup_result(deck_key, prompt, namespaces, user_input)
+
+    candidates = []
+    if stored is None and index is not None:
+        # Ranked swap candidates from the card pool and meta snapshot
+        with span("swap_search", category="optimize") as attrs:
+            candidates = describe_candidates(find_swaps(parse_deck(deck)))
+            attrs["candidates"] = len(candidates)
+
+        # No candidates → the model gets the full rubric prompt instead
+        if not candidates:
+            prompt = optimize_prompt
+            cache_key, stored = _lookup_result(deck_key, prompt, namespaces, user_input)
+
+    # Stored result → copy it to the report (the field is already "loading")
+    if stored is not None:
+        with span("table_write", category="optimize", field="Optimize"):
+            update_report_field(resolved_rowkey, "Optimize", stored)
+
+    similar = []
+    if stored is not None:
+        logging.info(f"Reusing stored optimization for deck: {resolved_rowkey}")
+    else:
+        # Closest popular decks (bitmask search over the same snapshot)
+        with span("similar_decks", category="optimize") as attrs:
+            matrix = get_deck_matrix()
+            similar = matrix.similar(parse_deck(deck), _SIMILAR_DECKS) if matrix is not None else []
+            attrs["decks"] = len(similar)
+
+    # Retrieve on the request alone, not the computed sections added below
+    query = user_prompt
+    extra = {}
+    archetype = classify_deck(parse_deck(deck))
+    if archetype is not None:
+        extra["Archetype"] = archetype
+    if candidates:
+        extra["Candidate Swaps"] = candidates
+    if similar:
+        extra["Similar Meta Decks"] = [
+            {"Cards": d["cards"], "Archetype": d["archetype"], "Shared Cards": d["shared"], "Meta Score": d["score"]}
+            for d in similar
+        ]
+    if extra:
+        user_prompt = json.dumps({**json.loads(user_prompt), **extra}, ensure_ascii=False)
+
+    return {
+        "rowkey": resolved_rowkey,
+        "deck_key": deck_key,
+        "cache_key": cache_key,
+        "model": model_for("optimize"),
+        "candidates": candidates,
+        "running": False,
+        "chain_inputs": {
+            "system_instructions": prompt,
+            "user_input": user_prompt,
+            "query": query,
+            "retrievers": retrievers
+        },
+        "result": stored,
+    }
+
+
+def complete_optimization(job: dict, results: str) -> str:
+    """
+    Store an optimization result in the result store and the report.
+    
+    Args:
+        job: Optimization job from prepare_optimization
+        results: Model output
+    
+    Returns:
+        The stored result
+    """
+    if job["candidates"]:
+        results = _ground_swaps(results, job["candidates"])
+
+    with span("table_write", category="optimize", field="Optimize"):
+        put_result(job["deck_key"], job["cache_key"], "optimize", results)
+        update_report_field(job["rowkey"], "Optimize", results)
+
+    maybe_shadow("optimize", job["model"], job["chain_inputs"], optimize_schema, results)
+    return results
+
+
+def perform_optimization(
+    deck: str,
+    resolved_rowkey: str,
+    user_prompt: str,
+    report: Optional[dict] = None
+) -> Optional[str]:
+    """
+    Run the optimization model for a deck and update the report record.
+    
+    Args:
+        deck: Deck string to optimize
+        resolved_rowkey: RowKey of the deck's report
+        user_prompt: Analysis input (see build_user_prompt)
+        report: Report entity as just read (read again if omitted)
+    
+    Returns:
+        The optimization result as a JSON string, or None if another request
+        is already running the optimization (its result lands in the report)
+    
+    Raises:
+        UnknownCardError: If any card is not in the card registry
+        ValueError: If the report no longer exists
+    """
+    job = prepare_optimization(deck, resolved_rowkey, user_prompt, report)
+    if job["result"] is not None or job["running"]:
+        return job["result"]
+
+    # Invoke chain with RAG retrieval
+    with span("chain_invoke", category="optimize", model=job["model"]):
+        chain = build_chain(model=job["model"], response_format=optimize_schema, cache_key="optimize")
+        results = chain.invoke(job["chain_inputs"])
+
+    logging.info(f"Optimization completed for deck: {resolved_rowkey}")
+
+    return complete_optimization(job, results)
+
+
 # ---------------------------------------------------------------------------
 # Azure Function Route
 # ---------------------------------------------------------------------------
@@ -202,8 +467,20 @@ async def optimize_deck(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="text/plain"
         )
 
+    # Reject unknown cards before any table, Pinecone or LLM work
+    try:
+        get_namespace_registry().resolve(deck)
+    except UnknownCardError as e:
+        logging.warning(f"Invalid deck: {e}")
+        return func.HttpResponse(
+            str(e),
+            status_code=400,
+            mimetype="text/plain"
+        )
+
     # Resolve correct row key via canonical deck matching
-    report, resolved_rowkey = get_report_by_deck(deck)
+    with span("report_lookup", category="optimize"):
+        report, resolved_rowkey = get_report_by_deck(deck)
 
     if not report:
         logging.warning(f"Report not found for deck: {deck}")
@@ -240,23 +517,17 @@ async def optimize_deck(req: func.HttpRequest) -> func.HttpResponse:
     # Case 2: No optimization yet → perform now
     if existing_value == "no":
         try:
-            update_report_field(resolved_rowkey, "Optimize", "loading")
-
-            user_prompt = build_user_prompt(body)
-            chain = build_chain()
-            retrievers = build_retrievers(deck)
-
-            # Invoke chain with RAG retrieval
-            results = chain.invoke({
-                "system_instructions": optimize_prompt,
-                "user_input": user_prompt,
-                "retrievers": retrievers
-            })
-
-            logging.info(f"Optimization completed for deck: {resolved_rowkey}")
-
-            # Store result
-            update_report_field(resolved_rowkey, "Optimize", results)
+            results = perform_optimization(deck, resolved_rowkey, build_user_prompt(body), report)
+            if results is None:
+                # Another request claimed the optimization first → wait for it
+                results = await wait_for_optimize(resolved_rowkey)
+            if results is None:
+                logging.error(f"Timeout waiting for optimization: {resolved_rowkey}")
+                return func.HttpResponse(
+                    "Timeout waiting for optimization",
+                    status_code=504,
+                    mimetype="text/plain"
+                )
 
             return func.HttpResponse(
                 json.dumps({"category": "optimize", "content": results}),
@@ -0,0 +1,182 @@
+"""
+Azure Functions for pre-analyzing the top meta decks.
+
+Whenever a new decks.arrow snapshot is published (by a crawl run or the
+manual refresh), the blob trigger enqueues the top decks by score. Queue
+workers create each deck's report and run the four category analyses plus
+optimization, so the first users to open a hot deck get a stored result
+instead of waiting for the model. Concurrency is bounded by the queue batch
+size in host.json times the category workers per deck.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import azure.functions as func
+import pyarrow.compute as pc
+from azure.functions import Blueprint
+
+from analyze_deck import CATEGORY_CONFIG, perform_analysis
+from optimize_deck import build_user_prompt, perform_optimization
+from shared.card_registry import InvalidDeckError
+from shared.deck_snapshot import DECK_SIZE, read_snapshot
+from shared.table_utils import ensure_report, get_report_by_deck, update_report_field
+
+# Azure Functions Blueprint
+prewarm_decks_bp = Blueprint()
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Queue holding one message per deck to pre-analyze
+PREWARM_QUEUE = "prewarm-decks"
+
+# Snapshot whose publication triggers the warm-up
+_SNAPSHOT_PATH = "clashopscontainer/decks.arrow"
+
+# Number of top decks pre-analyzed after each publish
+_PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "25"))
+
+# Category analyses run concurrently for one deck
+_CATEGORY_WORKERS = int(os.getenv("PREWARM_CATEGORY_WORKERS", "4"))
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def top_decks(snapshot: bytes, limit: int = _PREWARM_TOP_N) -> list[str]:
+    """
+    Get the highest-scoring full decks of a snapshot as deck strings.
+
+    Args:
+        snapshot: Contents of decks.arrow
+        limit: Maximum number of decks
+
+    Returns:
+        Deck strings (e.g., "[Hog Rider, Ice Spirit, ...]"), best first
+    """
+    table, card_names = read_snapshot(snapshot)
+    if limit <= 0 or table.num_rows == 0:
+        return []
+
+    top = table.take(pc.select_k_unstable(table, k=min(limit, table.num_rows), sort_keys=[("score", "descending")]))
+    columns = [top.column(f"card_{i}").to_pylist() for i in range(DECK_SIZE)]
+
+    decks = []
+    for card_ids in zip(*columns):
+        names = [card_names.get(card_id) for card_id in card_ids]
+        if all(names):
+            decks.append(f"[{', '.join(names)}]")
+    return decks
+
+
+def _analyze(deck: str, rowkey: str, category: str) -> Optional[str]:
+    """Run one category analysis, resetting the field if it fails."""
+    try:
+        return perform_analysis(deck, category)
+    except Exception as e:
+        logging.error(f"Pre-analysis of {category} failed for deck {rowkey}: {e}")
+        update_report_field(rowkey, CATEGORY_CONFIG[category]["field"], "no")
+        return None
+
+
+def _optimize_body(deck: str, report: dict) -> Optional[dict]:
+    """
+    Build the optimize request body from a report's completed analyses.
+
+    Returns:
+        Body as sent by the frontend, or None if an analysis is missing
+    """
+    body = {"deckToAnalyze": deck}
+    for category, cfg in CATEGORY_CONFIG.items():
+        try:
+            analysis = json.loads(report.get(cfg["field"], ""))
+        except ValueError:
+            return None
+        # Results are either {"Offense": {...}} or the category object itself
+        analysis = analysis.get(cfg["field"], analysis)
+        body[f"{category}Score"] = analysis.get("Score")
+        body[f"{category}Summary"] = analysis.get("Summary")
+    return body
+
+
+def prewarm_deck(deck: str) -> None:
+    """
+    Create a deck's report and run every analysis it does not have yet.
+
+    Category analyses run in parallel; optimization runs last because its
+    input is the four analyses.
+
+    Args:
+        deck: Deck string
+    """
+    try:
+        ensure_report(deck)
+    except InvalidDeckError as e:
+        logging.warning(f"Skipping pre-analysis of invalid deck {deck}: {e}")
+        return
+
+    report, rowkey = get_report_by_deck(deck)
+    pending = [category for category, cfg in CATEGORY_CONFIG.items() if report.get(cfg["field"]) == "no"]
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=_CATEGORY_WORKERS) as pool:
+            list(pool.map(lambda category: _analyze(deck, rowkey, category), pending))
+        report, rowkey = get_report_by_deck(deck)
+
+    if report.get("Optimize") != "no":
+        return
+
+    body = _optimize_body(deck, report)
+    if body is None:
+        logging.warning(f"Skipping pre-optimization of deck {rowkey}: analyses incomplete")
+        return
+
+    try:
+        perform_optimization(deck, rowkey, build_user_prompt(body))
+    except Exception as e:
+        logging.error(f"Pre-optimization failed for deck {rowkey}: {e}")
+        update_report_field(rowkey, "Optimize", "no")
+
+
+# ---------------------------------------------------------------------------
+# Azure Function Triggers
+# ---------------------------------------------------------------------------
+
+@prewarm_decks_bp.blob_trigger(
+    arg_name="snapshot",
+    path=_SNAPSHOT_PATH,
+    connection="STORAGE_CONNECTION_STRING"
+)
+@prewarm_decks_bp.queue_output(
+    arg_name="decks",
+    queue_name=PREWARM_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def plan_prewarm(snapshot: func.InputStream, decks: func.Out[list[str]]) -> None:
+    """
+    Blob-triggered Azure Function that enqueues the top decks of a new snapshot.
+    """
+    top = top_decks(snapshot.read())
+    if top:
+        decks.set([json.dumps({"deck": deck}) for deck in top])
+
+    logging.info(f"Enqueued {len(top)} decks for pre-analysis")
+
+
+@prewarm_decks_bp.queue_trigger(
+    arg_name="msg",
+    queue_name=PREWARM_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def prewarm_decks(msg: func.QueueMessage) -> None:
+    """
+    Queue-triggered Azure Function that pre-analyzes one deck.
+    """
+    deck = json.loads(msg.get_body().decode("utf-8"))["deck"]
+    logging.info(f"Pre-analyzing deck {deck}")
+    prewarm_deck(deck)
@@ -2,22 +2,16 @@
 Azure Function for refreshing deck data from Clash Royale API.
 
 This timer-triggered function runs on the 10th, 20th, and 30th of each month
-to fetch deck data from top global clans, aggregate deck usage statistics,
-and upload the results to Azure Blob Storage.
+and coordinates a sharded crawl: it collects top clans across many locations
+and enqueues them in shards for the crawl_shard workers, which merge deck
+usage into the persistent deck store and upload the store view (decks.csv,
+its columnar snapshot and the card synergy matrix) to Azure Blob Storage.
 """
 import logging
-import time
 import azure.functions as func
 from azure.functions import Blueprint
 
-from shared.clash_royale_utils import (
-    PLAYER_DELAY,
-    get_top_clans,
-    get_clan_members,
-    get_player_data,
-    process_player_deck,
-    upload_decks
-)
+from shared.crawl_runs import CRAWL_QUEUE, plan_clan_tags, start_run
 
 # Azure Functions Blueprint
 refresh_decks_bp = Blueprint()
@@ -32,79 +26,30 @@ _TIMER_SCHEDULE = "0 0 0 10,20,30 * *"
     run_on_startup=False,
     use_monitor=False
 )
-def refresh_decks(myTimer: func.TimerRequest) -> None:
+@refresh_decks_bp.queue_output(
+    arg_name="shards",
+    queue_name=CRAWL_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def refresh_decks(myTimer: func.TimerRequest, shards: func.Out[list[str]]) -> None:
     """
     Timer-triggered Azure Function for refreshing deck data.
-    Fetches deck data from top global clans, aggregates by canonical form,
-    assigns UUID deck IDs, increments scores, and uploads to blob storage.
+    Plans a crawl run over the top clans of many locations and enqueues one
+    message per shard; crawl_shard workers do the crawling and merging.
     """
 
     if myTimer.past_due:
         logging.warning("The timer is past due!")
 
     logging.info("Starting deck refresh process...")
-    logging.info("Fetching top clans...")
+    logging.info("Collecting clans across locations...")
 
-    clans = get_top_clans()
-    if not clans:
+    clan_tags = plan_clan_tags()
+    if not clan_tags:
         logging.warning("No clan data found. Exiting.")
         return
 
-        logging.info(f"Found {len(clans)} top clans to process")
-
-        # Dictionary: frozenset(deck_cards) -> deck_data
-        deck_dict = {}
-        deck_id_counter = 1
-
-        # ---------------------------------------------------------
-        # FETCH & PROCESS CLANS
-        # ---------------------------------------------------------
-        for clan in clans:
-            clan_name = clan.get("name", "Unknown")
-            clan_tag = clan.get("tag", "")
-
-            logging.info(f"Processing clan: {clan_name} ({clan_tag})")
-
-            members = get_clan_members(clan_tag)
-            if not members:
-                logging.info(f"No members found for clan: {clan_name}")
-                continue
-
-            logging.info(f"Processing {len(members)} members from {clan_name}")
-
-            for member in members:
-                player_tag = member.get("tag", "")
-                if not player_tag:
-                    continue
-
-                player_data = get_player_data(player_tag)
-                if not player_data:
-                    logging.debug(f"Could not fetch data for player: {player_tag}")
-                    continue
-
-                # Process player deck and update deck_dict
-                deck_id_counter = process_player_deck(player_data, deck_dict, deck_id_counter)
-
-                time.sleep(PLAYER_DELAY)
-
-    # ---------------------------------------------------------
-    # CONVERT & SORT
-    # ---------------------------------------------------------
-    # Convert deck_dict (frozenset keys) to list of deck dictionaries
-    decks_list = list(deck_dict.values())
-
-    sorted_decks = sorted(
-        decks_list,
-        key=lambda d: d["score"],
-        reverse=True
-    )
-
-    logging.info(f"Aggregated {len(sorted_decks)} unique decks")
-
-    if sorted_decks:
-        upload_decks(sorted_decks)
-        logging.info(f"Successfully uploaded {len(sorted_decks)} decks to blob storage")
-    else:
-        logging.warning("No decks to upload")
+    run_id, messages = start_run(clan_tags)
+    shards.set(messages)
 
-    logging.info("Deck refresh process completed successfully")
\ No newline at end of file
+    logging.info(f"Enqueued {len(messages)} shards for crawl run {run_id}")
\ No newline at end of file
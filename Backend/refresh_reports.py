@@ -3,7 +3,9 @@ Azure Function for refreshing (clearing) all deck reports.
 
 This timer-triggered function runs on the 1st of each month at midnight UTC
 to delete all report entities from Azure Table Storage. This provides a
-monthly reset of all analysis data.
+monthly reset of all analysis data. Model results are kept in the
+analysiscache table (see shared/analysis_cache), so re-analyzing a deck after
+the reset only calls the model if its prompt or card knowledge changed.
 """
 import logging
 import azure.functions as func
@@ -9,6 +9,8 @@ import azure.functions as func
 import logging
 from urllib.parse import urlparse
 from shared.pinecone_utils import index
+from shared.namespace_registry import blob_namespace, is_knowledge_blob
+from shared.analysis_cache import bump_knowledge_version
 
 remove_blob_bp = func.Blueprint()
 
@@ -60,15 +62,23 @@ def remove_blob(event: func.EventGridEvent):
             logging.info(f"Skipping blob from container: {container_name}")
             return
         
+        # App data (decks.csv, decks.arrow, crawl checkpoints) was never ingested
+        if not is_knowledge_blob(blob_name):
+            logging.info(f"Skipping data blob: {blob_name}")
+            return
+        
         # Delete embeddings associated with this blob
-        # The blob name is stored in metadata.namespace field
+        # The blob's namespace (name without extension) is stored in metadata.namespace
         metadata_filter = {
-            "namespace": {"$eq": blob_name}
+            "namespace": {"$eq": blob_namespace(blob_name)}
         }
         
         # Delete vectors matching the metadata filter
         # This will delete all embeddings that have this blob name in their metadata
         index.delete(filter=metadata_filter)
+
+        # Invalidate stored analyses that used this namespace's knowledge
+        bump_knowledge_version(blob_namespace(blob_name))
         
         logging.info(f"Successfully deleted embeddings for blob: {blob_name}")
         
@@ -0,0 +1,63 @@
+"""
+Azure Function that runs queued analysis jobs.
+
+Each message from submit_analysis runs one category analysis (or the
+optimization) for a deck, exactly as analyze_deck / optimize_deck would, and
+stores the result in the report, where analysis_status picks it up.
+"""
+import json
+import logging
+import azure.functions as func
+from azure.functions import Blueprint
+
+from analyze_deck import perform_analysis
+from optimize_deck import build_user_prompt, perform_optimization
+from shared.analysis_jobs import FAILED, JOB_FIELDS, JOB_QUEUE, RUNNING, set_job_status
+from shared.table_utils import get_report_by_deck, update_report_field
+
+# Azure Functions Blueprint
+run_analysis_job_bp = Blueprint()
+
+
+@run_analysis_job_bp.queue_trigger(
+    arg_name="msg",
+    queue_name=JOB_QUEUE,
+    connection="STORAGE_CONNECTION_STRING"
+)
+def run_analysis_job(msg: func.QueueMessage) -> None:
+    """
+    Queue-triggered Azure Function that runs one analysis job.
+
+    Jobs whose report field is no longer "no" (already running or done,
+    e.g. through the synchronous routes) are skipped. Failures reset the
+    field, mark the job failed and are re-raised so the queue retries them.
+    """
+    payload = json.loads(msg.get_body().decode("utf-8"))
+    job = payload["job_id"]
+    deck = payload["deck"]
+    category = payload["category"]
+    field = JOB_FIELDS[category]
+
+    report, resolved_rowkey = get_report_by_deck(deck)
+    if not report:
+        logging.warning(f"Report not found for job {job}")
+        set_job_status(job, FAILED, "Report not found")
+        return
+
+    if report.get(field) != "no":
+        logging.info(f"Job {job} already running or done; skipping")
+        return
+
+    logging.info(f"Running analysis job {job} (dequeue count {msg.dequeue_count})")
+    set_job_status(job, RUNNING)
+
+    try:
+        if category == "optimize":
+            perform_optimization(deck, resolved_rowkey, build_user_prompt(payload["body"]))
+        else:
+            perform_analysis(deck, category)
+    except Exception as e:
+        logging.error(f"Analysis job {job} failed: {e}")
+        update_report_field(resolved_rowkey, field, "no")
+        set_job_status(job, FAILED, str(e))
+        raise
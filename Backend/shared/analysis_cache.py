@@ -0,0 +1,165 @@
+"""
+Content-addressed store of model results, shared across users and months.
+
+A result is keyed by everything that determines it: the canonical deck key,
+the category, a hash of the prompt text, model and output schema, and the
+knowledge version of every namespace retrieved for the deck (plus a hash of
+any extra user input). The reports table is still wiped monthly by refresh_reports, but a
+popular deck is only sent to the model again when its prompt or the ingested
+knowledge for one of its cards actually changed.
+
+Knowledge versions are bumped by ingest_blob and remove_blob after they
+change a namespace in Pinecone; namespaces never bumped have version "0".
+They are cached per process for _VERSIONS_TTL_SECONDS, so for that long
+after a bump on another instance a result may still be keyed (and reused)
+under the namespace's previous version.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared.table_utils import analysis_cache_table, knowledge_table
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Partition of the knowledge table holding one version row per namespace
+_KNOWLEDGE_PARTITION = "Namespace"
+
+# Version of a namespace that was never bumped
+_INITIAL_VERSION = "0"
+
+# Seconds before knowledge versions are read from the table again
+_VERSIONS_TTL_SECONDS = 60
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _digest(*parts: str) -> str:
+    """Hex SHA-256 of the parts, separated so no two part lists collide."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+# Knowledge versions cached by knowledge_versions()
+_versions: dict[str, str] = {}
+_versions_loaded_at = 0.0
+_versions_lock = threading.Lock()
+
+
+def bump_knowledge_version(namespace: str) -> None:
+    """
+    Record that the ingested knowledge of a namespace changed.
+
+    Args:
+        namespace: Pinecone namespace (e.g., "hog_rider")
+    """
+    knowledge_table.upsert_entity({
+        "PartitionKey": _KNOWLEDGE_PARTITION,
+        "RowKey": namespace,
+        "Version": uuid.uuid4().hex,
+        "Updated": datetime.now(timezone.utc).isoformat(),
+    })
+    logging.info(f"Bumped knowledge version of namespace {namespace}")
+
+    # This process sees its own bump right away
+    global _versions_loaded_at
+    with _versions_lock:
+        _versions_loaded_at = 0.0
+
+
+def knowledge_versions() -> dict[str, str]:
+    """
+    Get the current knowledge version of every bumped namespace.
+
+    Returns:
+        Namespace -> version (one partition query, at most once per
+        _VERSIONS_TTL_SECONDS)
+    """
+    global _versions, _versions_loaded_at
+
+    with _versions_lock:
+        if _versions_loaded_at == 0.0 or time.monotonic() - _versions_loaded_at > _VERSIONS_TTL_SECONDS:
+            entities = knowledge_table.query_entities(
+                f"PartitionKey eq '{_KNOWLEDGE_PARTITION}'",
+                select=["RowKey", "Version"]
+            )
+            _versions = {entity["RowKey"]: entity.get("Version", _INITIAL_VERSION) for entity in entities}
+            _versions_loaded_at = time.monotonic()
+        return _versions
+
+
+def result_key(
+    deck_key: str,
+    category: str,
+    prompt: str,
+    model: str,
+    namespaces: Iterable[str],
+    user_input: str = "",
+    response_format: Optional[dict] = None
+) -> str:
+    """
+    Compute the content address of a model result.
+
+    Args:
+        deck_key: Packed card-id deck key (see card_registry)
+        category: Result category (e.g., "offense", "optimize")
+        prompt: System prompt sent to the model
+        model: Model name
+        namespaces: Namespaces retrieved as context
+        user_input: Extra user input beyond the deck, if any
+        response_format: Structured output format the model was bound to
+
+    Returns:
+        64-character hexadecimal key
+    """
+    versions = knowledge_versions()
+    knowledge = ",".join(f"{ns}={versions.get(ns, _INITIAL_VERSION)}" for ns in sorted(set(namespaces)))
+    output_format = json.dumps(response_format, sort_keys=True) if response_format else ""
+    return _digest(deck_key, category, _digest(prompt, model, output_format), knowledge, _digest(user_input))
+
+
+def get_result(deck_key: str, key: str) -> Optional[str]:
+    """
+    Get a stored result.
+
+    Args:
+        deck_key: Packed card-id deck key (the partition)
+        key: Content address from result_key
+
+    Returns:
+        The stored result, or None on a miss
+    """
+    try:
+        entity = analysis_cache_table.get_entity(partition_key=deck_key, row_key=key)
+    except ResourceNotFoundError:
+        return None
+    return entity.get("Result")
+
+
+def put_result(deck_key: str, key: str, category: str, result: str) -> None:
+    """
+    Store a result under its content address.
+
+    Args:
+        deck_key: Packed card-id deck key (the partition)
+        key: Content address from result_key
+        category: Result category (kept for inspection)
+        result: Model output
+    """
+    analysis_cache_table.upsert_entity({
+        "PartitionKey": deck_key,
+        "RowKey": key,
+        "Category": category,
+        "Result": result,
+        "Created": datetime.now(timezone.utc).isoformat(),
+    })
@@ -0,0 +1,192 @@
+"""
+Analysis jobs: submit an analysis, poll its status, read its result.
+
+A job is keyed by the deck's packed key and the category, so repeated
+submissions of the same deck (client retries, other users) map to one job
+and one model call. Job rows only record the request and any failure; the
+job's progress and result are read from the deck's report field, which the
+analysis itself maintains ("no" -> "loading" -> result). Work runs in the
+run_analysis_job queue worker, so no HTTP request waits on the model.
+"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared.table_utils import PARTITION_KEY, ensure_report, jobs_table, reports_table
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Queue feeding the job worker
+JOB_QUEUE = "analysis-jobs"
+
+# Partition of the jobs table
+_JOB_PARTITION = "Job"
+
+# Job categories and the report field holding their result
+JOB_FIELDS = {
+    "offense": "Offense",
+    "defense": "Defense",
+    "synergy": "Synergy",
+    "versatility": "Versatility",
+    "optimize": "Optimize",
+}
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Queued or running jobs whose report field shows no progress for this long
+# are treated as lost (message lost or poisoned, worker died, report reset)
+_JOB_STALE_AFTER = timedelta(minutes=15)
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def job_id(report_key: str, category: str) -> str:
+    """Get the id of the job analyzing a report's category."""
+    return f"{report_key}_{category}"
+
+
+def _get_job(job: str) -> Optional[dict]:
+    try:
+        return jobs_table.get_entity(partition_key=_JOB_PARTITION, row_key=job)
+    except ResourceNotFoundError:
+        return None
+
+
+def _report_value(report_key: str, field: str) -> Optional[str]:
+    try:
+        report = reports_table.get_entity(partition_key=PARTITION_KEY, row_key=report_key)
+    except ResourceNotFoundError:
+        return None
+    return report.get(field)
+
+
+def _is_stale(entity: dict) -> bool:
+    """Whether a job row has not been touched within _JOB_STALE_AFTER."""
+    touched = [datetime.fromisoformat(entity[key]) for key in ("Submitted", "Updated") if entity.get(key)]
+    if not touched:
+        return True
+    return datetime.now(timezone.utc) - max(touched) > _JOB_STALE_AFTER
+
+
+def _status(job: str, entity: dict, value: Optional[str]) -> dict:
+    """
+    Derive a job's status from its row and its report field.
+
+    A result or "loading" in the report field wins. Otherwise the row's own
+    status is reported, except that a queued or running row gone stale, or a
+    done row whose result was cleared (e.g. by the monthly report reset), is
+    reported as failed so the job can be submitted again.
+    """
+    status = {"jobId": job, "category": entity["Category"]}
+    row_status = entity.get("Status")
+    if value not in (None, "no", "loading"):
+        status.update(status=DONE, content=value)
+    elif value == "loading":
+        status["status"] = RUNNING
+    elif row_status == FAILED:
+        status.update(status=FAILED, error=entity.get("Error", ""))
+    elif row_status in (QUEUED, RUNNING) and not _is_stale(entity):
+        status["status"] = row_status
+    elif row_status == DONE:
+        status.update(status=FAILED, error="Result is no longer available; submit the job again")
+    else:
+        status.update(status=FAILED, error="Job was lost before it ran; submit the job again")
+    return status
+
+
+def submit_job(deck: str, category: str, body: dict) -> tuple[dict, Optional[str]]:
+    """
+    Submit an analysis job, reusing the existing job for the same deck and category.
+
+    Creates the deck's report if needed. A message is only enqueued when no
+    result exists and no job for the deck and category is queued or running
+    (stale jobs count as failed and are enqueued again).
+
+    Args:
+        deck: Deck string
+        category: Key of JOB_FIELDS
+        body: Request body (optimize reads the analysis scores from it)
+
+    Returns:
+        Tuple of (job status, queue message to enqueue or None)
+
+    Raises:
+        InvalidDeckError: If the deck fails validation
+    """
+    report_key, _ = ensure_report(deck)
+    job = job_id(report_key, category)
+    existing = _get_job(job)
+    value = _report_value(report_key, JOB_FIELDS[category])
+
+    if existing is not None:
+        status = _status(job, existing, value)
+        if status["status"] in (DONE, RUNNING, QUEUED):
+            return status, None
+
+    entity = {
+        "PartitionKey": _JOB_PARTITION,
+        "RowKey": job,
+        "ReportKey": report_key,
+        "Deck": deck,
+        "Category": category,
+        "Status": QUEUED,
+        "Error": "",
+        "Submitted": _now(),
+    }
+
+    # Already analyzed (e.g. pre-analyzed or by another user): no work needed
+    if value not in (None, "no", "loading"):
+        entity["Status"] = DONE
+        jobs_table.upsert_entity(entity)
+        return _status(job, entity, value), None
+
+    jobs_table.upsert_entity(entity)
+    message = json.dumps({"job_id": job, "deck": deck, "category": category, "body": body})
+    logging.info(f"Queued analysis job {job}")
+    return _status(job, entity, value), message
+
+
+def get_job_status(job: str) -> Optional[dict]:
+    """
+    Get a job's status, including its result when done.
+
+    Args:
+        job: Job id
+
+    Returns:
+        Status dict ("jobId", "category", "status" and "content" or "error"),
+        or None if the job does not exist
+    """
+    entity = _get_job(job)
+    if entity is None:
+        return None
+    return _status(job, entity, _report_value(entity["ReportKey"], JOB_FIELDS[entity["Category"]]))
+
+
+def set_job_status(job: str, status: str, error: str = "") -> None:
+    """Record a job's worker status (RUNNING or FAILED)."""
+    jobs_table.update_entity(
+        mode="merge",
+        entity={
+            "PartitionKey": _JOB_PARTITION,
+            "RowKey": job,
+            "Status": status,
+            "Error": error,
+            "Updated": _now(),
+        }
+    )
@@ -0,0 +1,113 @@
+"""
+Rule-based deck archetype classification.
+
+Decks are classified from their cards alone, without the model, so every
+crawled deck can be tagged when the deck view is built and analyses can be
+given their deck's archetype for free. The archetypes are the ones the
+Versatility rubric scores matchups against (and the frontend has icons for).
+
+Rules are checked in order and the first match wins: signature win
+conditions (Graveyard, Royal Giant, siege buildings, heavy tanks) decide
+first, then spell bait, then cheap cycle decks, then bridge pressure. Card
+roles come from shared/scoring and elixir costs from the card registry.
+"""
+from typing import Optional
+
+from shared.card_registry import get_registry, normalize_name
+from shared.scoring import BAIT, BRIDGE, SIEGE, card_roles
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+BEATDOWN = "Beatdown"
+BRIDGE_SPAM = "Bridge Spam"
+SIEGE_ARCHETYPE = "Siege"
+BAIT_ARCHETYPE = "Bait"
+CYCLE = "Cycle"
+ROYAL_GIANT = "Royal Giant"
+GRAVEYARD = "Graveyard"
+
+# Every archetype a deck can be classified as
+ARCHETYPES = (BEATDOWN, BRIDGE_SPAM, SIEGE_ARCHETYPE, BAIT_ARCHETYPE, CYCLE, ROYAL_GIANT, GRAVEYARD)
+
+# Tanks that make a deck beatdown (normalized names)
+_BEATDOWN_TANKS = frozenset(normalize_name(card) for card in (
+    "Golem", "Giant", "Lava Hound", "Electro Giant", "Goblin Giant",
+    "Elixir Golem", "Goblinstein", "Three Musketeers",
+))
+
+# Spell bait cards needed for a bait deck without Goblin Barrel
+_MIN_BAIT_CARDS = 3
+
+# Highest average elixir cost of a cycle deck
+_MAX_CYCLE_ELIXIR = 3.3
+
+# Bridge pressure cards needed for a bridge spam deck
+_MIN_BRIDGE_CARDS = 3
+
+# Average elixir cost from which an unmatched deck counts as beatdown
+_MIN_BEATDOWN_ELIXIR = 4.0
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _average_elixir(cards: list[str]) -> Optional[float]:
+    """Average elixir cost of the cards with a known cost."""
+    registry = get_registry()
+    costs = []
+    for card in cards:
+        card_id = registry.id_of(card)
+        if card_id is not None and registry.elixir_of(card_id) > 0:
+            costs.append(registry.elixir_of(card_id))
+    return sum(costs) / len(costs) if costs else None
+
+
+def _count_role(cards: list[str], role: str) -> int:
+    return sum(1 for card in cards if role in (card_roles(card) or ()))
+
+
+def classify_deck(cards: list[str]) -> Optional[str]:
+    """
+    Classify a deck into an archetype.
+
+    Args:
+        cards: Card names of the deck (any spelling)
+
+    Returns:
+        One of ARCHETYPES, or None if no rule matches
+    """
+    names = {normalize_name(card) for card in cards}
+
+    if "graveyard" in names:
+        return GRAVEYARD
+    if "royalgiant" in names:
+        return ROYAL_GIANT
+    if _count_role(cards, SIEGE):
+        return SIEGE_ARCHETYPE
+    if names & _BEATDOWN_TANKS:
+        return BEATDOWN
+    if "goblinbarrel" in names or _count_role(cards, BAIT) >= _MIN_BAIT_CARDS:
+        return BAIT_ARCHETYPE
+
+    average = _average_elixir(cards)
+    if average is not None and average <= _MAX_CYCLE_ELIXIR:
+        return CYCLE
+    if _count_role(cards, BRIDGE) >= _MIN_BRIDGE_CARDS:
+        return BRIDGE_SPAM
+    if average is not None and average >= _MIN_BEATDOWN_ELIXIR:
+        return BEATDOWN
+    return None
+
+
+def find_archetype(name: str) -> Optional[str]:
+    """
+    Match an archetype name in any spelling (e.g., "bridgespam", "royal-giant").
+
+    Returns:
+        The archetype from ARCHETYPES, or None if the name matches none
+    """
+    key = normalize_name(name)
+    return next((archetype for archetype in ARCHETYPES if normalize_name(archetype) == key), None)
@@ -0,0 +1,148 @@
+"""
+Streaming block-blob writer.
+
+BlockBlobWriter is a file-like object that buffers written text into fixed
+size blocks and stages each full block with stage_block while the caller
+keeps writing. Blocks are uploaded in parallel with a bound on how many are
+in flight, so memory stays constant however large the blob grows, and each
+block is retried on its own instead of restarting the whole upload. Closing
+the writer commits the block list, which atomically replaces the blob.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from azure.core.exceptions import AzureError
+from azure.storage.blob import BlobBlock, ContentSettings
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Size of each staged block (4 MiB)
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Blocks uploaded concurrently (also the number buffered in memory)
+MAX_IN_FLIGHT_BLOCKS = 4
+
+# Attempts per block before the upload fails
+_BLOCK_ATTEMPTS = 4
+
+# Initial backoff between block attempts (in seconds), doubled each retry
+_RETRY_BACKOFF = 0.5
+
+
+class BlockBlobWriter:
+    """
+    File-like writer that streams text or bytes to a block blob.
+
+    Usage:
+        with BlockBlobWriter(blob_client, content_type="text/csv") as stream:
+            csv.writer(stream).writerows(rows)
+
+    The blob is only replaced when the block list is committed on a clean
+    exit; if writing fails, the staged blocks are discarded by the service.
+    """
+
+    def __init__(
+        self,
+        blob_client: Any,
+        content_type: Optional[str] = None,
+        block_size: int = BLOCK_SIZE,
+        max_in_flight: int = MAX_IN_FLIGHT_BLOCKS
+    ) -> None:
+        self._blob = blob_client
+        self._content_type = content_type
+        self._block_size = block_size
+        self._buffer = bytearray()
+        self._block_ids: list[str] = []
+        self._pending: list[Future] = []
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._closed = False
+        self.bytes_written = 0
+
+    def write(self, data: str | bytes) -> int:
+        """Buffer text (UTF-8 encoded) or bytes, staging a block whenever the buffer is full."""
+        encoded = data.encode("utf-8") if isinstance(data, str) else data
+        self._buffer.extend(encoded)
+        self.bytes_written += len(encoded)
+        while len(self._buffer) >= self._block_size:
+            block = bytes(self._buffer[:self._block_size])
+            del self._buffer[:self._block_size]
+            self._stage(block)
+        return len(data)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def _stage(self, block: bytes) -> None:
+        """Submit a block for upload, waiting while too many are in flight."""
+        # Fixed-width ids: every id in a blob's block list must have the same length
+        block_id = f"{len(self._block_ids):08d}"
+        self._block_ids.append(block_id)
+
+        self._slots.acquire()
+        # Fail fast instead of streaming the rest of the blob after a block gave up
+        for future in self._pending:
+            if future.done() and future.exception() is not None:
+                self._slots.release()
+                raise future.exception()
+
+        future = self._pool.submit(self._stage_with_retry, block_id, block)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append(future)
+
+    def _stage_with_retry(self, block_id: str, block: bytes) -> None:
+        """Stage one block, retrying transient failures with exponential backoff."""
+        for attempt in range(1, _BLOCK_ATTEMPTS + 1):
+            try:
+                self._blob.stage_block(block_id=block_id, data=block, length=len(block))
+                return
+            except AzureError as e:
+                if attempt == _BLOCK_ATTEMPTS:
+                    raise
+                logging.warning(f"Staging block {block_id} failed (attempt {attempt}): {e}")
+                time.sleep(_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    def close(self) -> None:
+        """Stage the final partial block, wait for all uploads and commit the block list."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._buffer or not self._block_ids:
+                self._stage(bytes(self._buffer))
+                self._buffer.clear()
+
+            # Raises the first block failure, if any
+            for future in self._pending:
+                future.result()
+
+            content_settings = ContentSettings(content_type=self._content_type) if self._content_type else None
+            self._blob.commit_block_list(
+                [BlobBlock(block_id=block_id) for block_id in self._block_ids],
+                content_settings=content_settings
+            )
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "BlockBlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Leave the existing blob untouched; uncommitted blocks expire
+            self._closed = True
+            self._pool.shutdown(wait=True, cancel_futures=True)
@@ -23,6 +23,18 @@ decks = _service.get_blob_client(
     blob="decks.csv"
 )
 
+# Columnar snapshot of decks.csv (see deck_snapshot)
+decks_snapshot = _service.get_blob_client(
+    container=_CONTAINER_NAME,
+    blob="decks.arrow"
+)
+
+# Card co-occurrence / PMI matrix computed from decks.csv (see card_synergy)
+card_synergy = _service.get_blob_client(
+    container=_CONTAINER_NAME,
+    blob="card_synergy.npz"
+)
+
 features = _service.get_blob_client(
     container=_CONTAINER_NAME,
     blob="features.csv"
@@ -33,3 +45,36 @@ cards = _service.get_blob_client(
     blob="cards.csv"
 )
 
+# Every card id ever assigned (only grows; see card_registry)
+card_ids = _service.get_blob_client(
+    container=_CONTAINER_NAME,
+    blob="card_ids.csv"
+)
+
+
+
+def get_blob(blob_name: str):
+    """
+    Get a blob client for any blob in the deck data container.
+
+    Args:
+        blob_name: Blob path within the container (e.g., "crawl/<run>/0001.json")
+
+    Returns:
+        BlobClient for the blob
+    """
+    return _service.get_blob_client(container=_CONTAINER_NAME, blob=blob_name)
+
+
+def list_blob_names(prefix: str | None = None) -> list[str]:
+    """
+    List the names of the blobs in the deck data container.
+
+    Args:
+        prefix: Only list blobs whose name starts with this prefix
+
+    Returns:
+        Blob names
+    """
+    container = _service.get_container_client(_CONTAINER_NAME)
+    return [blob.name for blob in container.list_blobs(name_starts_with=prefix)]
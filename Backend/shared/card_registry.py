@@ -0,0 +1,491 @@
+"""
+Card registry mapping card names to compact integer ids.
+
+The registry is loaded from cards.csv: each card gets a small id and names
+are matched case-insensitively, ignoring punctuation and spacing, so
+"Mini P.E.K.K.A", "mini pekka" and "[Mini PEKKA" all resolve to the same card. A deck is represented canonically as the sorted tuple of its
+eight card ids, packed one byte per card into a 64-bit key, so equality,
+hashing and set operations on decks are integer operations and table keys are
+16 hex characters.
+
+Card ids are persisted in report and analysis cache keys and in the deck
+snapshot, so they must never change. Every id ever assigned is recorded in
+card_ids.csv, which only grows: a card keeps its id however cards.csv is
+reordered, new cards get the next free id, and ids of removed cards are
+never reused. If cards.csv gives a card_id column, it must agree with
+card_ids.csv, or loading the registry fails.
+"""
+import csv
+import difflib
+import io
+import logging
+import re
+import threading
+import time
+from typing import Iterable, Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from shared.blobs_utils import card_ids as card_ids_blob, cards as cards_blob
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Number of cards in a deck
+DECK_SIZE = 8
+
+# Bits per card id in a packed deck key (ids must be below 2**8)
+_ID_BITS = 8
+
+# Seconds before the registry is reloaded from cards.csv
+_REGISTRY_TTL_SECONDS = 3600
+
+# Attempts to record new card ids before giving up on a concurrent writer
+_ID_RECORD_RETRIES = 5
+
+# Characters ignored when matching card names
+_NAME_NOISE = re.compile(r"[^a-z0-9]")
+
+# Rarity of champion cards (at most _MAX_CHAMPIONS per deck)
+_CHAMPION_RARITY = "champion"
+_MAX_CHAMPIONS = 1
+
+# Close matches suggested for an unknown card name
+_SUGGESTIONS = 3
+_SUGGESTION_CUTOFF = 0.6
+
+
+class UnknownCardError(ValueError):
+    """Raised when a deck contains names that are not in the card registry."""
+
+    def __init__(self, unknown: list[str], suggestions: Optional[dict[str, list[str]]] = None) -> None:
+        self.unknown = unknown
+        self.suggestions = suggestions or {}
+        super().__init__(f"Unknown card(s): {', '.join(_describe(name, self.suggestions) for name in unknown)}")
+
+
+class InvalidDeckError(ValueError):
+    """Raised when a deck fails validation; lists every problem found."""
+
+    def __init__(self, problems: list[str]) -> None:
+        self.problems = problems
+        super().__init__("Invalid deck: " + "; ".join(problems))
+
+
+def _cost(value) -> float:
+    """Parse an elixir cost, treating missing or malformed values as 0."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _describe(name: str, suggestions: dict[str, list[str]]) -> str:
+    """Format an unknown card name with its suggestions."""
+    matches = suggestions.get(name)
+    return f"{name} (did you mean {' or '.join(matches)}?)" if matches else name
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def parse_deck(deck: str) -> list[str]:
+    """
+    Split a deck string into card names.
+
+    Args:
+        deck: Deck string (e.g., "[Hog Rider, Ice Spirit, ...]")
+
+    Returns:
+        Card names in the order given, brackets and whitespace removed
+    """
+    cleaned = deck.replace("[", "").replace("]", "")
+    return [c.strip() for c in cleaned.split(",") if c.strip()]
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a card name for lookup (lowercase, letters and digits only).
+
+    Args:
+        name: Card name in any spelling
+
+    Returns:
+        Lookup key (e.g., "Mini P.E.K.K.A" -> "minipekka")
+    """
+    return _NAME_NOISE.sub("", name.lower())
+
+
+class CardRegistry:
+    """Bidirectional mapping between card names and small integer ids."""
+
+    def __init__(self, cards: Iterable[str | tuple]) -> None:
+        """
+        Args:
+            cards: Card names, or (name, rarity[, elixir cost[, type[, id]]])
+                tuples; cards without an id get the next id in order
+
+        Raises:
+            ValueError: If an id is reused or does not fit a packed key
+        """
+        # Indexed by id; id 0 is reserved for "no card"
+        self._names: list[str] = [""]
+        self._rarities: list[str] = [""]
+        self._costs: list[float] = [0.0]
+        self._types: list[str] = [""]
+        self._ids: dict[str, int] = {}
+        for card in cards:
+            fields = (card,) if isinstance(card, str) else tuple(card)
+            name, rarity, cost, kind, card_id = fields + ("",) * (5 - len(fields))
+            key = normalize_name(name)
+            if not key or key in self._ids:
+                continue
+
+            card_id = int(card_id) if card_id not in (None, "") else len(self._ids) + 1
+            if not 0 < card_id < 2 ** _ID_BITS:
+                raise ValueError(f"Card id {card_id} of {name.strip()} is outside 1-255 (packed keys)")
+            if card_id < len(self._names) and self._names[card_id]:
+                raise ValueError(f"Card id {card_id} is given to both {self._names[card_id]} and {name.strip()}")
+
+            missing = card_id + 1 - len(self._names)
+            if missing > 0:
+                self._names += [""] * missing
+                self._rarities += [""] * missing
+                self._costs += [0.0] * missing
+                self._types += [""] * missing
+            self._ids[key] = card_id
+            self._names[card_id] = name.strip()
+            self._rarities[card_id] = (rarity or "").strip().lower()
+            self._costs[card_id] = _cost(cost)
+            self._types[card_id] = (kind or "").strip().lower()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def names(self) -> list[str]:
+        """Card names in id order."""
+        return [name for name in self._names[1:] if name]
+
+    def items(self) -> list[tuple[int, str]]:
+        """(card id, name) pairs in id order."""
+        return [(card_id, name) for card_id, name in enumerate(self._names) if name]
+
+    def id_of(self, name: str) -> Optional[int]:
+        """Get a card's id, or None if the name is unknown."""
+        return self._ids.get(normalize_name(name))
+
+    def name_of(self, card_id: int) -> str:
+        """Get a card's display name from its id."""
+        return self._names[card_id]
+
+    def elixir_of(self, card_id: int) -> float:
+        """Get a card's elixir cost (0.0 if cards.csv does not give one)."""
+        return self._costs[card_id]
+
+    def type_of(self, card_id: int) -> str:
+        """Get a card's type, lowercase (e.g., "troop", "spell", "building")."""
+        return self._types[card_id]
+
+    def encode(self, cards: Iterable[str]) -> tuple[int, ...]:
+        """
+        Convert card names into a canonical (sorted) tuple of ids.
+
+        Args:
+            cards: Card names in any order and spelling
+
+        Returns:
+            Sorted tuple of card ids
+
+        Raises:
+            UnknownCardError: If any name is not in the registry
+        """
+        ids = []
+        unknown = []
+        for name in cards:
+            card_id = self.id_of(name)
+            if card_id is None:
+                unknown.append(name)
+            else:
+                ids.append(card_id)
+        if unknown:
+            raise UnknownCardError(unknown, {name: self.suggest(name) for name in unknown})
+        return tuple(sorted(ids))
+
+    def suggest(self, name: str) -> list[str]:
+        """
+        Suggest registered cards for a misspelled name.
+
+        Args:
+            name: Unknown card name
+
+        Returns:
+            Display names of up to three close matches, best first
+        """
+        matches = difflib.get_close_matches(
+            normalize_name(name), self._ids.keys(), n=_SUGGESTIONS, cutoff=_SUGGESTION_CUTOFF
+        )
+        return [self._names[self._ids[match]] for match in matches]
+
+    def validate(self, cards: list[str]) -> tuple[int, ...]:
+        """
+        Validate a deck and convert it to its canonical id tuple.
+
+        Every check runs on the whole deck so one response lists all problems:
+        card count, unknown names (with suggestions), the same card given
+        twice (in any spelling) and more than one champion.
+
+        Args:
+            cards: Card names as given by the user
+
+        Returns:
+            Sorted tuple of card ids
+
+        Raises:
+            InvalidDeckError: If the deck fails any check
+        """
+        problems = []
+        if len(cards) != DECK_SIZE:
+            problems.append(f"deck must contain exactly {DECK_SIZE} cards, found {len(cards)}")
+
+        ids = [self.id_of(name) for name in cards]
+        unknown = [name for name, card_id in zip(cards, ids) if card_id is None]
+        if unknown:
+            suggestions = {name: self.suggest(name) for name in unknown}
+            problems.append("unknown card(s): " + ", ".join(_describe(name, suggestions) for name in unknown))
+
+        known = [card_id for card_id in ids if card_id is not None]
+        duplicates = sorted({card_id for card_id in known if known.count(card_id) > 1})
+        if duplicates:
+            problems.append("duplicate card(s): " + ", ".join(self.decode(duplicates)))
+
+        champions = sorted({card_id for card_id in known if self._rarities[card_id] == _CHAMPION_RARITY})
+        if len(champions) > _MAX_CHAMPIONS:
+            problems.append(
+                f"at most {_MAX_CHAMPIONS} champion allowed, found {len(champions)}: "
+                + ", ".join(self.decode(champions))
+            )
+
+        if problems:
+            raise InvalidDeckError(problems)
+        return tuple(sorted(known))
+
+    def decode(self, ids: Iterable[int]) -> list[str]:
+        """Convert card ids back into display names."""
+        return [self._names[card_id] for card_id in ids]
+
+    def deck_key(self, deck: str) -> str:
+        """
+        Get the table key of a deck string.
+
+        Args:
+            deck: Deck string (e.g., "[Hog Rider, Ice Spirit, ...]")
+
+        Returns:
+            16-character hexadecimal packed deck key
+
+        Raises:
+            UnknownCardError: If any card is not in the registry
+        """
+        return format_key(pack(self.encode(parse_deck(deck))))
+
+
+def pack(ids: tuple[int, ...]) -> int:
+    """
+    Pack a sorted tuple of up to eight card ids into a 64-bit integer.
+
+    Args:
+        ids: Sorted card ids
+
+    Returns:
+        Packed deck key
+    """
+    key = 0
+    for card_id in ids:
+        key = (key << _ID_BITS) | card_id
+    return key
+
+
+def unpack(key: int) -> tuple[int, ...]:
+    """
+    Unpack a 64-bit deck key into its sorted card ids.
+
+    Args:
+        key: Packed deck key
+
+    Returns:
+        Sorted tuple of card ids
+    """
+    mask = 2 ** _ID_BITS - 1
+    ids = []
+    while key:
+        ids.append(key & mask)
+        key >>= _ID_BITS
+    return tuple(reversed(ids))
+
+
+def format_key(key: int) -> str:
+    """Format a packed deck key as a fixed-width table key."""
+    return f"{key:0{DECK_SIZE * _ID_BITS // 4}x}"
+
+
+# ---------------------------------------------------------------------------
+# Registry Loading
+# ---------------------------------------------------------------------------
+
+_registry: Optional[CardRegistry] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def load_registry(csv_bytes: bytes, assigned: Optional[dict[str, int]] = None) -> CardRegistry:
+    """
+    Build a registry from the contents of cards.csv.
+
+    Cards keep the id they were assigned before (see card_ids.csv); cards
+    never seen get the next free ids, in row order.
+
+    Args:
+        csv_bytes: CSV with card_name, rarity, elixer_cost and type columns,
+            and optionally card_id
+        assigned: Normalized card name -> id assigned so far
+
+    Returns:
+        Card registry
+
+    Raises:
+        ValueError: If a card_id given by cards.csv disagrees with the id the
+            card was assigned, or the column is present but a row lacks an id
+    """
+    assigned = assigned or {}
+    reader = csv.DictReader(io.StringIO(csv_bytes.decode("utf-8")))
+    explicit = "card_id" in (reader.fieldnames or ())
+    rows = [row for row in reader if normalize_name(row.get("card_name") or "")]
+    if explicit:
+        missing = [row["card_name"] for row in rows if not (row.get("card_id") or "").strip()]
+        if missing:
+            raise ValueError(f"cards.csv rows without a card_id: {', '.join(missing)}")
+
+    owners = {card_id: key for key, card_id in assigned.items()}
+    ids: dict[str, int] = {}
+    conflicts = []
+    for row in rows:
+        key = normalize_name(row["card_name"])
+        given = int(row["card_id"]) if explicit else None
+        # A given id must be the card's own and not belong to another card
+        if given is not None and (given != assigned.get(key, given) or owners.get(given, key) != key):
+            conflicts.append(f"{row['card_name'].strip()} (cards.csv {given}, assigned {assigned.get(key)})")
+        ids.setdefault(key, assigned.get(key, given))
+    if conflicts:
+        raise ValueError(f"cards.csv card ids disagree with card_ids.csv: {', '.join(conflicts)}")
+
+    # Ids are never reused, even for cards removed from cards.csv
+    next_id = max([*assigned.values(), *(i for i in ids.values() if i is not None), 0]) + 1
+    for key, card_id in ids.items():
+        if card_id is None:
+            ids[key] = next_id
+            next_id += 1
+
+    return CardRegistry(
+        (
+            row["card_name"], row.get("rarity", ""), row.get("elixer_cost", ""), row.get("type", ""),
+            ids[normalize_name(row["card_name"])],
+        )
+        for row in rows
+    )
+
+
+def _read_card_ids() -> tuple[dict[str, tuple[int, str]], Optional[str]]:
+    """
+    Read every card id assigned so far.
+
+    Returns:
+        Tuple of (normalized name -> (id, name), blob etag); ({}, None) if
+        no id has been recorded yet
+    """
+    try:
+        download = card_ids_blob.download_blob()
+    except ResourceNotFoundError:
+        return {}, None
+
+    reader = csv.DictReader(io.StringIO(download.readall().decode("utf-8")))
+    assigned = {normalize_name(row["card_name"]): (int(row["card_id"]), row["card_name"]) for row in reader}
+    return assigned, download.properties.etag
+
+
+def _write_card_ids(assigned: dict[str, tuple[int, str]], etag: Optional[str]) -> None:
+    """
+    Record the assigned card ids, failing if another process changed them.
+
+    Raises:
+        ResourceExistsError: If the blob was created concurrently
+        ResourceModifiedError: If the blob was modified concurrently
+    """
+    stream = io.StringIO()
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(["card_id", "card_name"])
+    writer.writerows(sorted(assigned.values()))
+    data = stream.getvalue().encode("utf-8")
+
+    if etag is None:
+        card_ids_blob.upload_blob(data, overwrite=False)
+    else:
+        card_ids_blob.upload_blob(data, overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)
+
+
+def _sync_registry() -> CardRegistry:
+    """
+    Load cards.csv with the persisted card ids, recording ids of new cards.
+
+    The first load records the ids of the current cards.csv in row order,
+    which are the ids every key was built with before card_ids.csv existed.
+
+    Returns:
+        Card registry whose ids agree with card_ids.csv
+
+    Raises:
+        ValueError: If cards.csv disagrees with card_ids.csv
+        RuntimeError: If new ids could not be recorded
+    """
+    csv_bytes = cards_blob.download_blob().readall()
+
+    for _ in range(_ID_RECORD_RETRIES):
+        assigned, etag = _read_card_ids()
+        registry = load_registry(csv_bytes, {key: card_id for key, (card_id, _) in assigned.items()})
+
+        new = {normalize_name(name): (card_id, name) for card_id, name in registry.items()}
+        new = {key: entry for key, entry in new.items() if key not in assigned}
+        if not new:
+            return registry
+
+        try:
+            _write_card_ids({**assigned, **new}, etag)
+        except (ResourceExistsError, ResourceModifiedError):
+            continue
+        logging.info(f"Recorded card ids of {len(new)} new card(s): {', '.join(n for _, n in new.values())}")
+        return registry
+
+    raise RuntimeError("Could not record card ids: card_ids.csv modified concurrently")
+
+
+def get_registry() -> CardRegistry:
+    """
+    Get the process-wide card registry, loading cards.csv on first use.
+
+    Raises (and keeps raising on every call) if cards.csv disagrees with
+    the persisted card ids, rather than serving ids that would resolve
+    stored keys to the wrong decks.
+
+    Returns:
+        The card registry (reloaded at most once per _REGISTRY_TTL_SECONDS)
+    """
+    global _registry, _loaded_at
+
+    with _lock:
+        if _registry is None or time.monotonic() - _loaded_at > _REGISTRY_TTL_SECONDS:
+            _registry = _sync_registry()
+            _loaded_at = time.monotonic()
+        return _registry
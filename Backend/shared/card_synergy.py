@@ -0,0 +1,259 @@
+"""
+Card synergy matrix precomputed from the crawled decks.
+
+Every deck refresh publishes card_synergy.npz next to decks.csv: for every
+pair of cards, the score-weighted co-occurrence across the published decks
+and its pointwise mutual information (PMI),
+
+    PMI(a, b) = log(P(a, b) / (P(a) * P(b)))
+
+where the probabilities are shares of the total deck score. Lift is exp(PMI):
+above 1 (PMI above 0) the pair is run together more often than the two cards'
+popularity alone explains. Pairs never seen together have no PMI (NaN).
+
+Matrices are stored as float32 in a compressed NumPy archive, indexed by
+position in the "card_ids" array. Readers load the archive into memory once
+per _SYNERGY_TTL_SECONDS and answer pair lookups with array indexing.
+"""
+import io
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import combinations
+from typing import Optional
+
+import numpy as np
+
+from shared.blobs_utils import card_synergy
+from shared.card_registry import normalize_name
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Seconds before the matrix is downloaded again
+_SYNERGY_TTL_SECONDS = 3600
+
+# Seconds before a failed download is retried
+_SYNERGY_RETRY_SECONDS = 30
+
+# Partners returned per card when no limit is given
+DEFAULT_PARTNERS = 10
+
+
+class CardSynergy:
+    """Card-pair co-occurrence and PMI loaded from card_synergy.npz."""
+
+    def __init__(self, card_ids: np.ndarray, card_names: np.ndarray, frequency: np.ndarray,
+                 cooccurrence: np.ndarray, pmi: np.ndarray, created: str = "") -> None:
+        """
+        Args:
+            card_ids: Clash Royale API id of each row/column
+            card_names: Card name of each row/column
+            frequency: Share of the total deck score of decks running each card
+            cooccurrence: Share of the total deck score of decks running each pair
+            pmi: PMI of each pair (NaN where the pair was never seen)
+            created: UTC timestamp of the refresh that computed the matrix
+        """
+        self.card_ids = card_ids
+        self.card_names = card_names
+        self.frequency = frequency
+        self.cooccurrence = cooccurrence
+        self.pmi = pmi
+        self.created = created
+        self._positions = {normalize_name(str(name)): i for i, name in enumerate(card_names)}
+
+    def position(self, card: str) -> Optional[int]:
+        """Row of a card by name (any spelling), or None if it was never played."""
+        return self._positions.get(normalize_name(card))
+
+    def _entry(self, a: int, b: int) -> dict:
+        pmi = float(self.pmi[a, b])
+        return {
+            "card": str(self.card_names[b]),
+            "cooccurrence": round(float(self.cooccurrence[a, b]), 6),
+            "pmi": None if math.isnan(pmi) else round(pmi, 4),
+            "lift": None if math.isnan(pmi) else round(math.exp(pmi), 4),
+        }
+
+    def partners(self, card: str, limit: int = DEFAULT_PARTNERS) -> Optional[list[dict]]:
+        """
+        Get the cards with the highest PMI with a card.
+
+        Args:
+            card: Card name
+            limit: Maximum partners returned
+
+        Returns:
+            Partner entries ("card", "cooccurrence", "pmi", "lift"), highest
+            PMI first, or None if the card was never played
+        """
+        row = self.position(card)
+        if row is None:
+            return None
+        pmi = np.nan_to_num(self.pmi[row], nan=-np.inf)
+        seen = np.flatnonzero(np.isfinite(pmi))
+        best = seen[np.argsort(-pmi[seen], kind="stable")][:limit]
+        return [self._entry(row, int(column)) for column in best]
+
+    def deck_pairs(self, cards: list[str]) -> list[dict]:
+        """
+        Get the synergy of every pair of cards in a deck.
+
+        Args:
+            cards: Card names of the deck
+
+        Returns:
+            Pair entries ("cards", "cooccurrence", "pmi", "lift"), highest PMI
+            first and unseen pairs last; cards never played are skipped
+        """
+        rows = [(card, self.position(card)) for card in cards]
+        pairs = []
+        for (card_a, a), (card_b, b) in combinations([entry for entry in rows if entry[1] is not None], 2):
+            entry = self._entry(a, b)
+            entry["cards"] = [card_a, card_b]
+            del entry["card"]
+            pairs.append(entry)
+        pairs.sort(key=lambda entry: -math.inf if entry["pmi"] is None else entry["pmi"], reverse=True)
+        return pairs
+
+
+# ---------------------------------------------------------------------------
+# Matrix Computation (deck refresh)
+# ---------------------------------------------------------------------------
+
+def compute_synergy(sorted_decks: list[dict]) -> CardSynergy:
+    """
+    Compute the synergy matrix of the published decks.
+
+    Args:
+        sorted_decks: Deck rows (see deck_store.build_view)
+
+    Returns:
+        Synergy matrix over every card id seen in the rows, weighted by deck score
+    """
+    names = {}
+    for row in sorted_decks:
+        names.update(
+            (card_id, name)
+            for card_id, name in zip(row.get("card_ids") or [], row["cards"].split("; "))
+            if card_id is not None
+        )
+    card_ids = np.array(sorted(names), dtype=np.int32)
+    column = {card_id: i for i, card_id in enumerate(card_ids.tolist())}
+    size = len(card_ids)
+
+    cooccurrence = np.zeros((size, size))
+    frequency = np.zeros(size)
+    total = 0.0
+    for row in sorted_decks:
+        weight = max(float(row["score"]), 0.0)
+        columns = sorted({column[card_id] for card_id in row.get("card_ids") or [] if card_id is not None})
+        if not weight or not columns:
+            continue
+        frequency[columns] += weight
+        cooccurrence[np.ix_(columns, columns)] += weight
+        total += weight
+
+    np.fill_diagonal(cooccurrence, 0.0)
+    if total:
+        frequency /= total
+        cooccurrence /= total
+
+    expected = np.outer(frequency, frequency)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pmi = np.where(cooccurrence > 0, np.log(cooccurrence / expected), np.nan)
+
+    return CardSynergy(
+        card_ids,
+        np.array([names[card_id] for card_id in card_ids.tolist()], dtype=str),
+        frequency.astype(np.float32),
+        cooccurrence.astype(np.float32),
+        pmi.astype(np.float32),
+        datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def upload_synergy(sorted_decks: list[dict]) -> None:
+    """
+    Compute the synergy matrix and upload it to card_synergy.npz in Azure Blob Storage.
+
+    Args:
+        sorted_decks: Deck rows (see deck_store.build_view)
+    """
+    synergy = compute_synergy(sorted_decks)
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        card_ids=synergy.card_ids,
+        card_names=synergy.card_names,
+        frequency=synergy.frequency,
+        cooccurrence=synergy.cooccurrence,
+        pmi=synergy.pmi,
+        created=np.array(synergy.created),
+    )
+
+    data = buffer.getvalue()
+    card_synergy.upload_blob(data, overwrite=True)
+
+    logging.info(f"Uploaded card_synergy.npz to blob storage ({len(synergy.card_ids)} cards, {len(data)} bytes)")
+
+
+# ---------------------------------------------------------------------------
+# Matrix Loading
+# ---------------------------------------------------------------------------
+
+def read_synergy(data: bytes) -> CardSynergy:
+    """
+    Open a synergy archive.
+
+    Args:
+        data: Contents of card_synergy.npz
+
+    Returns:
+        Synergy matrix
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        return CardSynergy(
+            archive["card_ids"],
+            archive["card_names"],
+            archive["frequency"],
+            archive["cooccurrence"],
+            archive["pmi"],
+            str(archive["created"]),
+        )
+
+
+_synergy: Optional[CardSynergy] = None
+_loaded_at = 0.0
+_failed_at = 0.0
+_lock = threading.Lock()
+
+
+def get_synergy() -> Optional[CardSynergy]:
+    """
+    Get the process-wide synergy matrix, downloading it on first use.
+
+    Only successful downloads are cached. A failed download keeps the
+    previous matrix (if any) and is retried after _SYNERGY_RETRY_SECONDS.
+
+    Returns:
+        The synergy matrix (downloaded at most once per _SYNERGY_TTL_SECONDS),
+        or None if no refresh has published it yet
+    """
+    global _synergy, _loaded_at, _failed_at
+
+    with _lock:
+        now = time.monotonic()
+        stale = _loaded_at == 0.0 or now - _loaded_at > _SYNERGY_TTL_SECONDS
+        if stale and (_failed_at == 0.0 or now - _failed_at > _SYNERGY_RETRY_SECONDS):
+            try:
+                _synergy = read_synergy(card_synergy.download_blob().readall())
+                _loaded_at, _failed_at = now, 0.0
+                logging.info(f"Loaded card synergy matrix ({len(_synergy.card_ids)} cards)")
+            except Exception as e:
+                logging.warning(f"Card synergy matrix unavailable: {e}")
+                _failed_at = now
+        return _synergy
@@ -2,17 +2,24 @@
 Clash Royale API utilities for fetching player and deck data.
 
 This module provides functions to interact with the Clash Royale API,
-including fetching top clans, clan members, player data, and processing
-deck information for storage.
+including fetching top clans, clan members, player data, and merging each
+crawl into the persistent deck store (see deck_store).
 """
 import os
 import csv
+import logging
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
-from datetime import datetime
-from io import StringIO
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from .blob_writer import BlockBlobWriter
 from .blobs_utils import decks
+from .card_synergy import upload_synergy
+from .deck_snapshot import upload_snapshot
+from .deck_store import add_to_delta, build_view, merge_delta, parse_card_ids
+from .player_state import build_player_state, is_unchanged, load_player_states, save_player_states
 
 # Clash Royale API key from environment variable
 _CLASH_ROYALE_KEY = os.getenv("CLASH_ROYALE_KEY")
@@ -29,6 +36,9 @@ _LOCATION_ID = 57000006
 # Delay between player API calls (in seconds)
 PLAYER_DELAY = 0.2
 
+# Maximum player fetches per crawl; remaining changed players wait for the next run
+MAX_PLAYER_FETCHES = int(os.getenv("CRAWL_MAX_PLAYER_FETCHES", "500"))
+
 # Sleep duration when rate limited (in seconds)
 _RATE_LIMIT_SLEEP = 5
 
@@ -67,18 +77,33 @@ def fetch_json(url: str, retry_pause: int = 5) -> dict | None:
             time.sleep(retry_pause)
 
 
-def get_top_clans() -> list[dict]:
+def get_top_clans(location_id: int = _LOCATION_ID, limit: int = _TOP_CLANS) -> list[dict]:
     """
-    Fetch the top clans from the global rankings.
+    Fetch the top clans of a location's rankings.
+    
+    Args:
+        location_id: Location to rank clans in (default: global)
+        limit: Number of clans to fetch (default: 10)
     
     Returns:
         List of clan dictionaries, or empty list if fetch fails
     """
-    url = f"{_BASE_URL}/locations/{_LOCATION_ID}/rankings/clans?limit={_TOP_CLANS}"
+    url = f"{_BASE_URL}/locations/{location_id}/rankings/clans?limit={limit}"
     data = fetch_json(url)
     return data.get("items", []) if data else []
 
 
+def get_locations() -> list[dict]:
+    """
+    Fetch every location that has clan rankings (countries and regions).
+    
+    Returns:
+        List of location dictionaries, or empty list if fetch fails
+    """
+    data = fetch_json(f"{_BASE_URL}/locations")
+    return data.get("items", []) if data else []
+
+
 def get_clan_members(clan_tag: str) -> list[dict]:
     """
     Fetch all members of a clan by clan tag.
@@ -110,64 +135,215 @@ def get_player_data(player_tag: str) -> dict | None:
     return fetch_json(url)
 
 
-def process_player_deck(player_data: dict, deck_dict: dict, deck_id_counter: int) -> int:
+def process_player_deck(player_data: dict, delta: dict) -> str | None:
     """
-    Process a player's current deck and update the deck dictionary.
-    
-    Increments the score for existing decks or creates a new entry.
-    Returns the updated deck_id_counter.
+    Count a player's current deck in the crawl delta.
     
     Args:
         player_data: Player data dictionary from API
-        deck_dict: Dictionary mapping deck sets to deck information
-        deck_id_counter: Current counter for assigning deck IDs
+        delta: Crawl delta mapping deck hash to deck data (see deck_store)
     
     Returns:
-        Updated deck_id_counter
+        The deck hash, or None if the player has no current deck
     """
-    deck_cards = [c["name"] for c in player_data.get("currentDeck", [])]
+    current_deck = player_data.get("currentDeck", [])
+    deck_cards = [c["name"] for c in current_deck]
 
     if not deck_cards:
-        return deck_id_counter
+        return None
 
-    deck_key = frozenset(deck_cards)
+    return add_to_delta(delta, deck_cards, [c.get("id") for c in current_deck])
 
-    if deck_key in deck_dict:
-        deck_dict[deck_key]["score"] += 1
-        deck_dict[deck_key]["last_entry"] = datetime.now()
-    else:
-        deck_dict[deck_key] = {
-            "deck_id": deck_id_counter,
-            "cards": "; ".join(deck_cards),
-            "score": 1,
-            "last_entry": datetime.now(),
-        }
-        deck_id_counter += 1
 
-    return deck_id_counter
+def collect_members(clan_tags: list[str], max_workers: int = 1) -> list[dict]:
+    """
+    Fetch the member lists of the given clans, dropping duplicates and members without a tag.
+    
+    Args:
+        clan_tags: Clan tags (e.g., "#ABC123")
+        max_workers: Number of clans fetched concurrently
+    
+    Returns:
+        List of member dictionaries
+    """
+    members_by_tag = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for clan_tag, members in zip(clan_tags, pool.map(get_clan_members, clan_tags)):
+            if not members:
+                logging.info(f"No members found for clan: {clan_tag}")
+                continue
+
+            logging.info(f"Found {len(members)} members in clan {clan_tag}")
+            for member in members:
+                if member.get("tag"):
+                    members_by_tag[member["tag"]] = member
+
+    return list(members_by_tag.values())
+
+
+def crawl_members(
+    members: list[dict],
+    states: dict[str, dict],
+    max_fetches: int | None = None,
+    max_workers: int = 1
+) -> dict:
+    """
+    Build a crawl delta from clan members, fetching only players who changed.
+    
+    Players who have played since their last fetch (per the lastSeen field of
+    the clan member list) are fetched, most recently active first and up to
+    max_fetches. Every other player with a known deck is counted with that
+    remembered deck, so scores stay comparable between runs. Fetched players
+    have their crawl state saved.
+    
+    Args:
+        members: Member dictionaries from the clan member lists
+        states: Stored crawl state by player tag (see player_state)
+        max_fetches: Maximum player fetches (None = no limit)
+        max_workers: Number of players fetched concurrently
+    
+    Returns:
+        Crawl delta mapping deck hash to deck data
+    """
+    delta = {}
+    to_fetch = []
+    for member in members:
+        state = states.get(member["tag"])
+        if is_unchanged(state, member):
+            add_to_delta(delta, state["DeckCards"].split("; "), _card_ids(state))
+        else:
+            to_fetch.append(member)
+
+    # Most recently active players are the most likely to have changed decks
+    to_fetch.sort(key=lambda m: m.get("lastSeen", ""), reverse=True)
+    deferred = to_fetch[max_fetches:] if max_fetches is not None else []
+    to_fetch = to_fetch[:max_fetches] if max_fetches is not None else to_fetch
 
+    for member in deferred:
+        state = states.get(member["tag"])
+        if state and state.get("DeckCards"):
+            add_to_delta(delta, state["DeckCards"].split("; "), _card_ids(state))
 
-def upload_decks(sorted_decks: list[dict]) -> None:
+    logging.info(
+        f"Fetching {len(to_fetch)} of {len(members)} players "
+        f"({len(members) - len(to_fetch) - len(deferred)} unchanged, {len(deferred)} deferred)"
+    )
+
+    def _fetch(member: dict) -> dict | None:
+        player_data = get_player_data(member["tag"])
+        time.sleep(PLAYER_DELAY)
+        return player_data
+
+    updated_states = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for member, player_data in zip(to_fetch, pool.map(_fetch, to_fetch)):
+            if not player_data:
+                logging.debug(f"Could not fetch data for player: {member['tag']}")
+                continue
+
+            current_deck = player_data.get("currentDeck", [])
+            deck_hash = process_player_deck(player_data, delta)
+            updated_states.append(build_player_state(
+                member["tag"],
+                member,
+                deck_hash,
+                [c["name"] for c in current_deck],
+                [c.get("id") for c in current_deck],
+                datetime.now(timezone.utc)
+            ))
+
+    save_player_states(updated_states)
+    return delta
+
+
+def crawl_top_clans() -> dict | None:
     """
-    Upload sorted deck data to Azure Blob Storage as a CSV file.
+    Crawl the current decks of every member of the global top clans.
+    
+    Runs in a single invocation; see crawl_runs for the sharded crawl over
+    many locations.
+    
+    Returns:
+        Crawl delta mapping deck hash to deck data, or None if no clan
+        data could be fetched
+    """
+    clans = get_top_clans()
+    if not clans:
+        logging.warning("No clan data found.")
+        return None
+
+    logging.info(f"Found {len(clans)} top clans to process")
+
+    members = collect_members([clan.get("tag", "") for clan in clans])
+    delta = crawl_members(members, load_player_states(), max_fetches=MAX_PLAYER_FETCHES)
+
+    logging.info(f"Crawled {len(delta)} unique decks")
+    return delta
+
+
+def _card_ids(state: dict) -> list[Optional[int]]:
+    """Card ids stored on a player state entity, aligned with DeckCards."""
+    return parse_card_ids(state.get("DeckCardIds"))
+
+
+def upload_decks(sorted_decks: Iterable[dict]) -> None:
+    """
+    Stream sorted deck data to Azure Blob Storage as a CSV file.
+    
+    Rows are written into staged blocks as they are produced, so the upload
+    buffer does not grow with the number of decks (see blob_writer). The
+    rows themselves are still held by the caller (see refresh_deck_store).
     
     Args:
-        sorted_decks: List of deck dictionaries sorted by score
+        sorted_decks: Deck rows sorted by score (see deck_store.build_view)
     """
-    csv_buffer = StringIO()
-    writer = csv.writer(csv_buffer)
+    with BlockBlobWriter(decks, content_type="text/csv") as stream:
+        writer = csv.writer(stream)
 
-    # Write header
-    writer.writerow(["deck_id", "cards", "score", "last_entry"])
+        # Write header
+        writer.writerow(["deck_id", "cards", "score", "last_entry", "first_seen", "runs", "last_run_count", "archetype"])
 
-    # Write rows
-    for deck in sorted_decks:
-        writer.writerow([
-            deck["deck_id"],
-            deck["cards"],
-            deck["score"],
-            deck["last_entry"].isoformat()  # convert datetime to string
-        ])
+        # Write rows
+        for deck in sorted_decks:
+            writer.writerow([
+                deck["deck_id"],
+                deck["cards"],
+                deck["score"],
+                deck["last_entry"].isoformat(),  # convert datetime to string
+                deck["first_seen"].isoformat(),
+                deck["runs"],
+                deck["last_run_count"],
+                deck.get("archetype") or ""
+            ])
+
+    print(f"Uploaded decks.csv to blob storage ({stream.bytes_written} bytes)")
+
+
+def refresh_deck_store() -> int | None:
+    """
+    Crawl the top clans, merge the run into the deck store and publish decks.csv.
+    
+    The whole store and its sorted view are held in memory: the view is
+    sorted by decayed score and published three times (decks.csv, snapshot,
+    synergy). Memory therefore grows with the number of stored decks; only
+    the decks.csv upload buffer is bounded (see upload_decks).
+    
+    Returns:
+        Number of decks published, or None if no clan data was found
+    """
+    delta = crawl_top_clans()
+    if delta is None:
+        return None
+
+    store = merge_delta(delta)
+    sorted_decks = build_view(store)
+
+    if sorted_decks:
+        upload_decks(sorted_decks)
+        upload_snapshot(sorted_decks)
+        upload_synergy(sorted_decks)
+        logging.info(f"Successfully uploaded {len(sorted_decks)} decks to blob storage")
+    else:
+        logging.warning("No decks to upload")
 
-    decks.upload_blob(csv_buffer.getvalue(), overwrite=True)
-    print("Uploaded decks.csv to blob storage")
+    return len(sorted_decks)
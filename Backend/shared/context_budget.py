@@ -0,0 +1,152 @@
+"""
+Token-budgeted assembly of retrieved context.
+
+Analyses retrieve up to k chunks from each of a dozen namespaces, and many
+of those chunks overlap (the same card fact ingested into several
+namespaces, or neighbouring chunks of one document). The assembler ranks
+every retrieved chunk by similarity score, drops near-duplicates of chunks
+already kept, and stops adding chunks to a namespace, or to the context as a
+whole, once its token budget is spent. Prompt size then stays bounded as the
+knowledge base grows.
+
+Budgets are counted with the model tokenizer (tiktoken, o200k_base). If the
+encoding cannot be loaded (it is downloaded on first use), tokens are
+estimated from the text length instead.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from shared.telemetry import record_context_tokens, span
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Maximum tokens of context sent with one request
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Maximum tokens of context from any one namespace
+NAMESPACE_TOKEN_BUDGET = int(os.getenv("NAMESPACE_TOKEN_BUDGET", "600"))
+
+# Word-shingle overlap (Jaccard) at which two chunks count as duplicates
+_DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.8"))
+
+# Words per shingle when comparing chunks
+_SHINGLE_SIZE = 3
+
+# Tokenizer of the gpt-4o / gpt-5 model family
+_ENCODING = "o200k_base"
+
+# Characters per token when the tokenizer is unavailable
+_CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"\w+")
+
+
+class Chunk(NamedTuple):
+    """A retrieved chunk of text."""
+    namespace: str
+    text: str
+    score: float
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[object]:
+    """Load the tokenizer once; None if it cannot be loaded."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(_ENCODING)
+    except Exception as e:
+        logging.warning(f"Tokenizer {_ENCODING} unavailable, estimating context tokens: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text (estimated if the tokenizer is unavailable)."""
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _shingles(text: str) -> frozenset:
+    """Word shingles of a text, ignoring case and punctuation."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= _SHINGLE_SIZE:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1))
+
+
+def _is_duplicate(shingles: frozenset, kept: list[frozenset]) -> bool:
+    for other in kept:
+        if len(shingles & other) >= _DUPLICATE_SIMILARITY * len(shingles | other):
+            return True
+    return False
+
+
+def assemble_context(
+    chunks: list[Chunk],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    namespace_budget: int = NAMESPACE_TOKEN_BUDGET
+) -> str:
+    """
+    Build the context string from retrieved chunks within token budgets.
+
+    Chunks are taken best score first; a chunk is skipped if it nearly
+    duplicates a kept chunk (in any namespace) or does not fit the remaining
+    budget of its namespace or of the context. Kept chunks are grouped by
+    namespace, in the order the namespaces were retrieved, as:
+    "Namespace:\\n*text1\\n*text2..."
+
+    Args:
+        chunks: Retrieved chunks, in retrieval order
+        budget: Maximum tokens overall
+        namespace_budget: Maximum tokens per namespace
+
+    Returns:
+        Formatted context string, or empty string if nothing was kept
+    """
+    with span("context_assembly", chunks=len(chunks)) as attrs:
+        order = list(dict.fromkeys(chunk.namespace for chunk in chunks))
+        kept = {namespace: [] for namespace in order}
+        kept_shingles = []
+        namespace_tokens = dict.fromkeys(order, 0)
+        total = trimmed = 0
+
+        for chunk in sorted(chunks, key=lambda chunk: chunk.score, reverse=True):
+            # "*text\n" per chunk, plus the namespace header for its first one
+            tokens = count_tokens(chunk.text) + 2
+            if not kept[chunk.namespace]:
+                tokens += count_tokens(chunk.namespace) + 2
+
+            shingles = _shingles(chunk.text)
+            if (
+                _is_duplicate(shingles, kept_shingles)
+                or namespace_tokens[chunk.namespace] + tokens > namespace_budget
+                or total + tokens > budget
+            ):
+                trimmed += tokens
+                continue
+
+            kept[chunk.namespace].append(chunk.text)
+            kept_shingles.append(shingles)
+            namespace_tokens[chunk.namespace] += tokens
+            total += tokens
+
+        attrs["kept"] = len(kept_shingles)
+        attrs["tokens"] = total
+
+    record_context_tokens(total, trimmed)
+    logging.info(f"Context: kept {len(kept_shingles)} of {len(chunks)} chunks, ~{total} tokens ({trimmed} trimmed)")
+
+    return "\n\n".join(
+        f"{namespace}:\n" + "\n".join(f"*{text}" for text in texts)
+        for namespace, texts in kept.items() if texts
+    )
@@ -0,0 +1,427 @@
+"""
+Sharded, resumable deck crawl.
+
+A crawl run covers the top clans of many locations. The coordinator plans
+the run: it collects clan tags, splits them into shards and records the run
+and its shards in the "crawlruns" table (one partition per run). One queue
+message is sent per shard; queue-triggered workers crawl their shard's
+members in parallel and checkpoint the result as a delta blob before marking
+the shard done. The worker that completes the last shard finalizes the run:
+it merges every shard delta into the deck store, publishes decks.csv and
+deletes the run's entities and delta blobs.
+
+Because progress is checkpointed per shard, a failed or timed-out worker only
+loses its own shard. Queue retries re-run it, and resume_runs() re-enqueues
+shards that stalled and finalizes runs whose workers died before finishing.
+"""
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+
+from shared.blobs_utils import get_blob
+from shared.clash_royale_utils import (
+    collect_members,
+    crawl_members,
+    get_locations,
+    get_top_clans,
+    upload_decks
+)
+from shared.card_synergy import upload_synergy
+from shared.deck_snapshot import upload_snapshot
+from shared.deck_store import add_to_delta, build_view, merge_delta
+from shared.player_state import get_player_states
+from shared.table_utils import crawl_runs_table
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Maximum clans crawled per run (about 50 members each)
+MAX_CLANS = int(os.getenv("CRAWL_MAX_CLANS", "400"))
+
+# Top clans taken from each location's rankings
+_CLANS_PER_LOCATION = 20
+
+# Clans per shard (one queue message / worker invocation each)
+_CLANS_PER_SHARD = 5
+
+# Storage queue carrying one message per shard
+CRAWL_QUEUE = "crawl-shards"
+
+# Concurrent API requests within a coordinator or shard worker
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "8"))
+
+# Partition holding one entity per run
+_RUNS_PARTITION = "Run"
+
+# Shards not completed after this long are re-enqueued by resume_runs
+_SHARD_STALE_AFTER = timedelta(minutes=30)
+
+# Shards that failed this many times are given up on
+_MAX_SHARD_ATTEMPTS = 5
+
+# Run statuses
+RUNNING = "running"
+FINALIZING = "finalizing"
+FINALIZED = "finalized"
+
+# Attempts at an optimistic-concurrency update before giving up
+_UPDATE_RETRIES = 10
+
+
+# ---------------------------------------------------------------------------
+# Coordinator
+# ---------------------------------------------------------------------------
+
+def plan_clan_tags(max_clans: int = MAX_CLANS) -> list[str]:
+    """
+    Collect clan tags from the global and per-location rankings.
+
+    Args:
+        max_clans: Maximum number of clans to return
+
+    Returns:
+        Distinct clan tags, global top clans first
+    """
+    location_ids = [None] + [
+        location["id"]
+        for location in get_locations()
+        if location.get("isCountry")
+    ]
+
+    def _clans(location_id: Optional[int]) -> list[dict]:
+        if location_id is None:
+            return get_top_clans(limit=_CLANS_PER_LOCATION)
+        return get_top_clans(location_id, limit=_CLANS_PER_LOCATION)
+
+    # Rankings are requested one batch of locations at a time, so no more
+    # requests are made once enough clans are collected
+    tags = {}
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as pool:
+        for start in range(0, len(location_ids), CRAWL_WORKERS):
+            batch = location_ids[start:start + CRAWL_WORKERS]
+            for clans in pool.map(_clans, batch):
+                for clan in clans:
+                    if clan.get("tag"):
+                        tags.setdefault(clan["tag"], None)
+            if len(tags) >= max_clans:
+                break
+
+    return list(tags)[:max_clans]
+
+
+def start_run(clan_tags: list[str]) -> tuple[str, list[str]]:
+    """
+    Record a new crawl run and its shards.
+
+    Args:
+        clan_tags: Clan tags to crawl
+
+    Returns:
+        Tuple of (run id, queue messages to send, one per shard)
+    """
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    shards = [
+        clan_tags[i:i + _CLANS_PER_SHARD]
+        for i in range(0, len(clan_tags), _CLANS_PER_SHARD)
+    ]
+
+    for shard_id, tags in enumerate(shards):
+        crawl_runs_table.upsert_entity({
+            "PartitionKey": run_id,
+            "RowKey": _shard_key(shard_id),
+            "ClanTags": ",".join(tags),
+            "Done": False,
+            "Attempts": 0,
+            "EnqueuedAt": datetime.now(timezone.utc),
+        })
+
+    # Written last so resume_runs never sees a run with missing shards
+    crawl_runs_table.upsert_entity({
+        "PartitionKey": _RUNS_PARTITION,
+        "RowKey": run_id,
+        "Status": RUNNING,
+        "ShardCount": len(shards),
+        "CompletedShards": 0,
+        "StartedAt": datetime.now(timezone.utc),
+    })
+
+    logging.info(f"Started crawl run {run_id}: {len(clan_tags)} clans in {len(shards)} shards")
+    return run_id, [_shard_message(run_id, shard_id) for shard_id in range(len(shards))]
+
+
+# ---------------------------------------------------------------------------
+# Shard Worker
+# ---------------------------------------------------------------------------
+
+def process_shard(run_id: str, shard_id: int) -> None:
+    """
+    Crawl one shard and checkpoint its delta; finalize the run if it was the last.
+
+    Safe to re-run: a shard that is already done, or whose run was finalized
+    and deleted, is skipped.
+
+    Args:
+        run_id: Crawl run id
+        shard_id: Shard number within the run
+    """
+    try:
+        shard = crawl_runs_table.get_entity(partition_key=run_id, row_key=_shard_key(shard_id))
+    except ResourceNotFoundError:
+        logging.info(f"Run {run_id} no longer exists, skipping shard {shard_id}")
+        return
+    if shard.get("Done"):
+        logging.info(f"Shard {shard_id} of run {run_id} already done, skipping")
+        return
+
+    shard["Attempts"] = int(shard.get("Attempts", 0)) + 1
+    crawl_runs_table.update_entity(shard, mode="merge")
+
+    clan_tags = [tag for tag in shard["ClanTags"].split(",") if tag]
+    members = collect_members(clan_tags, max_workers=CRAWL_WORKERS)
+    states = get_player_states([m["tag"] for m in members], max_workers=CRAWL_WORKERS)
+    delta = crawl_members(members, states, max_workers=CRAWL_WORKERS)
+
+    # Checkpoint before marking the shard done so a finished shard is never lost
+    get_blob(_delta_blob_name(run_id, shard_id)).upload_blob(json.dumps(delta), overwrite=True)
+    if not _mark_done(run_id, shard_id):
+        logging.info(f"Shard {shard_id} of run {run_id} was completed by another worker")
+        return
+
+    logging.info(
+        f"Shard {shard_id} of run {run_id}: {len(members)} players, {len(delta)} unique decks"
+    )
+
+    run = _increment_completed(run_id)
+    if run["CompletedShards"] >= run["ShardCount"]:
+        finalize_run(run_id)
+
+
+def _mark_done(run_id: str, shard_id: int) -> bool:
+    """
+    Mark a shard done unless a duplicate delivery of its message already did.
+
+    Returns:
+        True if this call marked the shard done
+    """
+    shard = crawl_runs_table.get_entity(partition_key=run_id, row_key=_shard_key(shard_id))
+    if shard.get("Done"):
+        return False
+
+    shard["Done"] = True
+    shard["CompletedAt"] = datetime.now(timezone.utc)
+    try:
+        crawl_runs_table.update_entity(
+            shard,
+            mode="merge",
+            etag=shard.metadata["etag"],
+            match_condition=MatchConditions.IfNotModified
+        )
+        return True
+    except ResourceModifiedError:
+        return False
+
+
+def _increment_completed(run_id: str) -> dict:
+    """Count a completed shard on the run entity with optimistic concurrency."""
+    for _ in range(_UPDATE_RETRIES):
+        run = crawl_runs_table.get_entity(partition_key=_RUNS_PARTITION, row_key=run_id)
+        run["CompletedShards"] = int(run.get("CompletedShards", 0)) + 1
+        try:
+            crawl_runs_table.update_entity(
+                run,
+                mode="merge",
+                etag=run.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return run
+        except ResourceModifiedError:
+            continue
+    raise RuntimeError(f"Could not update crawl run {run_id}: modified concurrently")
+
+
+# ---------------------------------------------------------------------------
+# Finalization and Resume
+# ---------------------------------------------------------------------------
+
+def finalize_run(run_id: str) -> Optional[int]:
+    """
+    Merge every completed shard of a run into the deck store and publish decks.csv.
+
+    Only one caller wins the RUNNING -> FINALIZING transition; others return
+    immediately. The merge is keyed by the run id (see deck_store.merge_delta),
+    so a finalization retried after a crash does not count any shard twice.
+    Once the run is FINALIZED its entities and delta blobs are deleted (see
+    delete_run).
+
+    Args:
+        run_id: Crawl run id
+
+    Returns:
+        Number of decks published, or None if the run is not RUNNING (another
+        caller is finalizing it or already has)
+    """
+    run = crawl_runs_table.get_entity(partition_key=_RUNS_PARTITION, row_key=run_id)
+    if run.get("Status") != RUNNING:
+        logging.info(f"Crawl run {run_id} is {run.get('Status')}; not finalizing")
+        return None
+
+    run["Status"] = FINALIZING
+    run["FinalizingAt"] = datetime.now(timezone.utc)
+    try:
+        crawl_runs_table.update_entity(
+            run,
+            mode="merge",
+            etag=run.metadata["etag"],
+            match_condition=MatchConditions.IfNotModified
+        )
+    except ResourceModifiedError:
+        logging.info(f"Crawl run {run_id} is being finalized elsewhere")
+        return None
+
+    delta = {}
+    shards = crawl_runs_table.query_entities(f"PartitionKey eq '{run_id}'")
+    done = [shard for shard in shards if shard.get("Done")]
+    for shard in done:
+        try:
+            blob = get_blob(_delta_blob_name(run_id, int(shard["RowKey"])))
+            shard_delta = json.loads(blob.download_blob().readall())
+        except ResourceNotFoundError:
+            logging.warning(f"Missing delta for shard {shard['RowKey']} of run {run_id}")
+            continue
+        for entry in shard_delta.values():
+            add_to_delta(delta, entry["cards"], entry["card_ids"], entry["count"])
+
+    store = merge_delta(delta, run_id=run_id)
+    sorted_decks = build_view(store)
+    if sorted_decks:
+        upload_decks(sorted_decks)
+        upload_snapshot(sorted_decks)
+        upload_synergy(sorted_decks)
+
+    run["Status"] = FINALIZED
+    run["FinalizedAt"] = datetime.now(timezone.utc)
+    crawl_runs_table.update_entity(run, mode="merge")
+
+    logging.info(
+        f"Finalized crawl run {run_id}: {len(done)}/{run['ShardCount']} shards, "
+        f"{len(delta)} unique decks, {len(sorted_decks)} decks published"
+    )
+    delete_run(run_id)
+    return len(sorted_decks)
+
+
+def delete_run(run_id: str) -> None:
+    """
+    Delete a finalized run: its delta blobs, shard entities and run entity.
+
+    The run entity goes last, so a cleanup that fails halfway leaves a
+    FINALIZED run that resume_runs deletes again.
+
+    Args:
+        run_id: Crawl run id
+    """
+    shards = list(crawl_runs_table.query_entities(f"PartitionKey eq '{run_id}'"))
+    for shard in shards:
+        try:
+            get_blob(_delta_blob_name(run_id, int(shard["RowKey"]))).delete_blob()
+        except ResourceNotFoundError:
+            pass
+        crawl_runs_table.delete_entity(partition_key=run_id, row_key=shard["RowKey"])
+
+    crawl_runs_table.delete_entity(partition_key=_RUNS_PARTITION, row_key=run_id)
+    logging.info(f"Deleted crawl run {run_id} ({len(shards)} shards)")
+
+
+def resume_runs() -> list[str]:
+    """
+    Recover unfinished runs.
+
+    Shards that have not completed within the stale window are re-enqueued
+    (up to the attempt limit). Runs whose remaining shards are all given up on,
+    or whose finalization stalled, are finalized. Finalized runs left over by
+    an interrupted cleanup are deleted.
+
+    Returns:
+        Queue messages for the shards to retry
+    """
+    now = datetime.now(timezone.utc)
+    messages = []
+
+    runs = crawl_runs_table.query_entities(f"PartitionKey eq '{_RUNS_PARTITION}'")
+    for run in runs:
+        status = run.get("Status")
+        run_id = run["RowKey"]
+        if status == FINALIZED:
+            delete_run(run_id)
+            continue
+
+        if status == FINALIZING:
+            if now - run["FinalizingAt"] > _SHARD_STALE_AFTER and _reset_status(run):
+                finalize_run(run_id)
+            continue
+
+        pending = [
+            shard for shard in crawl_runs_table.query_entities(f"PartitionKey eq '{run_id}'")
+            if not shard.get("Done")
+        ]
+        retryable = [shard for shard in pending if int(shard.get("Attempts", 0)) < _MAX_SHARD_ATTEMPTS]
+
+        if not retryable:
+            finalize_run(run_id)
+            continue
+
+        for shard in retryable:
+            if now - shard["EnqueuedAt"] > _SHARD_STALE_AFTER:
+                shard["EnqueuedAt"] = now
+                crawl_runs_table.update_entity(shard, mode="merge")
+                messages.append(_shard_message(run_id, int(shard["RowKey"])))
+
+    if messages:
+        logging.info(f"Re-enqueueing {len(messages)} stalled crawl shards")
+    return messages
+
+
+def _reset_status(run: dict) -> bool:
+    """
+    Put a run whose finalization stalled back into the RUNNING state.
+
+    Args:
+        run: Run entity as read (its etag guards against a concurrent change)
+
+    Returns:
+        True if this call reset the run
+    """
+    run["Status"] = RUNNING
+    try:
+        crawl_runs_table.update_entity(
+            run,
+            mode="merge",
+            etag=run.metadata["etag"],
+            match_condition=MatchConditions.IfNotModified
+        )
+        return True
+    except ResourceModifiedError:
+        return False
+
+
+def _shard_key(shard_id: int) -> str:
+    """Fixed-width RowKey so shards sort numerically."""
+    return f"{shard_id:04d}"
+
+
+def _shard_message(run_id: str, shard_id: int) -> str:
+    """Queue message body for one shard."""
+    return json.dumps({"run_id": run_id, "shard": shard_id})
+
+
+def _delta_blob_name(run_id: str, shard_id: int) -> str:
+    """Blob holding the checkpointed delta of one shard."""
+    return f"crawl/{run_id}/{_shard_key(shard_id)}.json"
@@ -0,0 +1,157 @@
+"""
+Meta co-occurrence index over the published deck snapshot.
+
+For every pair of cards, the index holds how much score-weighted meta play
+the two cards see together in decks.arrow, normalized by how much each card
+is played on its own (cosine association, 0.0 - 1.0). A deck's meta fit is
+the mean association over its 28 card pairs: decks built from cards that
+top players actually run together score high, off-meta pairings score low.
+
+Cards are indexed by card registry id, so lookups need no name matching.
+The index is built in memory from the snapshot and reloaded at most once per
+_INDEX_TTL_SECONDS.
+"""
+import logging
+import threading
+import time
+from itertools import combinations
+from typing import Iterable, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from shared.card_registry import CardRegistry, get_registry
+from shared.deck_snapshot import DECK_SIZE, load_snapshot
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Seconds before the index is rebuilt from decks.arrow
+_INDEX_TTL_SECONDS = 3600
+
+# Seconds before a failed build is retried
+_INDEX_RETRY_SECONDS = 30
+
+# Column pairs of a deck row (each unordered card pair once)
+_PAIRS = list(combinations(range(DECK_SIZE), 2))
+
+
+class DeckIndex:
+    """Card-pair association built from score-weighted meta decks."""
+
+    def __init__(self, decks: np.ndarray, weights: np.ndarray, size: int, version: str = "") -> None:
+        """
+        Args:
+            decks: Registry card ids, one row of DECK_SIZE per deck (0 = unknown card)
+            weights: Weight of each deck (e.g. its meta score)
+            size: Number of registry ids (largest id + 1)
+            version: Identifies the snapshot the index was built from
+        """
+        cooccurrence = np.zeros((size, size))
+        for i, j in _PAIRS:
+            np.add.at(cooccurrence, (decks[:, i], decks[:, j]), weights)
+        cooccurrence += cooccurrence.T
+        cooccurrence[0, :] = cooccurrence[:, 0] = 0.0
+        np.fill_diagonal(cooccurrence, 0.0)
+
+        frequency = np.zeros(size)
+        for i in range(DECK_SIZE):
+            np.add.at(frequency, decks[:, i], weights)
+        frequency[0] = 0.0
+
+        norm = np.sqrt(np.outer(frequency, frequency))
+        self.cooccurrence = cooccurrence
+        self.frequency = frequency
+        self.association = np.divide(cooccurrence, norm, out=np.zeros_like(cooccurrence), where=norm > 0)
+        self.decks = len(decks)
+        self.version = version
+
+    def played(self) -> np.ndarray:
+        """Ids of cards that appear in at least one meta deck."""
+        return np.flatnonzero(self.frequency > 0)
+
+    def fit(self, ids: Iterable[int]) -> float:
+        """
+        Get a deck's meta fit.
+
+        Args:
+            ids: Registry card ids of the deck
+
+        Returns:
+            Mean association over the deck's card pairs (0.0 - 1.0)
+        """
+        ids = np.fromiter(ids, dtype=np.intp)
+        pairs = self.association[np.ix_(ids, ids)]
+        count = len(ids) * (len(ids) - 1)
+        return float(pairs.sum() / count) if count else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Index Loading
+# ---------------------------------------------------------------------------
+
+def build_index(table: pa.Table, card_names: dict[int, str], registry: CardRegistry) -> DeckIndex:
+    """
+    Build the index from an opened snapshot.
+
+    Args:
+        table: Snapshot table (see deck_snapshot.read_snapshot)
+        card_names: Snapshot card id -> card name
+        registry: Card registry the index ids refer to
+
+    Returns:
+        Deck index; cards missing from the registry are ignored
+    """
+    decks = np.zeros((table.num_rows, DECK_SIZE), dtype=np.intp)
+    if card_names:
+        # Snapshot ids are Clash Royale API ids; map them to registry ids
+        api_ids = np.array(sorted(card_names), dtype=np.int64)
+        registry_ids = np.array([registry.id_of(card_names[card_id]) or 0 for card_id in api_ids], dtype=np.intp)
+        for i in range(DECK_SIZE):
+            column = pc.fill_null(table.column(f"card_{i}"), -1).to_numpy().astype(np.int64)
+            position = np.searchsorted(api_ids, column).clip(max=len(api_ids) - 1)
+            decks[:, i] = np.where(api_ids[position] == column, registry_ids[position], 0)
+
+    weights = np.maximum(table.column("score").to_numpy().astype(np.float64), 0.0)
+    if not weights.any():
+        weights = np.ones(table.num_rows)
+
+    # Snapshots record their creation time, which identifies them
+    version = (table.schema.metadata or {}).get(b"created", b"").decode("utf-8")
+    return DeckIndex(decks, weights, len(registry) + 1, version)
+
+
+_index: Optional[DeckIndex] = None
+_loaded_at = 0.0
+_failed_at = 0.0
+_lock = threading.Lock()
+
+
+def get_deck_index() -> Optional[DeckIndex]:
+    """
+    Get the process-wide deck index, building it from decks.arrow on first use.
+
+    Only successful builds are cached. A failed build keeps the previous
+    index (if any) and is retried after _INDEX_RETRY_SECONDS.
+
+    Returns:
+        The deck index (rebuilt at most once per _INDEX_TTL_SECONDS), or None
+        if no snapshot has been published yet
+    """
+    global _index, _loaded_at, _failed_at
+
+    with _lock:
+        now = time.monotonic()
+        stale = _loaded_at == 0.0 or now - _loaded_at > _INDEX_TTL_SECONDS
+        if stale and (_failed_at == 0.0 or now - _failed_at > _INDEX_RETRY_SECONDS):
+            try:
+                table, card_names = load_snapshot()
+                _index = build_index(table, card_names, get_registry())
+                _loaded_at, _failed_at = now, 0.0
+                logging.info(f"Built deck index from {_index.decks} meta decks")
+            except Exception as e:
+                logging.warning(f"Deck index unavailable: {e}")
+                _failed_at = now
+        return _index
@@ -0,0 +1,182 @@
+"""
+Nearest meta decks for a deck, searched over the published deck snapshot.
+
+Every snapshot deck is a card bitmask: one bit per card id seen in
+decks.arrow, packed into uint64 words (two words cover today's ~120 cards).
+A query deck is masked the same way and compared with the whole deck matrix
+at once: AND plus popcount gives the shared cards of every deck, from which
+the Jaccard similarity follows (decks have a fixed size, so it ranks exactly
+like the overlap coefficient). Ties go to the higher meta score.
+
+A full scan over a few hundred thousand decks is a handful of vectorized
+operations on a few megabytes, so no approximate index (LSH/MinHash) is
+kept. The matrix is built in memory from the snapshot and reloaded at most
+once per _MATRIX_TTL_SECONDS.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from shared.card_registry import normalize_name
+from shared.deck_snapshot import DECK_SIZE, SCORE_SCALE, load_snapshot
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Seconds before the matrix is rebuilt from decks.arrow
+_MATRIX_TTL_SECONDS = 3600
+
+# Seconds before a failed build is retried
+_MATRIX_RETRY_SECONDS = 30
+
+# Similar decks returned when no limit is given
+DEFAULT_SIMILAR_DECKS = 10
+
+# Bits per mask word
+_WORD_BITS = 64
+
+
+class DeckMatrix:
+    """Card bitmasks of every snapshot deck."""
+
+    def __init__(self, table: pa.Table, card_names: dict[int, str]) -> None:
+        """
+        Args:
+            table: Snapshot table (see deck_snapshot.read_snapshot)
+            card_names: Snapshot card id -> card name
+        """
+        api_ids = np.array(sorted(card_names), dtype=np.int64)
+        self.card_names = [card_names[card_id] for card_id in api_ids.tolist()]
+        self._bits = {normalize_name(name): bit for bit, name in enumerate(self.card_names)}
+        words = max(1, -(-len(api_ids) // _WORD_BITS))
+
+        # Bit of every deck card (-1 = unknown card, never set)
+        self.deck_bits = np.full((table.num_rows, DECK_SIZE), -1, dtype=np.int16)
+        if len(api_ids):
+            for i in range(DECK_SIZE):
+                column = pc.fill_null(table.column(f"card_{i}"), -1).to_numpy().astype(np.int64)
+                position = np.searchsorted(api_ids, column).clip(max=len(api_ids) - 1)
+                self.deck_bits[:, i] = np.where(api_ids[position] == column, position, -1)
+
+        self.masks = np.zeros((table.num_rows, words), dtype=np.uint64)
+        for i in range(DECK_SIZE):
+            bits = self.deck_bits[:, i].astype(np.int64)
+            known = bits >= 0
+            rows = np.flatnonzero(known)
+            np.bitwise_or.at(
+                self.masks,
+                (rows, bits[known] // _WORD_BITS),
+                np.left_shift(np.uint64(1), (bits[known] % _WORD_BITS).astype(np.uint64)),
+            )
+        self.sizes = np.bitwise_count(self.masks).sum(axis=1, dtype=np.int16)
+
+        self.deck_ids = table.column("deck_id").to_numpy()
+        self.scores = table.column("score").to_numpy() / SCORE_SCALE
+        # Snapshots published before archetypes were classified lack the column
+        self.archetypes = (
+            table.column("archetype").to_pylist() if "archetype" in table.column_names
+            else [None] * table.num_rows
+        )
+
+    def mask(self, cards: list[str]) -> tuple[np.ndarray, int]:
+        """
+        Build the bitmask of a deck.
+
+        Args:
+            cards: Card names (any spelling)
+
+        Returns:
+            Tuple of (mask words, number of distinct cards including cards
+            never seen in the snapshot)
+        """
+        mask = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        keys = {normalize_name(card) for card in cards}
+        for key in keys:
+            bit = self._bits.get(key)
+            if bit is not None:
+                mask[bit // _WORD_BITS] |= np.uint64(1) << np.uint64(bit % _WORD_BITS)
+        return mask, len(keys)
+
+    def similar(self, cards: list[str], limit: int = DEFAULT_SIMILAR_DECKS) -> list[dict]:
+        """
+        Find the snapshot decks most similar to a deck.
+
+        Args:
+            cards: Card names of the deck
+            limit: Maximum decks returned
+
+        Returns:
+            Deck entries ("deck_id", "cards", "archetype", "score", "shared",
+            "similarity"), highest Jaccard similarity first (then highest
+            score); decks sharing no card are left out
+        """
+        if not len(self.masks) or limit <= 0:
+            return []
+
+        mask, size = self.mask(cards)
+        shared = np.bitwise_count(self.masks & mask).sum(axis=1, dtype=np.int16)
+        union = size + self.sizes - shared
+        similarity = np.divide(shared, union, out=np.zeros(len(shared)), where=union > 0)
+
+        candidates = np.flatnonzero(shared > 0)
+        if len(candidates) > limit:
+            # Keep every deck tied with the limit-th best before the exact sort
+            threshold = np.partition(similarity[candidates], -limit)[-limit]
+            candidates = candidates[similarity[candidates] >= threshold]
+        order = candidates[np.lexsort((-self.scores[candidates], -similarity[candidates]))][:limit]
+
+        return [
+            {
+                "deck_id": int(self.deck_ids[row]),
+                "cards": [self.card_names[bit] for bit in self.deck_bits[row] if bit >= 0],
+                "archetype": self.archetypes[row],
+                "score": round(float(self.scores[row]), 3),
+                "shared": int(shared[row]),
+                "similarity": round(float(similarity[row]), 4),
+            }
+            for row in order
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Matrix Loading
+# ---------------------------------------------------------------------------
+
+_matrix: Optional[DeckMatrix] = None
+_loaded_at = 0.0
+_failed_at = 0.0
+_lock = threading.Lock()
+
+
+def get_deck_matrix() -> Optional[DeckMatrix]:
+    """
+    Get the process-wide deck matrix, building it from decks.arrow on first use.
+
+    Only successful builds are cached. A failed build keeps the previous
+    matrix (if any) and is retried after _MATRIX_RETRY_SECONDS.
+
+    Returns:
+        The deck matrix (rebuilt at most once per _MATRIX_TTL_SECONDS), or
+        None if no snapshot has been published yet
+    """
+    global _matrix, _loaded_at, _failed_at
+
+    with _lock:
+        now = time.monotonic()
+        stale = _loaded_at == 0.0 or now - _loaded_at > _MATRIX_TTL_SECONDS
+        if stale and (_failed_at == 0.0 or now - _failed_at > _MATRIX_RETRY_SECONDS):
+            try:
+                table, card_names = load_snapshot()
+                _matrix = DeckMatrix(table, card_names)
+                _loaded_at, _failed_at = now, 0.0
+                logging.info(f"Built deck matrix from {len(_matrix.masks)} meta decks")
+            except Exception as e:
+                logging.warning(f"Deck matrix unavailable: {e}")
+                _failed_at = now
+        return _matrix
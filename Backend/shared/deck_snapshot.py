@@ -0,0 +1,156 @@
+"""
+Columnar deck snapshot published alongside decks.csv.
+
+decks.arrow is an uncompressed Arrow IPC file with one row per deck: the
+eight card ids as integer columns (card_0 .. card_7, sorted ascending), the
+score as an integer number of thousandths, run counts, UTC timestamps and
+the deck's archetype (dictionary-encoded, null when unclassified).
+Card names are kept once, in the schema metadata, instead of on every row.
+Uncompressed IPC can be memory-mapped, so readers filter and aggregate with
+vectorized kernels without parsing text.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+import pyarrow as pa
+
+from shared.archetypes import ARCHETYPES
+from shared.blob_writer import BlockBlobWriter
+from shared.blobs_utils import decks_snapshot
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Cards per deck (one column each)
+DECK_SIZE = 8
+
+# Scores are stored as integers in units of 1/SCORE_SCALE
+SCORE_SCALE = 1000
+
+# Rows per record batch (bounds memory while writing)
+_BATCH_ROWS = 65536
+
+# Schema metadata key holding the card id -> name mapping
+_CARD_NAMES_KEY = b"card_names"
+
+# Archetype dictionary shared by every record batch (the IPC file format
+# allows a single dictionary per column)
+_ARCHETYPE_DICTIONARY = pa.array(ARCHETYPES, type=pa.string())
+_ARCHETYPE_CODES = {archetype: code for code, archetype in enumerate(ARCHETYPES)}
+
+# Column layout of the snapshot
+SNAPSHOT_SCHEMA = pa.schema(
+    [pa.field("deck_id", pa.int32(), nullable=False)]
+    + [pa.field(f"card_{i}", pa.int32()) for i in range(DECK_SIZE)]
+    + [
+        pa.field("score", pa.int32(), nullable=False),
+        pa.field("runs", pa.int32(), nullable=False),
+        pa.field("last_run_count", pa.int32(), nullable=False),
+        pa.field("first_seen", pa.timestamp("s", tz="UTC"), nullable=False),
+        pa.field("last_seen", pa.timestamp("s", tz="UTC"), nullable=False),
+        pa.field("archetype", pa.dictionary(pa.int8(), pa.string())),
+    ]
+)
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _card_names(rows: list[dict]) -> dict[int, str]:
+    """Map every card id seen in the deck rows to its name."""
+    names = {}
+    for row in rows:
+        ids = row.get("card_ids") or []
+        names.update(
+            (card_id, name)
+            for card_id, name in zip(ids, row["cards"].split("; "))
+            if card_id is not None
+        )
+    return names
+
+
+def _record_batches(rows: Iterable[dict]) -> Iterator[pa.RecordBatch]:
+    """Convert deck rows into record batches of up to _BATCH_ROWS rows."""
+    columns: dict[str, list] = {field.name: [] for field in SNAPSHOT_SCHEMA}
+
+    def _flush() -> pa.RecordBatch:
+        codes = pa.array([_ARCHETYPE_CODES.get(a) for a in columns["archetype"]], type=pa.int8())
+        batch = pa.RecordBatch.from_pydict(
+            {**columns, "archetype": pa.DictionaryArray.from_arrays(codes, _ARCHETYPE_DICTIONARY)},
+            schema=SNAPSHOT_SCHEMA
+        )
+        for values in columns.values():
+            values.clear()
+        return batch
+
+    for row in rows:
+        ordered = sorted(card_id for card_id in row.get("card_ids") or [] if card_id is not None)
+        ordered += [None] * (DECK_SIZE - len(ordered))
+
+        columns["deck_id"].append(row["deck_id"])
+        for i in range(DECK_SIZE):
+            columns[f"card_{i}"].append(ordered[i])
+        columns["score"].append(round(row["score"] * SCORE_SCALE))
+        columns["runs"].append(row["runs"])
+        columns["last_run_count"].append(row["last_run_count"])
+        columns["first_seen"].append(row["first_seen"])
+        columns["last_seen"].append(row["last_entry"])
+        columns["archetype"].append(row.get("archetype"))
+
+        if len(columns["deck_id"]) >= _BATCH_ROWS:
+            yield _flush()
+
+    if columns["deck_id"]:
+        yield _flush()
+
+
+def upload_snapshot(sorted_decks: list[dict]) -> None:
+    """
+    Stream the deck snapshot to decks.arrow in Azure Blob Storage.
+
+    Args:
+        sorted_decks: Deck rows sorted by score (see deck_store.build_view)
+    """
+    card_names = _card_names(sorted_decks)
+    schema = SNAPSHOT_SCHEMA.with_metadata({
+        _CARD_NAMES_KEY: json.dumps({str(k): v for k, v in sorted(card_names.items())}).encode("utf-8"),
+        b"created": datetime.now(timezone.utc).isoformat().encode("utf-8"),
+    })
+
+    with BlockBlobWriter(decks_snapshot, content_type="application/vnd.apache.arrow.file") as stream:
+        with pa.ipc.new_file(pa.PythonFile(stream, mode="w"), schema) as writer:
+            for batch in _record_batches(sorted_decks):
+                writer.write_batch(batch)
+
+    logging.info(f"Uploaded decks.arrow to blob storage ({len(sorted_decks)} decks, {stream.bytes_written} bytes)")
+
+
+def read_snapshot(data: bytes) -> tuple[pa.Table, dict[int, str]]:
+    """
+    Open a deck snapshot without copying its columns.
+
+    Args:
+        data: Contents of decks.arrow (or a memory-mapped buffer)
+
+    Returns:
+        Tuple of (snapshot table, card id -> card name)
+    """
+    reader = pa.ipc.open_file(pa.py_buffer(data))
+    table = reader.read_all()
+    metadata = reader.schema.metadata or {}
+    names = json.loads(metadata.get(_CARD_NAMES_KEY, b"{}"))
+    return table, {int(k): v for k, v in names.items()}
+
+
+def load_snapshot() -> tuple[pa.Table, dict[int, str]]:
+    """
+    Download and open decks.arrow from blob storage.
+
+    Returns:
+        Tuple of (snapshot table, card id -> card name)
+    """
+    return read_snapshot(decks_snapshot.download_blob().readall())
@@ -0,0 +1,410 @@
+"""
+Persistent aggregate store for crawled decks.
+
+Each crawl produces a delta: how many crawled players used each deck in that
+run. The delta is merged incrementally into the "deckaggregates" table, keyed
+by a hash of the canonical (sorted) card list. Every aggregate keeps a stable
+deck id, a time-decayed popularity score, first/last seen timestamps and
+per-run counts, so deck ids survive between runs and history is not lost.
+decks.csv is published as a view of the store.
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableTransactionError
+
+from shared.archetypes import classify_deck
+from shared.table_utils import deck_aggregates_table, PARTITION_KEY
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Days after which a deck's accumulated score has decayed to half
+SCORE_HALF_LIFE_DAYS = 30.0
+
+# Decks whose decayed score falls below this are left out of the view
+_MIN_VIEW_SCORE = 0.05
+
+# Partition and row key of the deck id counter entity
+_META_PARTITION = "Meta"
+_DECK_ID_COUNTER_KEY = "NextDeckId"
+
+# Maximum operations per table transaction (Azure Table Storage limit)
+_BATCH_SIZE = 100
+
+# Attempts to allocate deck ids before giving up on a concurrent writer
+_ID_ALLOCATION_RETRIES = 5
+
+# Attempts to merge a batch of decks that concurrent merges keep changing
+_MERGE_RETRIES = 5
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def canonical_cards(cards: list[str]) -> list[str]:
+    """
+    Sort card names into canonical order (case-insensitive alphabetical).
+
+    Args:
+        cards: Card names in any order
+
+    Returns:
+        Card names sorted canonically
+    """
+    return sorted((c.strip() for c in cards if c and c.strip()), key=str.lower)
+
+
+def deck_hash(cards: list[str]) -> str:
+    """
+    Compute the store key of a deck, independent of card order and case.
+
+    Args:
+        cards: Card names in any order
+
+    Returns:
+        16-character hexadecimal deck hash
+    """
+    canonical = "|".join(c.lower() for c in canonical_cards(cards))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def add_to_delta(
+    delta: dict[str, dict],
+    cards: list[str],
+    card_ids: Optional[list[int]] = None,
+    count: int = 1
+) -> str:
+    """
+    Count one (or more) uses of a deck in a crawl delta.
+
+    Args:
+        delta: Delta being built for the current run (deck hash -> deck data)
+        cards: Card names of the deck
+        card_ids: Clash Royale API card ids, aligned with cards
+        count: Number of players using the deck
+
+    Returns:
+        The deck hash
+    """
+    key = deck_hash(cards)
+    entry = delta.get(key)
+    if entry is None:
+        # Keep ids aligned with the canonical card order
+        ids_by_name = dict(zip(cards, card_ids)) if card_ids else {}
+        ordered = canonical_cards(cards)
+        delta[key] = {
+            "cards": ordered,
+            "card_ids": [ids_by_name.get(c) for c in ordered] if ids_by_name else [],
+            "count": count,
+        }
+    else:
+        entry["count"] += count
+    return key
+
+
+def format_card_ids(card_ids: list[Optional[int]]) -> str:
+    """
+    Format card ids for a table property, one comma-separated field per card.
+
+    Unknown ids are kept as empty fields so positions stay aligned with the
+    card names stored next to them.
+
+    Args:
+        card_ids: Card ids aligned with a deck's cards (None = unknown)
+
+    Returns:
+        Comma-separated ids (e.g., "26000000,,28000000")
+    """
+    return ",".join("" if i is None else str(i) for i in card_ids)
+
+
+def parse_card_ids(value: Optional[str]) -> list[Optional[int]]:
+    """
+    Parse card ids written by format_card_ids.
+
+    Args:
+        value: Comma-separated ids (empty or None = no ids)
+
+    Returns:
+        Card ids in stored order, None for empty fields
+    """
+    return [int(i) if i else None for i in value.split(",")] if value else []
+
+
+def decayed_score(score: float, updated: Optional[datetime], now: datetime) -> float:
+    """
+    Decay a stored score from the time it was last updated to now.
+
+    Args:
+        score: Score stored at time `updated`
+        updated: When the score was last written (None = no decay)
+        now: Time to decay the score to
+
+    Returns:
+        Decayed score
+    """
+    if not updated:
+        return float(score)
+    elapsed_days = max(0.0, (now - updated).total_seconds() / 86400)
+    return float(score) * 0.5 ** (elapsed_days / SCORE_HALF_LIFE_DAYS)
+
+
+def _allocate_deck_ids(count: int) -> int:
+    """
+    Reserve a contiguous range of stable deck ids.
+
+    Uses optimistic concurrency on the counter entity so concurrent merges
+    never hand out the same id.
+
+    Args:
+        count: Number of ids to reserve
+
+    Returns:
+        First id of the reserved range
+    """
+    for _ in range(_ID_ALLOCATION_RETRIES):
+        try:
+            counter = deck_aggregates_table.get_entity(
+                partition_key=_META_PARTITION,
+                row_key=_DECK_ID_COUNTER_KEY
+            )
+        except ResourceNotFoundError:
+            try:
+                deck_aggregates_table.create_entity({
+                    "PartitionKey": _META_PARTITION,
+                    "RowKey": _DECK_ID_COUNTER_KEY,
+                    "Value": 1 + count,
+                })
+                return 1
+            except ResourceExistsError:
+                continue
+
+        first_id = int(counter["Value"])
+        counter["Value"] = first_id + count
+        try:
+            deck_aggregates_table.update_entity(
+                counter,
+                etag=counter.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return first_id
+        except ResourceModifiedError:
+            continue
+
+    raise RuntimeError("Could not allocate deck ids: counter modified concurrently")
+
+
+def load_store() -> dict[str, dict]:
+    """
+    Load every deck aggregate.
+
+    Returns:
+        Dictionary mapping deck hash to aggregate entity
+    """
+    query = f"PartitionKey eq '{PARTITION_KEY}'"
+    return {e["RowKey"]: e for e in deck_aggregates_table.query_entities(query)}
+
+
+def _read_aggregate(key: str) -> Optional[dict]:
+    """Read one deck aggregate, or None if it does not exist."""
+    try:
+        return deck_aggregates_table.get_entity(partition_key=PARTITION_KEY, row_key=key)
+    except ResourceNotFoundError:
+        return None
+
+
+def _merged_entity(
+    key: str,
+    entry: dict,
+    existing: Optional[dict],
+    deck_id: Optional[int],
+    run_time: datetime,
+    run_id: Optional[str]
+) -> dict:
+    """Build the aggregate of a deck after adding one run's count."""
+    if existing is None:
+        entity = {
+            "PartitionKey": PARTITION_KEY,
+            "RowKey": key,
+            "DeckID": deck_id,
+            "Cards": "; ".join(entry["cards"]),
+            "CardIds": format_card_ids(entry["card_ids"]),
+            "Score": float(entry["count"]),
+            "ScoreUpdated": run_time,
+            "FirstSeen": run_time,
+            "LastSeen": run_time,
+            "RunCount": 1,
+            "TotalCount": entry["count"],
+            "LastRunCount": entry["count"],
+        }
+    else:
+        entity = dict(existing)
+        entity["Score"] = decayed_score(
+            existing.get("Score", 0.0),
+            existing.get("ScoreUpdated"),
+            run_time
+        ) + entry["count"]
+        entity["ScoreUpdated"] = run_time
+        entity["LastSeen"] = run_time
+        entity["RunCount"] = int(existing.get("RunCount", 0)) + 1
+        entity["TotalCount"] = int(existing.get("TotalCount", 0)) + entry["count"]
+        entity["LastRunCount"] = entry["count"]
+
+    if run_id:
+        entity["LastRunId"] = run_id
+    return entity
+
+
+def _merge_batch(
+    keys: list[str],
+    delta: dict[str, dict],
+    store: dict[str, dict],
+    deck_ids: dict[str, int],
+    run_time: datetime,
+    run_id: Optional[str]
+) -> int:
+    """
+    Merge up to _BATCH_SIZE decks in one table transaction.
+
+    New decks are created (failing if a concurrent merge created them
+    first) and existing ones replaced only if their etag is unchanged. When
+    the transaction fails, the batch's aggregates are read again and the
+    merge is recomputed from them.
+
+    Returns:
+        Number of decks skipped because the run was already merged into them
+    """
+    for _ in range(_MERGE_RETRIES):
+        operations = []
+        merged = {}
+        skipped = 0
+        for key in keys:
+            existing = store.get(key)
+            if run_id and existing is not None and existing.get("LastRunId") == run_id:
+                skipped += 1
+                continue
+            if existing is None and key not in deck_ids:
+                deck_ids[key] = _allocate_deck_ids(1)
+
+            entity = _merged_entity(key, delta[key], existing, deck_ids.get(key), run_time, run_id)
+            merged[key] = entity
+            if existing is None:
+                operations.append(("create", entity))
+            else:
+                operations.append(("update", entity, {
+                    "mode": "replace",
+                    "etag": existing.metadata["etag"],
+                    "match_condition": MatchConditions.IfNotModified,
+                }))
+
+        if not operations:
+            return skipped
+        try:
+            deck_aggregates_table.submit_transaction(operations)
+            store.update(merged)
+            return skipped
+        except TableTransactionError:
+            logging.info(f"Deck aggregates changed by a concurrent merge; retrying {len(keys)} decks")
+            for key in keys:
+                entity = _read_aggregate(key)
+                if entity is None:
+                    store.pop(key, None)
+                else:
+                    store[key] = entity
+
+    raise RuntimeError("Could not merge deck aggregates: modified concurrently")
+
+
+def merge_delta(
+    delta: dict[str, dict],
+    run_time: Optional[datetime] = None,
+    run_id: Optional[str] = None
+) -> dict[str, dict]:
+    """
+    Merge a crawl delta into the aggregate store.
+
+    Existing decks have their score decayed to run_time before the run's
+    count is added; new decks get a freshly allocated stable id. Only decks
+    present in the delta are written.
+
+    Writes use optimistic concurrency (see _merge_batch), so merges running
+    at the same time (the HTTP refresh and a crawl finalization) both add
+    their counts instead of one overwriting the other.
+
+    With a run id the merge is idempotent: every written aggregate records
+    the run in LastRunId, and aggregates that already carry it are skipped.
+    Re-merging a run (e.g. after a finalization crashed halfway through the
+    table transactions) then only applies the decks that were not written.
+
+    Args:
+        delta: Delta built with add_to_delta
+        run_time: Time of the crawl (default: now)
+        run_id: Crawl run the delta belongs to
+
+    Returns:
+        The full store after the merge (deck hash -> aggregate entity)
+    """
+    run_time = run_time or datetime.now(timezone.utc)
+    store = load_store()
+
+    new_keys = [key for key in delta if key not in store]
+    next_id = _allocate_deck_ids(len(new_keys)) if new_keys else 0
+    deck_ids = {key: next_id + i for i, key in enumerate(new_keys)}
+
+    keys = list(delta)
+    applied = 0
+    for i in range(0, len(keys), _BATCH_SIZE):
+        applied += _merge_batch(keys[i:i + _BATCH_SIZE], delta, store, deck_ids, run_time, run_id)
+
+    logging.info(
+        f"Merged crawl delta: {len(delta)} decks ({len(new_keys)} new, {applied} already merged), "
+        f"store now holds {len(store)} decks"
+    )
+    return store
+
+
+def build_view(store: dict[str, dict], now: Optional[datetime] = None) -> list[dict]:
+    """
+    Build the decks.csv view of the store, sorted by decayed score.
+
+    The view is a list (not a stream) because it is sorted and read by each
+    published artifact in turn; it holds one row per deck above the view
+    threshold.
+
+    Args:
+        store: Deck hash -> aggregate entity
+        now: Time to decay scores to (default: now)
+
+    Returns:
+        List of deck rows (deck_id, cards, card_ids, score, last_entry,
+        first_seen, runs, last_run_count, archetype) with score above the
+        view threshold; archetype is None for decks no rule classifies
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = []
+
+    for entity in store.values():
+        score = decayed_score(entity.get("Score", 0.0), entity.get("ScoreUpdated"), now)
+        if score < _MIN_VIEW_SCORE:
+            continue
+        rows.append({
+            "deck_id": int(entity["DeckID"]),
+            "cards": entity["Cards"],
+            "card_ids": parse_card_ids(entity.get("CardIds")),
+            "score": round(score, 3),
+            "last_entry": entity["LastSeen"],
+            "first_seen": entity["FirstSeen"],
+            "runs": int(entity.get("RunCount", 0)),
+            "last_run_count": int(entity.get("LastRunCount", 0)),
+            "archetype": classify_deck(entity["Cards"].split("; ")),
+        })
+
+    rows.sort(key=lambda d: d["score"], reverse=True)
+    return rows
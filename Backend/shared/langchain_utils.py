@@ -8,9 +8,14 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from shared.context_budget import Chunk, assemble_context
 from shared.pinecone_utils import index
+from shared.telemetry import span, record_duration, record_token_usage
 import logging
+import time
+from typing import Optional
 
 
 
@@ -18,6 +23,40 @@ import logging
 embedding_model = OpenAIEmbeddings(model="text-embedding-3-large")
 
 
+class _LLMTelemetryHandler(BaseCallbackHandler):
+    """
+    Callback handler that times each LLM call and records its token usage.
+
+    Works for both invoke and streaming calls because it hooks the model's
+    start/end events rather than wrapping the call itself.
+    """
+
+    def __init__(self, model: str, cache_key: Optional[str] = None) -> None:
+        self._model = model
+        self._attributes = {"model": model}
+        if cache_key is not None:
+            self._attributes["prompt"] = cache_key
+        self._started: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        started = self._started.pop(run_id, None)
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+
+        if started is not None:
+            record_duration("llm_call", (time.perf_counter() - started) * 1000, model=self._model)
+        record_token_usage(usage, **self._attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._started.pop(run_id, None)
+
+
 def chunk_text(text: str, chunk_size: int, chunk_overlap: int, separators: list[str]) -> list[str]:
     """
     Chunk text into chunks.
@@ -40,7 +79,9 @@ def chunk_text(text: str, chunk_size: int, chunk_overlap: int, separators: list[
 def build_chain(
     *,
     default_namespace: str = "__default__",
-    model: str = "gpt-5"
+    model: str = "gpt-5",
+    response_format: Optional[dict] = None,
+    cache_key: Optional[str] = None
 ) -> object:
     """
     Build a LangChain RAG chain with optional vector retrieval.
@@ -51,6 +92,12 @@ def build_chain(
     Args:
         default_namespace: Default namespace for vector retrieval (default: "")
         model: OpenAI model name to use (default: "gpt-5")
+        response_format: Optional OpenAI response format (see shared/schemas)
+            constraining the output to a JSON schema; the output is still
+            returned (and streamed) as text
+        cache_key: Optional prompt cache key (e.g. the category) so requests
+            sharing a system prompt are routed to the same provider cache;
+            also attached to the token metrics as "prompt"
     
     Returns:
         A LangChain chain that can be invoked with:
@@ -61,21 +108,29 @@ def build_chain(
         }
     """
     # ---- LLM ----
-    llm = ChatOpenAI(model=model, temperature=0)
+    # stream_usage: streamed calls also report (cached) token usage
+    llm = ChatOpenAI(
+        model=model,
+        temperature=0,
+        stream_usage=True,
+        callbacks=[_LLMTelemetryHandler(model, cache_key)]
+    )
+    bound = {}
+    if response_format is not None:
+        bound["response_format"] = response_format
+    if cache_key is not None:
+        bound["prompt_cache_key"] = cache_key
+    if bound:
+        llm = llm.bind(**bound)
 
     # ---- Prompt Template ----
-    template = """
-    {system_instructions}
-
-    Context:
-    {context}
-
-    User Input:
-    {user_input}
-
-    Answer:
-    """
-    prompt = ChatPromptTemplate.from_template(template)
+    # The rubric is the same for every deck of a category, so it goes first in
+    # its own system message; the provider caches that prefix. Retrieved
+    # context and the deck vary per request and come after it.
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "{system_instructions}"),
+        ("human", "Context:\n{context}\n\nUser Input:\n{user_input}\n\nAnswer:"),
+    ])
 
     # ---- Format list[Document] → string ----
     def _format_docs(docs: list) -> str:
@@ -88,16 +143,21 @@ def build_chain(
         Build context string from multiple vector retrievers.
         
         Supports retrieval from multiple Pinecone namespaces with different
-        configurations. Groups retrieved text by namespace and formats as:
-        "NamespaceName:\n*text1\n*text2..."
+        configurations. Retrieved chunks are ranked, deduplicated and trimmed
+        to the context token budgets (see shared/context_budget), then
+        grouped by namespace as: "NamespaceName:\n*text1\n*text2..."
+        
+        The retrieval query is inputs["query"] when given (e.g. the deck and
+        user request without the computed sections appended for the model),
+        and the user input otherwise.
         
         Args:
-            inputs: Dictionary containing "user_input" and optional "retrievers"
+            inputs: Dictionary containing "user_input" and optional "query" and "retrievers"
         
         Returns:
             Formatted context string organized by namespace, or empty string if no retrieval
         """
-        user_input = inputs["user_input"]
+        query = inputs.get("query") or inputs["user_input"]
         retriever_configs = inputs.get("retrievers", None)
 
         # Case 1: retrievers omitted entirely → treat as no retrieval
@@ -108,10 +168,21 @@ def build_chain(
         if len(retriever_configs) == 0:
             return ""   # no context
 
-        # Dictionary to store docs grouped by namespace
-        namespace_docs = {}
-        # Dictionary to track seen texts per namespace for deduplication
-        namespace_seen = {}
+        # Every retrieved chunk, with its namespace and similarity score
+        chunks = []
+
+        # build vectorstore using "__default__" namespace (shared by every pass)
+        with span("retriever_construction", retrievers=len(retriever_configs)):
+            vector_store = PineconeVectorStore(
+                index=index,
+                embedding=embedding_model,
+                text_key="text",
+                namespace="__default__"
+            )
+
+        # The query text is the same for every pass, so embed it once
+        with span("embedding"):
+            query_vector = embedding_model.embed_query(query)
 
         for cfg in retriever_configs:
             # Create a copy of cfg to avoid mutating the original
@@ -135,42 +206,15 @@ def build_chain(
             # Add metadata filter for namespace field (merge with existing filters)
             search_kwargs["filter"]["namespace"] = {"$eq": filter_namespace}
 
-            # build vectorstore using "__default__" namespace
-            vector_store = PineconeVectorStore(
-                index=index,
-                embedding=embedding_model,
-                text_key="text",
-                namespace="__default__"
-            )
+            with span("pinecone_query", namespace=filter_namespace) as attrs:
+                scored = vector_store.similarity_search_by_vector_with_score(query_vector, **search_kwargs)
+                attrs["documents"] = len(scored)
+            logging.debug(f"Facts for {filter_namespace}: {scored}")
 
-            retriever = vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs=search_kwargs
-            )
+            chunks.extend(Chunk(filter_namespace, doc.page_content, score) for doc, score in scored)
 
-            docs = retriever.invoke(user_input)
-            logging.info(f"Facts for {filter_namespace}: {docs}")
-            
-            # Initialize namespace list and seen set if not exists
-            if filter_namespace not in namespace_docs:
-                namespace_docs[filter_namespace] = []
-                namespace_seen[filter_namespace] = set()
-            
-            # Add docs to namespace group (deduplicate by page_content within namespace)
-            for doc in docs:
-                if doc.page_content not in namespace_seen[filter_namespace]:
-                    namespace_docs[filter_namespace].append(doc.page_content)
-                    namespace_seen[filter_namespace].add(doc.page_content)
-
-        # Format output: "Namespace:\n*text1\n*text2..."
-        context_parts = []
-        for namespace, texts in namespace_docs.items():
-            if texts:  # Only add if there are texts
-                namespace_header = f"{namespace}:"
-                formatted_texts = "\n".join(f"*{text}" for text in texts)
-                context_parts.append(f"{namespace_header}\n{formatted_texts}")
-
-        return "\n\n".join(context_parts)
+        # Rank, dedupe and trim to the token budgets
+        return assemble_context(chunks)
 
     # ---- Chain ----
     chain = (
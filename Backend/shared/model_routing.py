@@ -0,0 +1,173 @@
+"""
+Model routing: per-category model tiers, fast mode and shadow comparisons.
+
+Every analysis category runs on a named tier ("quality", "standard" or
+"fast") instead of a hard-coded model. Tiers map to models and categories map
+to tiers through app settings, so a category can be moved to a cheaper,
+lower-latency model without a deploy. Latency-sensitive requests can ask for
+fast mode, which uses the "fast" tier.
+
+Shadow mode decides which moves are safe: for a sample of analyses, the same
+inputs are also sent to the shadow tier in the background, and the
+difference between the two results' scores is emitted as a metric per
+category and model pair. Categories whose shadow scores agree closely with
+the primary ones are candidates for the cheaper tier.
+"""
+import json
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from shared.telemetry import record_score_delta
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Model of each tier (override with MODEL_TIER_<TIER>, e.g. MODEL_TIER_FAST)
+MODEL_TIERS = {
+    "quality": os.getenv("MODEL_TIER_QUALITY", "gpt-5.1"),
+    "standard": os.getenv("MODEL_TIER_STANDARD", "gpt-5"),
+    "fast": os.getenv("MODEL_TIER_FAST", "gpt-5-mini"),
+}
+
+# Tier used in fast mode
+FAST_TIER = "fast"
+
+# Default tier of each category (override with ANALYSIS_TIER_<CATEGORY>)
+_CATEGORY_TIERS = {
+    "offense": "quality",
+    "defense": "quality",
+    "synergy": "standard",
+    "versatility": "standard",
+    "optimize": "standard",
+}
+
+# Tier compared against the primary tier in shadow mode ("" disables it)
+_SHADOW_TIER = os.getenv("ANALYSIS_SHADOW_TIER", "")
+
+# Fraction of primary analyses that also run in the shadow tier
+_SHADOW_RATE = float(os.getenv("ANALYSIS_SHADOW_RATE", "0.1"))
+
+# Background shadow runs at once (shadow runs never delay a response)
+_SHADOW_WORKERS = 2
+
+_shadow_pool = ThreadPoolExecutor(max_workers=_SHADOW_WORKERS, thread_name_prefix="shadow")
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def category_tier(category: str) -> str:
+    """Get the configured tier of a category."""
+    tier = os.getenv(f"ANALYSIS_TIER_{category.upper()}", _CATEGORY_TIERS.get(category, "standard"))
+    if tier not in MODEL_TIERS:
+        logging.warning(f"Unknown model tier {tier} for {category}; using standard")
+        return "standard"
+    return tier
+
+
+def model_for(category: str, fast: bool = False) -> str:
+    """
+    Get the model that analyzes a category.
+
+    Args:
+        category: Category key (e.g., "offense", "optimize")
+        fast: Use the fast tier regardless of the category's tier
+
+    Returns:
+        Model name
+    """
+    return MODEL_TIERS[FAST_TIER if fast else category_tier(category)]
+
+
+def result_scores(result: str) -> dict[str, float]:
+    """
+    Extract the scores of a structured result.
+
+    Args:
+        result: JSON result (e.g., {"Offense": {"Score": ..., "Roles": {...}}})
+
+    Returns:
+        Score by path ("Score", "Roles/Win Conditions", ...); empty if the
+        result is not a scored category
+    """
+    try:
+        data = json.loads(result)
+    except ValueError:
+        return {}
+
+    scores = {}
+    for category in data.values() if isinstance(data, dict) else []:
+        if not isinstance(category, dict):
+            continue
+        if isinstance(category.get("Score"), (int, float)):
+            scores["Score"] = float(category["Score"])
+        for group, entries in category.items():
+            if not isinstance(entries, dict):
+                continue
+            for name, entry in entries.items():
+                if isinstance(entry, dict) and isinstance(entry.get("Score"), (int, float)):
+                    scores[f"{group}/{name}"] = float(entry["Score"])
+    return scores
+
+
+def _compare(category: str, primary_model: str, shadow_model: str, primary: str, shadow: str) -> None:
+    """Emit the score differences between a primary and a shadow result."""
+    primary_scores = result_scores(primary)
+    shadow_scores = result_scores(shadow)
+    shared = primary_scores.keys() & shadow_scores.keys()
+    if not shared:
+        logging.warning(f"Shadow {category} result from {shadow_model} has no comparable scores")
+        return
+
+    deltas = {key: abs(primary_scores[key] - shadow_scores[key]) for key in shared}
+    attributes = {"category": category, "primary_model": primary_model, "shadow_model": shadow_model}
+    if "Score" in deltas:
+        record_score_delta(deltas["Score"], scope="category", **attributes)
+    record_score_delta(sum(deltas.values()) / len(deltas), scope="mean", **attributes)
+
+    logging.info(
+        f"Shadow {category}: {shadow_model} vs {primary_model} "
+        f"category delta {deltas.get('Score', 0.0):.2f}, mean delta {sum(deltas.values()) / len(deltas):.2f}"
+    )
+
+
+def _run_shadow(category: str, primary_model: str, shadow_model: str, chain_inputs: dict,
+                response_format: Optional[dict], primary: str) -> None:
+    # Local import to avoid circular dependency (langchain_utils is heavy)
+    from shared.langchain_utils import build_chain
+
+    try:
+        chain = build_chain(model=shadow_model, response_format=response_format, cache_key=category)
+        shadow = chain.invoke(chain_inputs)
+        _compare(category, primary_model, shadow_model, primary, shadow)
+    except Exception as e:
+        logging.warning(f"Shadow {category} run on {shadow_model} failed: {e}")
+
+
+def maybe_shadow(category: str, primary_model: str, chain_inputs: dict,
+                 response_format: Optional[dict], primary: str) -> None:
+    """
+    Re-run a sample of analyses on the shadow tier and compare scores.
+
+    Runs in the background; the primary result is never delayed or changed.
+
+    Args:
+        category: Category key
+        primary_model: Model that produced the primary result
+        chain_inputs: Inputs the primary chain was invoked with
+        response_format: Structured output format of the category
+        primary: Primary result
+    """
+    if not _SHADOW_TIER or _SHADOW_TIER not in MODEL_TIERS:
+        return
+
+    shadow_model = MODEL_TIERS[_SHADOW_TIER]
+    if shadow_model == primary_model or random.random() >= _SHADOW_RATE:
+        return
+
+    _shadow_pool.submit(_run_shadow, category, primary_model, shadow_model, chain_inputs, response_format, primary)
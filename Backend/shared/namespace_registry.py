@@ -0,0 +1,168 @@
+"""
+Namespace registry for RAG retrieval.
+
+Each knowledge blob in the container is ingested into the Pinecone namespace
+named after it (see ingest_blob). The registry precomputes, for every card in
+the card registry, its base namespace and its "evolution_" namespace, keeping
+only namespaces that were actually ingested. Lookups are then a dictionary
+access per card instead of string munging, unknown cards are rejected before
+any Pinecone or LLM call, and namespaces with no ingested knowledge are
+skipped instead of producing empty queries.
+"""
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+from shared.blobs_utils import list_blob_names
+from shared.card_registry import CardRegistry, get_registry, parse_deck
+from shared.rag_utils import card_to_namespace
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Seconds before the registry is rebuilt (picks up newly ingested blobs)
+_REGISTRY_TTL_SECONDS = 600
+
+# Prefix of evolution namespaces
+EVOLUTION_PREFIX = "evolution_"
+
+# Blobs in the container that hold app data rather than RAG knowledge
+_DATA_BLOBS = {"decks.csv", "decks.arrow", "card_synergy.npz", "cards.csv", "card_ids.csv", "features.csv"}
+
+# Blob prefixes that hold app data rather than RAG knowledge
+_DATA_PREFIXES = ("crawl/",)
+
+# File types that are always app data (tables, Arrow snapshots, NumPy
+# archives), so a new data blob is never ingested as text by mistake
+_DATA_SUFFIXES = (".csv", ".arrow", ".npz")
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def is_knowledge_blob(blob_name: str) -> bool:
+    """
+    Check whether a blob is RAG knowledge (ingested into Pinecone).
+
+    Args:
+        blob_name: Blob path within the container
+
+    Returns:
+        False for app data blobs (decks.csv, card_synergy.npz, crawl
+        checkpoints, ...)
+    """
+    return (
+        blob_name not in _DATA_BLOBS
+        and not blob_name.startswith(_DATA_PREFIXES)
+        and not blob_name.lower().endswith(_DATA_SUFFIXES)
+    )
+
+
+def blob_namespace(blob_name: str) -> str:
+    """
+    Get the Pinecone namespace a knowledge blob is ingested into.
+
+    Args:
+        blob_name: Blob path within the container (e.g., "hog_rider.txt")
+
+    Returns:
+        Namespace (e.g., "hog_rider")
+    """
+    return blob_name.split(".")[0]
+
+
+class NamespaceRegistry:
+    """Precomputed card id -> (namespace, evolution namespace) mapping."""
+
+    def __init__(self, cards: CardRegistry, ingested: Optional[set[str]]) -> None:
+        """
+        Args:
+            cards: Card registry
+            ingested: Namespaces that have knowledge ingested, or None if
+                unknown (every namespace is then assumed to exist)
+        """
+        self._cards = cards
+        self._ingested = ingested
+        self._namespaces: dict[int, Optional[str]] = {}
+        self._evolutions: dict[int, Optional[str]] = {}
+
+        for card_id, name in cards.items():
+            namespace = card_to_namespace(name)
+            self._namespaces[card_id] = self._existing(namespace)
+            self._evolutions[card_id] = self._existing(EVOLUTION_PREFIX + namespace)
+
+    def _existing(self, namespace: str) -> Optional[str]:
+        if self._ingested is None or namespace in self._ingested:
+            return namespace
+        return None
+
+    def has(self, namespace: str) -> bool:
+        """Check whether a namespace has knowledge ingested."""
+        return self._existing(namespace) is not None
+
+    def resolve(self, deck: str) -> tuple[int, ...]:
+        """
+        Resolve a deck string to card ids, rejecting unknown cards.
+
+        Args:
+            deck: Deck string (e.g., "[Hog Rider, Ice Spirit, ...]")
+
+        Returns:
+            Sorted tuple of card ids
+
+        Raises:
+            UnknownCardError: If any card is not in the card registry
+        """
+        return self._cards.encode(parse_deck(deck))
+
+    def card_namespaces(self, card_ids: Iterable[int]) -> list[str]:
+        """Base namespaces of the given cards that have knowledge ingested."""
+        namespaces = []
+        for card_id in card_ids:
+            namespace = self._namespaces[card_id]
+            if namespace:
+                namespaces.append(namespace)
+            else:
+                logging.warning(f"No knowledge ingested for card {self._cards.name_of(card_id)}; skipping")
+        return namespaces
+
+    def evolution_namespaces(self, card_ids: Iterable[int]) -> list[str]:
+        """Evolution namespaces of the given cards that have knowledge ingested."""
+        return [ns for ns in (self._evolutions[card_id] for card_id in card_ids) if ns]
+
+
+# ---------------------------------------------------------------------------
+# Registry Loading
+# ---------------------------------------------------------------------------
+
+_registry: Optional[NamespaceRegistry] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _ingested_namespaces() -> Optional[set[str]]:
+    """Namespaces of the knowledge blobs in the container, or None if listing fails."""
+    try:
+        return {blob_namespace(name) for name in list_blob_names() if is_knowledge_blob(name)}
+    except Exception as e:
+        logging.warning(f"Could not list knowledge blobs, namespace validation disabled: {e}")
+        return None
+
+
+def get_namespace_registry() -> NamespaceRegistry:
+    """
+    Get the process-wide namespace registry, building it on first use.
+
+    Returns:
+        The namespace registry (rebuilt at most once per _REGISTRY_TTL_SECONDS)
+    """
+    global _registry, _loaded_at
+
+    with _lock:
+        if _registry is None or time.monotonic() - _loaded_at > _REGISTRY_TTL_SECONDS:
+            _registry = NamespaceRegistry(get_registry(), _ingested_namespaces())
+            _loaded_at = time.monotonic()
+        return _registry
@@ -0,0 +1,137 @@
+"""
+Per-player crawl state for incremental deck refreshes.
+
+The clan member list already carries each member's lastSeen timestamp. By
+remembering, per player, the lastSeen value at the time of the last fetch and
+the deck seen then, the crawler can skip get_player_data for players who have
+not played since, and count their remembered deck instead. State lives in the
+"players" table, one entity per player tag.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared.deck_store import format_card_ids
+from shared.table_utils import player_state_table, PARTITION_KEY
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Maximum operations per table transaction (Azure Table Storage limit)
+_BATCH_SIZE = 100
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _row_key(player_tag: str) -> str:
+    """Table keys may not contain "#", so player tags are stored without it."""
+    return player_tag.lstrip("#")
+
+
+def load_player_states() -> dict[str, dict]:
+    """
+    Load the crawl state of every known player.
+
+    Returns:
+        Dictionary mapping player tag (with "#") to state entity
+    """
+    query = f"PartitionKey eq '{PARTITION_KEY}'"
+    return {f"#{e['RowKey']}": e for e in player_state_table.query_entities(query)}
+
+
+def get_player_states(player_tags: list[str], max_workers: int = 8) -> dict[str, dict]:
+    """
+    Look up the crawl state of specific players with parallel point reads.
+
+    Used by shard workers, which only need the state of their own clans'
+    members rather than the whole table.
+
+    Args:
+        player_tags: Player tags (with "#")
+        max_workers: Number of concurrent reads
+
+    Returns:
+        Dictionary mapping player tag to state entity (unknown players omitted)
+    """
+    def _get(player_tag: str) -> Optional[dict]:
+        try:
+            return player_state_table.get_entity(partition_key=PARTITION_KEY, row_key=_row_key(player_tag))
+        except ResourceNotFoundError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(_get, player_tags)
+        return {tag: state for tag, state in zip(player_tags, results) if state is not None}
+
+
+def is_unchanged(state: Optional[dict], member: dict) -> bool:
+    """
+    Check whether a clan member has not played since their deck was last fetched.
+
+    Args:
+        state: Stored state for the player (None if never fetched)
+        member: Member entry from the clan member list
+
+    Returns:
+        True if the stored deck is still current and the fetch can be skipped
+    """
+    if not state or not state.get("DeckCards"):
+        return False
+    last_seen = member.get("lastSeen")
+    # lastSeen timestamps are fixed-width, so string order is time order
+    return bool(last_seen) and last_seen <= state.get("LastSeen", "")
+
+
+def build_player_state(
+    player_tag: str,
+    member: dict,
+    deck_hash: Optional[str],
+    cards: list[str],
+    card_ids: list[Optional[int]],
+    fetched_at: datetime
+) -> dict:
+    """
+    Build the state entity recorded after fetching a player.
+
+    Args:
+        player_tag: Player tag (e.g., "#ABC123")
+        member: Member entry from the clan member list
+        deck_hash: Hash of the fetched deck (None if the player had no deck)
+        cards: Card names of the fetched deck
+        card_ids: Clash Royale API card ids, aligned with cards
+        fetched_at: Time of the fetch
+
+    Returns:
+        Entity for the players table
+    """
+    return {
+        "PartitionKey": PARTITION_KEY,
+        "RowKey": _row_key(player_tag),
+        "LastSeen": member.get("lastSeen", ""),
+        "LastFetched": fetched_at,
+        "DeckHash": deck_hash or "",
+        "DeckCards": "; ".join(cards),
+        "DeckCardIds": format_card_ids(card_ids),
+    }
+
+
+def save_player_states(states: list[dict]) -> None:
+    """
+    Persist updated player states in table transactions of up to 100.
+
+    Args:
+        states: Entities built with build_player_state
+    """
+    for i in range(0, len(states), _BATCH_SIZE):
+        batch = states[i:i + _BATCH_SIZE]
+        player_state_table.submit_transaction(
+            [("upsert", entity, {"mode": "replace"}) for entity in batch]
+        )
+    if states:
+        logging.info(f"Saved crawl state for {len(states)} players")
@@ -247,6 +247,7 @@ STRICT RULES (MANDATORY)
    - "Cards" (The cards in the deck that fit that combo and must be included in the summary)
 5. Only list actual combos present in the deck — do NOT invent combos that do not exist.
 6. The final Synergy.Score MUST be computed strictly using the rubric below.
+7. If the user input lists "Meta Pair Synergy", use it as evidence of which card pairs top players run together (a "lift" above 1.0 means the pair is played together more often than the two cards' popularity explains). It supports the summaries; it never overrides the rubric.
 
 ------------------------------------------------------------
 STRICT SCORING RUBRIC  
@@ -482,6 +483,7 @@ STRICT OPTIMIZATION RULES
 2. Identify the deck’s weakest category (score < 3.5).  
    Only consider swaps that directly target that weakness.
 3. NEVER change the primary win condition or the overall deck archetype.
+   If the user input lists "Similar Meta Decks" (the popular decks closest to this one), prefer incoming cards that those decks run with this win condition.
 4. The new deck that includes the swapped cards MUST score higher than the original deck. Use the scoring criteria below to validate this (DO NOT output the new scores, only use them for internal validation).
    Offense Scoring Criteria:
    ------------------------------------------------------------
@@ -756,3 +758,39 @@ FORMATTING RULES
 - No additional commentary outside the JSON.
 - All summaries and reasonings must be concise and use bullet points.
 '''
+
+narrative_prompt = '''
+You are a former professional Clash Royale esports player and coach.
+Write the summaries of a deck report whose scores have already been computed with the scoring rubric.
+
+The user input contains the deck and, under "Computed Scores", the JSON object to return.
+
+STRICT RULES (MANDATORY)
+------------------------------------------------------------
+1. Every "Score" and "Cards" value is final: copy it EXACTLY. Never recompute, round or change a score, and never add or remove cards.
+2. Fill in every empty "Summary" and "Description" using concise bullet points:
+   - Pros:       "✅ ..."
+   - Cons:       "❗ ..."
+   - Suggestions:"💡 ..."
+3. Explain each score from the cards that earned it, using the attached context, and suggest what would raise low scores.
+   If the user input lists "Meta Pair Synergy", cite pairs with a high "lift" (played together more often than their popularity explains) as proven pairings.
+4. Keep the keys and their order exactly as given.
+
+The output MUST be the completed JSON object with NO additional commentary outside the JSON.
+'''
+
+# Optimization prompt used when swaps were already searched locally: the
+# rubric walk-through of optimize_prompt is replaced by a choice among the
+# ranked candidate swaps (tower troop and evolution rules are unchanged)
+optimize_candidates_prompt = optimize_prompt.split("STRICT OPTIMIZATION RULES")[0] + '''CANDIDATE SWAP RULES
+------------------------------------------------------------
+1. The user input lists "Candidate Swaps": swap sets already validated with the scoring rubric and ranked by how much they raise the deck's category scores and its fit with the current meta (best first).
+2. "Recommended Swaps" MUST be exactly one of the candidates, with its cards copied exactly. Prefer the first candidate unless another one better fixes the deck's weakest category.
+3. The Improvement Summary must explain which weaknesses the swap fixes and what the deck gives up, citing the candidate's category scores.
+4. If the user input lists "Similar Meta Decks" (the popular decks closest to this one), mention when the chosen swap moves the deck toward one of them.
+5. All summaries MUST use bullet points with:
+   - Pros "✅"
+   - Cons "❗"
+   - Suggestions "💡"
+
+TOWER TROOP RULES''' + optimize_prompt.split("TOWER TROOP RULES")[1]
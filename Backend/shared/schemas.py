@@ -0,0 +1,96 @@
+"""
+JSON schemas for structured model output.
+
+Each schema mirrors the JSON template of the matching prompt in prompts.py
+(field names, role/combo/archetype names and their order) and is sent as an
+OpenAI "json_schema" response format in strict mode, so the model can only
+return an object of exactly that shape. The serialized output is the same
+string the frontend already parses (e.g. {"Offense": {...}}).
+"""
+
+# ---------------------------------------------------------------------------
+# Building Blocks
+# ---------------------------------------------------------------------------
+
+_SCORE = {"type": "number", "minimum": 0.0, "maximum": 5.0}
+_TEXT = {"type": "string"}
+_CARDS = {"type": "array", "items": _TEXT}
+
+
+def _object(properties: dict) -> dict:
+    """Strict object schema: every property required, nothing else allowed."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _response_format(name: str, schema: dict) -> dict:
+    """Wrap a schema as an OpenAI json_schema response format."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+def _category(field: str, group: str, names: list[str], entry: dict) -> dict:
+    """Schema of a scored category whose sub-entries all share one shape."""
+    return _response_format(field.lower(), _object({
+        field: _object({
+            "Score": _SCORE,
+            "Summary": _TEXT,
+            group: _object({name: entry for name in names}),
+        })
+    }))
+
+
+_ROLE = _object({"Score": _SCORE, "Summary": _TEXT, "Cards": _CARDS})
+_ARCHETYPE = _object({"Score": _SCORE, "Description": _TEXT})
+
+# ---------------------------------------------------------------------------
+# Category Schemas
+# ---------------------------------------------------------------------------
+
+OFFENSE_ROLES = [
+    "Win Conditions", "Offensive Support", "Big Damage Spells", "Small Damage Spells",
+    "Bridge Pressure", "Pump Responses", "Chip Damage",
+]
+
+DEFENSE_ROLES = [
+    "Air Defense", "Crowd Control", "Mini Tank", "Buildings", "Reset Mechanics", "Tank Killer",
+    "Control Stall", "Cycle Cards", "Investments", "Swarm Units", "Spell Bait",
+]
+
+SYNERGY_COMBOS = ["Offensive Combos", "Defensive Combos"]
+
+VERSATILITY_ARCHETYPES = [
+    "Versus Beatdown 🪖", "Versus Bridge Spam 🚨", "Versus Siege 🏰", "Versus Bait 🪝",
+    "Versus Cycle ♻️", "Versus Royal Giant 💣", "Versus Graveyard ☠️",
+]
+
+offense_schema = _category("Offense", "Roles", OFFENSE_ROLES, _ROLE)
+defense_schema = _category("Defense", "Roles", DEFENSE_ROLES, _ROLE)
+synergy_schema = _category("Synergy", "Combos", SYNERGY_COMBOS, _ROLE)
+versatility_schema = _category("Versatility", "Archetypes", VERSATILITY_ARCHETYPES, _ARCHETYPE)
+
+optimize_schema = _response_format("optimize", _object({
+    "Optimize": _object({
+        "Recommended Swaps": _object({
+            "Swaps": {
+                "type": "array",
+                "items": _object({"Replaced Card": _TEXT, "New Card": _TEXT}),
+            },
+            "Improvement Summary": _TEXT,
+        }),
+        "Recommended Tower Troop": _object({"Tower Troop": _TEXT, "Reasoning": _TEXT}),
+        "Recommended Evolutions": _object({
+            "Evolutions": {
+                "type": "array",
+                "items": _object({"Evolution": _TEXT}),
+            },
+            "Reasoning": _TEXT,
+        }),
+    })
+}))
@@ -0,0 +1,517 @@
+"""
+Rule-based scoring of the analysis rubrics.
+
+The rubrics in prompts.py are arithmetic over card roles ("+4.0 if the deck
+contains a primary win condition", "+2.0 per cheap cycle card", capped at
+5.0). This module applies them locally: each card's roles come from the tag
+table below, its elixir cost and type from cards.csv (via the card
+registry), and the win-condition partners and combos from the synergy
+tables. The model then only writes the summaries for scores that are
+already fixed, so the same deck always gets the same scores.
+
+A deck containing a card missing from the tag table is not scored locally;
+the analysis falls back to the full rubric prompt. Rules that need judgment
+(e.g. "-1.0 if combos require difficult timing") are not applied.
+"""
+import json
+import logging
+from typing import Optional
+
+from shared.card_registry import get_registry, normalize_name
+from shared.schemas import DEFENSE_ROLES, OFFENSE_ROLES, VERSATILITY_ARCHETYPES
+
+# ---------------------------------------------------------------------------
+# Card Roles
+# ---------------------------------------------------------------------------
+
+WIN = "win_condition"            # primary win condition
+WIN2 = "secondary_win_condition"
+SUPPORT = "offensive_support"
+BIG_SPELL = "big_spell"          # >=3 elixir tower-damaging spell
+SMALL_SPELL = "small_spell"      # <=3 elixir tower-damaging spell
+UTILITY = "utility"              # spell with knockback/reset/slow as well as damage
+BRIDGE = "bridge_pressure"
+DUAL_LANE = "dual_lane"
+PUMP_PUNISH = "pump_punish"
+CHIP = "chip"
+AIR = "targets_air"
+AIR_SPLASH = "air_splash"
+FRAGILE = "fragile"              # dies to common spells
+SPLASH = "splash"
+MINI_TANK = "mini_tank"
+DEFENSIVE_BUILDING = "defensive_building"
+SIEGE = "siege"
+RESET = "reset"
+TANK_KILLER = "tank_killer"
+KITING = "kiting"
+SLOW = "slow"                    # slow, stun or knockback
+BACK = "back_investment"         # troop played at the back for passive value
+SWARM = "swarm"
+BAIT = "spell_bait"
+TORNADO = "tornado"
+
+_CARD_TAGS: dict[str, tuple[str, ...]] = {
+    # Win conditions
+    "Hog Rider": (WIN, BRIDGE),
+    "Royal Giant": (WIN,),
+    "Giant": (WIN,),
+    "Golem": (WIN,),
+    "Lava Hound": (WIN,),
+    "Balloon": (WIN,),
+    "Miner": (WIN, CHIP, PUMP_PUNISH, BRIDGE),
+    "Graveyard": (WIN,),
+    "Goblin Barrel": (WIN, CHIP, BRIDGE, BAIT),
+    "X-Bow": (WIN, SIEGE),
+    "Mortar": (WIN, SIEGE, SPLASH),
+    "Electro Giant": (WIN, RESET),
+    "Goblin Giant": (WIN,),
+    "Elixir Golem": (WIN,),
+    "Ram Rider": (WIN, BRIDGE, SLOW),
+    "Royal Hogs": (WIN, BRIDGE, DUAL_LANE),
+    "Three Musketeers": (WIN, AIR, DUAL_LANE),
+    "Goblin Drill": (WIN, CHIP, PUMP_PUNISH),
+    "Goblinstein": (WIN,),
+    # Secondary win conditions
+    "Wall Breakers": (WIN2, BRIDGE, DUAL_LANE),
+    "Skeleton Barrel": (WIN2, BAIT),
+    "Battle Ram": (WIN2, BRIDGE),
+    "Prince": (WIN2, BRIDGE),
+    "Elite Barbarians": (WIN2, BRIDGE, DUAL_LANE),
+    "Royal Ghost": (WIN2, BRIDGE, SPLASH),
+    "Bandit": (WIN2, BRIDGE),
+    "Boss Bandit": (WIN2, BRIDGE),
+    "Giant Skeleton": (WIN2, SPLASH),
+    "Suspicious Bush": (WIN2, CHIP, BAIT),
+    "Rune Giant": (WIN2,),
+    "P.E.K.K.A": (WIN2, TANK_KILLER),
+    "Mega Knight": (WIN2, SPLASH),
+    # Support and defense troops
+    "Knight": (MINI_TANK, SUPPORT),
+    "Valkyrie": (MINI_TANK, SPLASH, SUPPORT),
+    "Ice Golem": (MINI_TANK, RESET, SLOW, KITING, SUPPORT),
+    "Dark Prince": (MINI_TANK, SPLASH, BRIDGE, SUPPORT),
+    "Golden Knight": (MINI_TANK, BRIDGE, SUPPORT),
+    "Skeleton King": (MINI_TANK, SPLASH),
+    "Monk": (MINI_TANK, SUPPORT),
+    "Mighty Miner": (MINI_TANK, TANK_KILLER),
+    "Battle Healer": (MINI_TANK, SUPPORT),
+    "Goblin Machine": (MINI_TANK, SUPPORT),
+    "Fisherman": (MINI_TANK, SLOW, SUPPORT),
+    "Mini P.E.K.K.A": (TANK_KILLER, SUPPORT),
+    "Lumberjack": (TANK_KILLER, BRIDGE, SUPPORT),
+    "Inferno Dragon": (AIR, TANK_KILLER),
+    "Hunter": (AIR, SPLASH, TANK_KILLER),
+    "Archer Queen": (AIR, TANK_KILLER, BRIDGE, SUPPORT),
+    "Sparky": (SPLASH, TANK_KILLER),
+    "Musketeer": (AIR, SUPPORT),
+    "Archers": (AIR, FRAGILE, SUPPORT),
+    "Dart Goblin": (AIR, CHIP, FRAGILE, SUPPORT),
+    "Magic Archer": (AIR, CHIP, SPLASH, BACK, SUPPORT),
+    "Princess": (AIR, AIR_SPLASH, SPLASH, CHIP, FRAGILE, BACK, BAIT),
+    "Mega Minion": (AIR, SUPPORT),
+    "Flying Machine": (AIR, SUPPORT),
+    "Mother Witch": (AIR, SUPPORT),
+    "Phoenix": (AIR, SUPPORT),
+    "Little Prince": (AIR, SUPPORT),
+    "Rascals": (AIR,),
+    "Zappies": (AIR, RESET, SLOW),
+    "Electro Wizard": (AIR, RESET, SLOW, SUPPORT),
+    "Electro Dragon": (AIR, AIR_SPLASH, SPLASH, RESET),
+    "Baby Dragon": (AIR, AIR_SPLASH, SPLASH, SUPPORT),
+    "Wizard": (AIR, AIR_SPLASH, SPLASH, SUPPORT),
+    "Witch": (AIR, AIR_SPLASH, SPLASH, SUPPORT),
+    "Ice Wizard": (AIR, AIR_SPLASH, SPLASH, SLOW),
+    "Executioner": (AIR, AIR_SPLASH, SPLASH),
+    "Firecracker": (AIR, AIR_SPLASH, SPLASH, FRAGILE, SUPPORT),
+    "Skeleton Dragons": (AIR, AIR_SPLASH, SPLASH),
+    "Bomber": (SPLASH, FRAGILE, SUPPORT),
+    "Bowler": (SPLASH, SLOW),
+    "Goblin Demolisher": (SPLASH,),
+    "Night Witch": (SUPPORT,),
+    "Berserker": (SUPPORT,),
+    "Royal Recruits": (DUAL_LANE,),
+    "Cannon Cart": (SUPPORT,),
+    # Spirits and swarms
+    "Ice Spirit": (RESET, SLOW, CHIP, KITING, FRAGILE, SUPPORT),
+    "Fire Spirit": (AIR, SPLASH, CHIP, KITING, FRAGILE, SUPPORT),
+    "Electro Spirit": (AIR, RESET, SLOW, CHIP, KITING, FRAGILE),
+    "Heal Spirit": (CHIP, KITING, SUPPORT),
+    "Skeletons": (SWARM, KITING, FRAGILE),
+    "Bats": (AIR, SWARM, FRAGILE, BAIT),
+    "Minions": (AIR, SWARM, FRAGILE, BAIT),
+    "Minion Horde": (AIR, SWARM, FRAGILE, BAIT),
+    "Goblins": (SWARM, FRAGILE, BAIT),
+    "Spear Goblins": (AIR, CHIP, SWARM, FRAGILE, BAIT),
+    "Goblin Gang": (SWARM, FRAGILE, BAIT),
+    "Skeleton Army": (SWARM, FRAGILE, BAIT),
+    "Guards": (SWARM, BAIT),
+    "Barbarians": (SWARM,),
+    # Buildings
+    "Cannon": (DEFENSIVE_BUILDING, TANK_KILLER, KITING),
+    "Tesla": (DEFENSIVE_BUILDING, AIR, TANK_KILLER, KITING),
+    "Bomb Tower": (DEFENSIVE_BUILDING, SPLASH, KITING),
+    "Inferno Tower": (DEFENSIVE_BUILDING, AIR, TANK_KILLER, KITING),
+    "Goblin Cage": (DEFENSIVE_BUILDING, KITING),
+    "Tombstone": (KITING, SWARM),
+    "Furnace": (KITING, SPLASH),
+    "Goblin Hut": (KITING, AIR, BAIT),
+    "Barbarian Hut": (KITING,),
+    "Elixir Collector": (),
+    # Spells
+    "Fireball": (BIG_SPELL, PUMP_PUNISH),
+    "Rocket": (BIG_SPELL, PUMP_PUNISH),
+    "Lightning": (BIG_SPELL, PUMP_PUNISH, RESET),
+    "Earthquake": (BIG_SPELL, PUMP_PUNISH),
+    "Poison": (BIG_SPELL,),
+    "Void": (BIG_SPELL,),
+    "Arrows": (SMALL_SPELL,),
+    "Zap": (SMALL_SPELL, UTILITY, RESET),
+    "The Log": (SMALL_SPELL, UTILITY, SLOW),
+    "Giant Snowball": (SMALL_SPELL, UTILITY, SLOW),
+    "Barbarian Barrel": (SMALL_SPELL, UTILITY),
+    "Goblin Curse": (SMALL_SPELL,),
+    "Royal Delivery": (),
+    "Tornado": (TORNADO, SLOW),
+    "Freeze": (RESET, SLOW),
+    "Vines": (RESET, SLOW),
+    "Rage": (),
+    "Clone": (),
+    "Mirror": (),
+}
+
+# Proven offensive combos (two cards that create reliable tower pressure)
+_OFFENSIVE_COMBOS = [
+    ("Hog Rider", "Ice Spirit"), ("Hog Rider", "Earthquake"), ("Hog Rider", "Ice Golem"),
+    ("Giant", "Mini P.E.K.K.A"), ("Giant", "Prince"), ("Giant", "Dark Prince"), ("Giant", "Musketeer"),
+    ("Royal Giant", "Fisherman"), ("Royal Giant", "Lightning"), ("Royal Giant", "Furnace"),
+    ("Miner", "Poison"), ("Miner", "Wall Breakers"), ("Miner", "Bats"),
+    ("Graveyard", "Freeze"), ("Graveyard", "Poison"), ("Graveyard", "Baby Dragon"),
+    ("Wall Breakers", "Bomber"), ("Golem", "Night Witch"), ("Golem", "Lumberjack"), ("Golem", "Baby Dragon"),
+    ("Lava Hound", "Balloon"), ("Lava Hound", "Miner"), ("Lava Hound", "Mega Minion"),
+    ("Balloon", "Lumberjack"), ("Balloon", "Freeze"), ("Goblin Barrel", "Princess"),
+    ("Goblin Barrel", "Goblin Gang"), ("X-Bow", "Tesla"), ("X-Bow", "Rocket"), ("Mortar", "Miner"),
+    ("Battle Ram", "Bandit"), ("P.E.K.K.A", "Battle Ram"), ("Ram Rider", "Bandit"),
+    ("Elixir Golem", "Battle Healer"), ("Elixir Golem", "Night Witch"), ("Electro Giant", "Tornado"),
+    ("Electro Giant", "Lightning"), ("Goblin Giant", "Sparky"), ("Three Musketeers", "Battle Ram"),
+    ("Royal Hogs", "Royal Recruits"), ("Royal Hogs", "Earthquake"), ("Mega Knight", "Miner"),
+    ("Goblin Drill", "Wall Breakers"),
+]
+
+# Proven defensive combos (two cards that reliably stop pushes together)
+_DEFENSIVE_COMBOS = [
+    ("Tornado", "Valkyrie"), ("Tornado", "Bowler"), ("Tornado", "Executioner"), ("Tornado", "Ice Wizard"),
+    ("Tornado", "Baby Dragon"), ("Tornado", "Wizard"), ("Tornado", "Bomb Tower"), ("Tornado", "Inferno Tower"),
+    ("Tornado", "Goblin Cage"), ("Tornado", "Hunter"), ("Cannon", "Ice Spirit"), ("Cannon", "Skeletons"),
+    ("Cannon", "Fisherman"), ("Tesla", "Ice Spirit"), ("Tesla", "Skeletons"), ("Bomb Tower", "Skeletons"),
+    ("Inferno Tower", "Ice Golem"), ("Inferno Dragon", "Ice Golem"), ("Knight", "Musketeer"),
+    ("Knight", "Archers"), ("Valkyrie", "Musketeer"), ("Ice Golem", "Musketeer"), ("Ice Golem", "Baby Dragon"),
+    ("Mini P.E.K.K.A", "Ice Spirit"), ("Mini P.E.K.K.A", "Skeletons"), ("P.E.K.K.A", "Electro Wizard"),
+    ("Mega Knight", "Bats"), ("Electro Wizard", "Inferno Dragon"),
+]
+
+# Cards that support a win condition without forming a listed combo with it
+_WIN_CONDITION_PARTNERS = {
+    "Hog Rider": ("Cannon", "Tesla", "Fireball", "The Log", "Valkyrie", "Musketeer"),
+    "Graveyard": ("Knight", "Ice Wizard", "Tornado", "Barbarian Barrel"),
+    "Lava Hound": ("Tombstone", "Fireball", "Inferno Dragon"),
+    "Golem": ("Lightning", "Tornado", "Mega Minion"),
+    "X-Bow": ("Fireball", "Archers", "Knight", "Ice Golem", "The Log"),
+    "Royal Giant": ("Cannon", "Earthquake", "Hunter"),
+    "Goblin Barrel": ("Rocket", "Inferno Tower", "Ice Spirit", "The Log"),
+    "Miner": ("Valkyrie", "Musketeer", "Inferno Tower", "Bomb Tower"),
+}
+
+# Roles of each category, with the weight of the role in the category score
+_OFFENSE_WEIGHTS = dict(zip(OFFENSE_ROLES, [0.30, 0.20, 0.15, 0.15, 0.10, 0.05, 0.05]))
+_DEFENSE_WEIGHTS = dict(zip(DEFENSE_ROLES, [0.20, 0.20, 0.20, 0.20, 0.10, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05]))
+
+# Average elixir at or below which a deck keeps cycle parity
+_CYCLE_PARITY_ELIXIR = 3.5
+
+# Average elixir above which a deck counts as heavy
+_HEAVY_ELIXIR = 4.3
+
+# Combined elixir above which a defensive combo counts as expensive
+_EXPENSIVE_COMBO_ELIXIR = 7.0
+
+# Base score of a matchup before its adjustments ("Even / Skill-based")
+_MATCHUP_BASE = 3.0
+
+_MAX_SCORE = 5.0
+
+_TAGS = {normalize_name(name): frozenset(tags) for name, tags in _CARD_TAGS.items()}
+
+
+def _pairs(combos: list[tuple[str, str]]) -> list[frozenset]:
+    return [frozenset(normalize_name(card) for card in combo) for combo in combos]
+
+
+_OFFENSIVE = _pairs(_OFFENSIVE_COMBOS)
+_DEFENSIVE = _pairs(_DEFENSIVE_COMBOS)
+_PARTNERS = {
+    normalize_name(win): {normalize_name(card) for card in cards}
+    for win, cards in _WIN_CONDITION_PARTNERS.items()
+}
+for _combo in _OFFENSIVE:
+    for _card in _combo:
+        _PARTNERS.setdefault(_card, set()).update(_combo - {_card})
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _cap(score: float) -> float:
+    return round(min(max(score, 0.0), _MAX_SCORE), 1)
+
+
+class _Deck:
+    """A deck's cards with their roles, elixir costs and types."""
+
+    def __init__(self, cards: list[str]) -> None:
+        registry = get_registry()
+        self.names = cards
+        self.keys = [normalize_name(card) for card in cards]
+        self.tags = {key: _TAGS[key] for key in self.keys}
+        ids = [registry.id_of(card) for card in cards]
+        self.costs = {key: registry.elixir_of(card_id) if card_id else 0.0 for key, card_id in zip(self.keys, ids)}
+        self.types = {key: registry.type_of(card_id) if card_id else "" for key, card_id in zip(self.keys, ids)}
+        self._display = dict(zip(self.keys, cards))
+
+    def with_tag(self, tag: str) -> list[str]:
+        """Keys of the cards with a role."""
+        return [key for key in self.keys if tag in self.tags[key]]
+
+    def of_type(self, kind: str) -> list[str]:
+        """Keys of the cards of a type ("troop", "spell" or "building")."""
+        return [key for key in self.keys if self.types[key] == kind]
+
+    def cheap(self, elixir: float = 2.0) -> list[str]:
+        """Keys of the cards costing at most the given elixir (cost known)."""
+        return [key for key in self.keys if 0 < self.costs[key] <= elixir]
+
+    @property
+    def average_elixir(self) -> float:
+        costs = [cost for cost in self.costs.values() if cost > 0]
+        return sum(costs) / len(costs) if costs else 0.0
+
+    def partners_win_condition(self, keys: list[str]) -> bool:
+        """Whether any of the cards supports one of the deck's win conditions."""
+        wins = self.with_tag(WIN) + self.with_tag(WIN2)
+        return any(key in _PARTNERS.get(win, ()) for win in wins for key in keys)
+
+    def combos(self, pairs: list[frozenset]) -> list[frozenset]:
+        """Combos whose cards are all in the deck."""
+        return [combo for combo in pairs if combo <= set(self.keys)]
+
+    def display(self, keys) -> list[str]:
+        """Display names of card keys, in deck order."""
+        wanted = set(keys)
+        return [self._display[key] for key in self.keys if key in wanted]
+
+
+def _role(score: float, cards: list[str], deck: _Deck) -> dict:
+    return {"Score": _cap(score), "Summary": "", "Cards": deck.display(cards)}
+
+
+def _weighted(roles: dict, weights: dict) -> float:
+    return round(sum(roles[name]["Score"] * weight for name, weight in weights.items()), 1)
+
+
+# ---------------------------------------------------------------------------
+# Category Rubrics
+# ---------------------------------------------------------------------------
+
+def _offense(deck: _Deck) -> dict:
+    wins, secondary = deck.with_tag(WIN), deck.with_tag(WIN2)
+    support = deck.with_tag(SUPPORT)
+    big, small = deck.with_tag(BIG_SPELL), deck.with_tag(SMALL_SPELL)
+    bridge, chip = deck.with_tag(BRIDGE), deck.with_tag(CHIP)
+    punish = deck.with_tag(PUMP_PUNISH)
+
+    roles = {
+        "Win Conditions": _role(4.0 * bool(wins) + 1.0 * bool(secondary), wins + secondary, deck),
+        "Offensive Support": _role(len(support) + 1.0 * deck.partners_win_condition(support), support, deck),
+        "Big Damage Spells": _role(4.0 * bool(big) + 1.0 * deck.partners_win_condition(big), big, deck),
+        "Small Damage Spells": _role(
+            4.0 * bool(small) + 1.0 * any(UTILITY in deck.tags[key] for key in small), small, deck
+        ),
+        "Bridge Pressure": _role(len(bridge) + 1.0 * bool(deck.with_tag(DUAL_LANE)), bridge, deck),
+        "Pump Responses": _role(3.0 * bool(punish) + 2.0 * bool(bridge), punish + bridge, deck),
+        "Chip Damage": _role(2.0 + (len(chip) - 1) if chip else 0.0, chip, deck),
+    }
+    return {"Offense": {"Score": _weighted(roles, _OFFENSE_WEIGHTS), "Summary": "", "Roles": roles}}
+
+
+def _defense(deck: _Deck) -> dict:
+    air = [key for key in deck.with_tag(AIR) if deck.types[key] != "spell"]
+    splash = [key for key in deck.with_tag(SPLASH) if deck.types[key] != "spell"]
+    tornado = deck.with_tag(TORNADO)
+    mini_tanks = deck.with_tag(MINI_TANK)
+    defensive, siege = deck.with_tag(DEFENSIVE_BUILDING), deck.with_tag(SIEGE)
+    resets = deck.with_tag(RESET)
+    killers = deck.with_tag(TANK_KILLER)
+    buildings = deck.of_type("building")
+    kiting = sorted(set(deck.with_tag(KITING)) | set(buildings), key=deck.keys.index)
+    slows = deck.with_tag(SLOW)
+    cycle = deck.cheap()
+    back = deck.with_tag(BACK)
+    collectors = [key for key in buildings if key == normalize_name("Elixir Collector")]
+    swarms, bait = deck.with_tag(SWARM), deck.with_tag(BAIT)
+
+    all_fragile = bool(air) and all(FRAGILE in deck.tags[key] or SWARM in deck.tags[key] for key in air)
+    roles = {
+        "Air Defense": _role(
+            2.0 * len(air) + 1.0 * bool(deck.with_tag(AIR_SPLASH)) - 1.0 * all_fragile, air, deck
+        ),
+        "Crowd Control": _role(2.0 * len(splash) + 1.0 * bool(tornado), splash + tornado, deck),
+        "Mini Tank": _role(4.0 * bool(mini_tanks) + 1.0 * deck.partners_win_condition(mini_tanks), mini_tanks, deck),
+        "Buildings": _role(
+            4.0 * bool(defensive) + 3.0 * bool(siege) + 1.0 * deck.partners_win_condition(buildings),
+            buildings, deck
+        ),
+        "Reset Mechanics": _role(4.0 * bool(resets) + 1.0 * (len(resets) > 1), resets, deck),
+        "Tank Killer": _role(5.0 * bool(killers), killers, deck),
+        "Control Stall": _role(len(kiting) + len(slows) + 2.0 * bool(tornado), kiting + slows, deck),
+        "Cycle Cards": _role(2.0 * len(cycle), cycle, deck),
+        "Investments": _role(
+            2.0 * len(back) + 2.0 * len(buildings) + 1.0 * len(collectors), back + buildings, deck
+        ),
+        "Swarm Units": _role(2.0 * len(swarms), swarms, deck),
+        "Spell Bait": _role(2.0 * len(bait), bait, deck),
+    }
+    return {"Defense": {"Score": _weighted(roles, _DEFENSE_WEIGHTS), "Summary": "", "Roles": roles}}
+
+
+def _combo_role(deck: _Deck, combos: list[frozenset], supporting: list[str], penalty: bool) -> dict:
+    in_combos = set().union(*combos) if combos else set()
+    extra = [key for key in supporting if key not in in_combos]
+    score = 1.5 * min(len(combos), 2) + 0.5 * len(extra) - 1.0 * penalty
+    return _role(score, list(in_combos) + extra, deck)
+
+
+def _synergy(deck: _Deck) -> dict:
+    offensive = deck.combos(_OFFENSIVE)
+    defensive = deck.combos(_DEFENSIVE)
+    control = sorted(set(deck.cheap()) | set(deck.with_tag(SLOW)), key=deck.keys.index)
+    expensive = bool(defensive) and all(
+        sum(deck.costs[key] for key in combo) > _EXPENSIVE_COMBO_ELIXIR for combo in defensive
+    )
+
+    combos = {
+        "Offensive Combos": _combo_role(deck, offensive, deck.with_tag(SUPPORT), penalty=False),
+        "Defensive Combos": _combo_role(deck, defensive, control, penalty=expensive),
+    }
+    score = round(sum(combo["Score"] for combo in combos.values()) * 0.5, 1)
+    return {"Synergy": {"Score": score, "Summary": "", "Combos": combos}}
+
+
+def _versatility(deck: _Deck) -> dict:
+    killers = bool(deck.with_tag(TANK_KILLER))
+    buildings = bool(deck.of_type("building"))
+    defensive = bool(deck.with_tag(DEFENSIVE_BUILDING))
+    mini_tanks = bool(deck.with_tag(MINI_TANK))
+    small = bool(deck.with_tag(SMALL_SPELL))
+    splash = bool(deck.with_tag(SPLASH))
+    cycle = bool(deck.cheap())
+    stall = bool(deck.with_tag(KITING) or deck.with_tag(SLOW) or buildings)
+    air = [key for key in deck.with_tag(AIR) if deck.types[key] != "spell"]
+    pressure = bool(deck.with_tag(WIN) or deck.with_tag(BRIDGE))
+    average = deck.average_elixir
+
+    adjustments = [
+        # Beatdown: tank killers, cycle + stall; weak air defense
+        2.0 * killers + 1.0 * (cycle and stall) - 2.0 * (len(air) < 2),
+        # Bridge spam: quick defensive answers, cheap cycle; nothing to stop the other lane
+        2.0 * (mini_tanks or defensive) + 1.0 * cycle - 2.0 * (not mini_tanks and not defensive),
+        # Siege: buildings, big spells; cannot cross the river
+        2.0 * buildings + 1.0 * bool(deck.with_tag(BIG_SPELL)) - 2.0 * (not pressure),
+        # Bait: small spell, cheap units; no small spell
+        2.0 * small + 1.0 * bool(deck.with_tag(SWARM) or cycle) - 2.0 * (not small),
+        # Cycle: consistent responses, cycle parity; heavy deck
+        1.5 * (buildings or mini_tanks) + 1.0 * (0 < average <= _CYCLE_PARITY_ELIXIR)
+        - 2.0 * (average > _HEAVY_ELIXIR),
+        # Royal Giant: tank killers, defensive buildings; only fragile troops
+        2.0 * killers + 1.0 * defensive - 2.0 * (not killers and not mini_tanks and not buildings),
+        # Graveyard: splash, cheap spells; neither
+        2.0 * splash + 1.0 * small - 2.0 * (not splash and not small),
+    ]
+
+    archetypes = {
+        name: {"Score": _cap(_MATCHUP_BASE + adjustment), "Description": ""}
+        for name, adjustment in zip(VERSATILITY_ARCHETYPES, adjustments)
+    }
+    score = round(sum(entry["Score"] for entry in archetypes.values()) / len(archetypes), 1)
+    return {"Versatility": {"Score": score, "Summary": "", "Archetypes": archetypes}}
+
+
+_RUBRICS = {
+    "offense": _offense,
+    "defense": _defense,
+    "synergy": _synergy,
+    "versatility": _versatility,
+}
+
+
+def card_roles(card: str) -> Optional[frozenset]:
+    """Get a card's roles, or None if the card is missing from the tag table."""
+    return _TAGS.get(normalize_name(card))
+
+
+def score_deck(category: str, cards: list[str]) -> Optional[dict]:
+    """
+    Score a deck category with its rubric.
+
+    Args:
+        category: Category key ("offense", "defense", "synergy" or "versatility")
+        cards: Card display names
+
+    Returns:
+        Result skeleton in the category's output format, with every score
+        and card list filled in and every summary/description empty, or None
+        if the category has no rubric or a card's roles are unknown
+    """
+    rubric = _RUBRICS.get(category)
+    if rubric is None:
+        return None
+
+    untagged = [card for card in cards if normalize_name(card) not in _TAGS]
+    if untagged:
+        logging.info(f"No local {category} scoring for deck with untagged card(s): {', '.join(untagged)}")
+        return None
+
+    return rubric(_Deck(cards))
+
+
+def apply_scores(result: str, scores: dict) -> str:
+    """
+    Overwrite the scores and card lists of a model result with computed ones.
+
+    Args:
+        result: Model output (JSON)
+        scores: Output of score_deck
+
+    Returns:
+        Result with every "Score" and "Cards" taken from the computed scores,
+        or the result unchanged if it is not JSON
+    """
+    try:
+        data = json.loads(result)
+    except ValueError:
+        logging.warning("Model result is not JSON; computed scores not applied")
+        return result
+
+    def _merge(target: dict, source: dict) -> None:
+        for key, value in source.items():
+            if isinstance(value, dict):
+                if not isinstance(target.get(key), dict):
+                    target[key] = {}
+                _merge(target[key], value)
+            elif key in ("Score", "Cards"):
+                target[key] = value
+            else:
+                target.setdefault(key, value)
+
+    if isinstance(data, dict):
+        _merge(data, scores)
+    return json.dumps(data, ensure_ascii=False)
@@ -0,0 +1,133 @@
+"""
+Server-sent event (SSE) utilities for streaming model output.
+
+Streaming routes use the Azure Functions FastAPI HTTP extension, which lets a
+function return a StreamingResponse instead of one buffered HttpResponse.
+Events are:
+
+- "token": {"text": "..."} for each chunk of model output
+- "done": {"category": "...", "content": "..."} with the complete result
+- "error": {"message": "..."} if the analysis failed
+
+Comment lines (": keep-alive") are sent while waiting on an analysis another
+request is running, so proxies do not close an idle stream.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from azurefunctions.extensions.http.fastapi import PlainTextResponse, StreamingResponse
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Content type of server-sent events
+SSE_MIMETYPE = "text/event-stream"
+
+# Seconds between keep-alive comments while waiting
+_KEEPALIVE_SECONDS = 10
+
+# Headers that stop intermediaries from buffering the stream
+_STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of formatted events in a streaming response."""
+    return StreamingResponse(events, media_type=SSE_MIMETYPE, headers=_STREAM_HEADERS)
+
+
+def text_response(message: str, status_code: int) -> PlainTextResponse:
+    """Plain-text error response for streaming routes (mirrors func.HttpResponse)."""
+    return PlainTextResponse(message, status_code=status_code)
+
+
+async def done_events(category: str, content: str) -> AsyncIterator[str]:
+    """Stream an already available result as a single "done" event."""
+    yield sse_event("done", {"category": category, "content": content})
+
+
+async def wait_events(category: str, waiter: Awaitable[Optional[str]]) -> AsyncIterator[str]:
+    """
+    Stream the result of an analysis another request is running.
+
+    Args:
+        category: Category reported in the "done" event
+        waiter: Polls for the result (see wait_for_analysis); None on timeout
+
+    Yields:
+        Keep-alive comments, then a "done" or "error" event
+    """
+    task = asyncio.ensure_future(waiter)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_KEEPALIVE_SECONDS)
+            if done:
+                break
+            yield ": keep-alive\n\n"
+    finally:
+        # Stop polling if the client disconnected
+        task.cancel()
+
+    result = task.result()
+    if result is None:
+        yield sse_event("error", {"message": "Timeout waiting for analysis"})
+    else:
+        yield sse_event("done", {"category": category, "content": result})
+
+
+async def chain_events(
+    category: str,
+    chain: object,
+    inputs: dict,
+    on_complete: Callable[[str], str],
+    on_error: Callable[[], None]
+) -> AsyncIterator[str]:
+    """
+    Stream a chain's output as it is generated, persisting the final result.
+
+    Args:
+        category: Category reported in the "done" event
+        chain: LangChain chain (see build_chain)
+        inputs: Chain inputs
+        on_complete: Called with the complete output before "done" is sent;
+            returns the stored result, which the "done" event carries
+        on_error: Called if generation or persisting fails, or the client
+            disconnects before the output is complete
+
+    Yields:
+        "token" events, then a "done" or "error" event
+    """
+    chunks = []
+    try:
+        async for chunk in chain.astream(inputs):
+            if chunk:
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+
+        content = on_complete("".join(chunks))
+    except (GeneratorExit, asyncio.CancelledError):
+        # Client went away mid-stream: release the "loading" marker
+        logging.warning(f"Client disconnected while streaming {category} analysis")
+        on_error()
+        raise
+    except Exception as e:
+        logging.error(f"Error streaming {category} analysis: {e}")
+        on_error()
+        yield sse_event("error", {"message": "Internal server error"})
+        return
+
+    yield sse_event("done", {"category": category, "content": content})
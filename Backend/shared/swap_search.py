@@ -0,0 +1,200 @@
+"""
+Local search for card swaps that improve a deck.
+
+Instead of asking the model to invent swaps, every single swap (one deck card
+out, one card of the pool in) is ranked by how it changes the deck's meta
+fit (shared/deck_index), which is vectorized over the whole card pool. The
+best singles per replaced card are then scored with the category rubrics
+(shared/scoring), and the best of those are combined into double swaps.
+Only candidates that raise the mean category score are kept, ranked by a
+gain that weighs that rise against the change in meta fit (a swap away from
+what top players run together costs gain). The model is given the top few
+to choose from and explain.
+
+Primary win conditions are never swapped in or out, so the archetype stays,
+and every candidate deck must pass the card registry's deck validation
+(e.g. the champion limit).
+"""
+import logging
+import os
+from itertools import combinations
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from shared.card_registry import InvalidDeckError, get_registry
+from shared.deck_index import DeckIndex, get_deck_index
+from shared.scoring import WIN, card_roles, score_deck
+
+# ---------------------------------------------------------------------------
+# Configuration Constants
+# ---------------------------------------------------------------------------
+
+# Candidates passed to the model
+SWAP_CANDIDATES = int(os.getenv("SWAP_CANDIDATES", "5"))
+
+# Weight of the mean category score gain (0-5 scale, divided by 5) and of the
+# meta fit gain (0-1 scale) in a candidate's gain
+_RUBRIC_WEIGHT = 0.5
+_META_WEIGHT = 0.5
+
+# Incoming cards per replaced card that are scored with the rubrics
+_SINGLES_PER_CARD = 8
+
+# Best single swaps combined into double swaps
+_DOUBLE_SEEDS = 12
+
+_CATEGORIES = ("offense", "defense", "synergy", "versatility")
+
+
+class SwapCandidate(NamedTuple):
+    """A swap set and the scores of the deck it produces."""
+    swaps: tuple[tuple[str, str], ...]  # (replaced card, new card)
+    scores: dict[str, float]            # category -> score of the new deck
+    rubric_gain: float                  # change of the mean category score
+    meta_gain: float                    # change of the meta fit
+    gain: float
+
+
+# ---------------------------------------------------------------------------
+# Helper Functions
+# ---------------------------------------------------------------------------
+
+def _category_scores(cards: list[str]) -> Optional[dict[str, float]]:
+    """Rubric score of each category, or None if the deck cannot be scored."""
+    scores = {}
+    for category in _CATEGORIES:
+        result = score_deck(category, cards)
+        if result is None:
+            return None
+        scores[category] = next(iter(result.values()))["Score"]
+    return scores
+
+
+def _mean(scores: dict[str, float]) -> float:
+    return sum(scores.values()) / len(scores)
+
+
+def _evaluate(cards: list[str], swaps: tuple[tuple[int, int], ...], index: DeckIndex,
+              base_fit: float, base_scores: dict[str, float]) -> Optional[SwapCandidate]:
+    """Score the deck produced by a set of (position, card id) swaps."""
+    registry = get_registry()
+    new_cards = list(cards)
+    for position, card_id in swaps:
+        new_cards[position] = registry.name_of(card_id)
+
+    try:
+        ids = registry.validate(new_cards)
+    except InvalidDeckError:
+        return None
+
+    scores = _category_scores(new_cards)
+    if scores is None:
+        return None
+
+    rubric_gain = _mean(scores) - _mean(base_scores)
+    meta_gain = index.fit(ids) - base_fit
+    return SwapCandidate(
+        swaps=tuple((cards[position], registry.name_of(card_id)) for position, card_id in swaps),
+        scores=scores,
+        rubric_gain=round(rubric_gain, 2),
+        meta_gain=round(meta_gain, 4),
+        gain=_RUBRIC_WEIGHT * rubric_gain / 5.0 + _META_WEIGHT * meta_gain,
+    )
+
+
+def _single_swaps(ids: list[int], fixed: set[int], pool: np.ndarray, index: DeckIndex) -> list[tuple[int, int]]:
+    """
+    Shortlist single swaps by meta fit change, vectorized over the pool.
+
+    Returns:
+        (position, card id) swaps: the best _SINGLES_PER_CARD incoming cards
+        for every replaceable position
+    """
+    deck = np.array(ids, dtype=np.intp)
+    association = index.association
+    # Association of every pool card with every deck card (pool x deck)
+    with_deck = association[np.ix_(pool, deck)]
+    # Association each deck card contributes to the deck
+    contributed = association[np.ix_(deck, deck)].sum(axis=1)
+    # Pair sum change when the card at position k is replaced by pool card c
+    change = with_deck.sum(axis=1)[:, None] - with_deck - contributed[None, :]
+
+    shortlist = []
+    for position in range(len(deck)):
+        if position in fixed:
+            continue
+        best = np.argsort(-change[:, position], kind="stable")[:_SINGLES_PER_CARD]
+        shortlist.extend((position, int(pool[row])) for row in best)
+    return shortlist
+
+
+def find_swaps(cards: list[str], limit: int = SWAP_CANDIDATES) -> list[SwapCandidate]:
+    """
+    Find the best single and double swaps for a deck.
+
+    Args:
+        cards: Card names of a valid deck
+        limit: Maximum candidates returned
+
+    Returns:
+        Candidates, best gain first; empty if no deck snapshot is published,
+        the deck cannot be scored, or no swap raises its category scores
+    """
+    index = get_deck_index()
+    if index is None:
+        return []
+
+    base_scores = _category_scores(cards)
+    if base_scores is None:
+        return []
+
+    registry = get_registry()
+    ids = [registry.id_of(card) for card in cards]
+    base_fit = index.fit(ids)
+
+    # Primary win conditions stay; incoming cards are played, scored support cards
+    fixed = {position for position, card in enumerate(cards) if WIN in card_roles(card)}
+    pool = []
+    for card_id in index.played():
+        roles = card_roles(registry.name_of(card_id))
+        if card_id not in ids and roles is not None and WIN not in roles:
+            pool.append(card_id)
+    pool = np.array(pool, dtype=np.intp)
+    if len(pool) == 0:
+        return []
+
+    singles = []
+    for position, card_id in _single_swaps(ids, fixed, pool, index):
+        candidate = _evaluate(cards, ((position, card_id),), index, base_fit, base_scores)
+        if candidate is not None:
+            singles.append((candidate, (position, card_id)))
+    singles.sort(key=lambda entry: entry[0].gain, reverse=True)
+
+    doubles = []
+    for (_, first), (_, second) in combinations(singles[:_DOUBLE_SEEDS], 2):
+        if first[0] == second[0] or first[1] == second[1]:
+            continue
+        candidate = _evaluate(cards, (first, second), index, base_fit, base_scores)
+        if candidate is not None:
+            doubles.append(candidate)
+
+    candidates = [candidate for candidate, _ in singles] + doubles
+    improving = [candidate for candidate in candidates if candidate.rubric_gain > 0]
+    improving.sort(key=lambda candidate: candidate.gain, reverse=True)
+
+    logging.info(f"Swap search: {len(singles)} singles, {len(doubles)} doubles, {len(improving)} improving")
+    return improving[:limit]
+
+
+def describe_candidates(candidates: list[SwapCandidate]) -> list[dict]:
+    """Format candidates for the optimization prompt (same keys as the output)."""
+    return [
+        {
+            "Swaps": [{"Replaced Card": old, "New Card": new} for old, new in candidate.swaps],
+            "Category Scores": {category.title(): score for category, score in candidate.scores.items()},
+            "Category Score Gain": candidate.rubric_gain,
+            "Meta Fit Gain": candidate.meta_gain,
+        }
+        for candidate in candidates
+    ]
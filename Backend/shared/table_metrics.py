@@ -0,0 +1,264 @@
+"""
+Storage round-trip instrumentation for Azure Table Storage.
+
+This module provides a thin wrapper around TableClient that counts calls per
+endpoint invocation, records entities scanned vs returned for each
+query_entities filter, and logs queries that scan more than a threshold.
+
+Per-invocation stats are kept in a context variable. The
+StorageMetricsExtension worker extension opens and closes a stats scope
+around every function invocation (requires PYTHON_ENABLE_WORKER_EXTENSIONS=1);
+begin_invocation/end_invocation can also be called directly, e.g. from
+benchmarks.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Iterator, Optional
+
+import azure.functions as func
+
+# Queries scanning at least this many entities are logged as slow
+SLOW_QUERY_SCAN_THRESHOLD = int(os.getenv("TABLE_SLOW_QUERY_SCAN_THRESHOLD", "200"))
+
+# Queries taking at least this many milliseconds are logged as slow
+SLOW_QUERY_MS_THRESHOLD = float(os.getenv("TABLE_SLOW_QUERY_MS_THRESHOLD", "500"))
+
+# Filter terms that pin the partition / row key
+_PARTITION_TERM = re.compile(r"PartitionKey\s+eq\s+'")
+_ROW_TERM = re.compile(r"RowKey\s+eq\s+'")
+
+# Filter terms on any property (used to detect non-key predicates)
+_PROPERTY_TERM = re.compile(r"(\w+)\s+(?:eq|ne|gt|ge|lt|le)\s+")
+
+# Stats for the invocation running in the current context
+_current_stats: contextvars.ContextVar[Optional["InvocationStats"]] = contextvars.ContextVar(
+    "table_invocation_stats",
+    default=None
+)
+
+
+class InvocationStats:
+    """Table round trips and query scans recorded during one invocation."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.calls: dict[str, int] = {}
+        self.queries: list[dict[str, Any]] = []
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @property
+    def entities_scanned(self) -> int:
+        return sum(q["scanned"] for q in self.queries)
+
+    def summary(self) -> dict[str, Any]:
+        """Return the stats as a plain dictionary."""
+        return {
+            "endpoint": self.endpoint,
+            "total_calls": self.total_calls,
+            "calls": dict(self.calls),
+            "entities_scanned": self.entities_scanned,
+            "queries": list(self.queries),
+        }
+
+
+def classify_filter(query_filter: str) -> str:
+    """
+    Classify how Table Storage has to serve a filter.
+
+    Returns:
+        "point" if PartitionKey and RowKey are pinned, "partition_scan" if
+        only PartitionKey is pinned, otherwise "table_scan"
+    """
+    has_partition = bool(_PARTITION_TERM.search(query_filter))
+    has_row = bool(_ROW_TERM.search(query_filter))
+    if has_partition and has_row:
+        return "point"
+    if has_partition:
+        return "partition_scan"
+    return "table_scan"
+
+
+def _non_key_properties(query_filter: str) -> list[str]:
+    """Properties other than PartitionKey/RowKey referenced by a filter."""
+    return sorted({
+        name for name in _PROPERTY_TERM.findall(query_filter)
+        if name not in ("PartitionKey", "RowKey")
+    })
+
+
+def begin_invocation(endpoint: str) -> InvocationStats:
+    """
+    Start collecting table stats for an endpoint invocation.
+
+    Args:
+        endpoint: Function name the stats are attributed to
+
+    Returns:
+        The stats object for the invocation
+    """
+    stats = InvocationStats(endpoint)
+    _current_stats.set(stats)
+    return stats
+
+
+def end_invocation() -> Optional[InvocationStats]:
+    """
+    Stop collecting table stats and log a per-invocation summary.
+
+    Returns:
+        The stats of the finished invocation, or None if none was open
+    """
+    stats = _current_stats.get()
+    _current_stats.set(None)
+    if stats is None:
+        return None
+
+    if stats.total_calls:
+        logging.info(
+            f"Table round trips for {stats.endpoint}: {stats.total_calls} calls "
+            f"{stats.calls}, {stats.entities_scanned} entities scanned"
+        )
+    return stats
+
+
+class InstrumentedTableClient:
+    """
+    TableClient wrapper that records round trips and query scans.
+
+    Attributes that are not round trips (table_name, account_name, ...) are
+    forwarded to the wrapped client unchanged.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _count(self, operation: str) -> None:
+        stats = _current_stats.get()
+        if stats is not None:
+            key = f"{self._client.table_name}.{operation}"
+            stats.calls[key] = stats.calls.get(key, 0) + 1
+
+    def _call(self, operation: str, method: Callable, *args, **kwargs) -> Any:
+        self._count(operation)
+        return method(*args, **kwargs)
+
+    def create_entity(self, *args, **kwargs) -> Any:
+        return self._call("create_entity", self._client.create_entity, *args, **kwargs)
+
+    def upsert_entity(self, *args, **kwargs) -> Any:
+        return self._call("upsert_entity", self._client.upsert_entity, *args, **kwargs)
+
+    def update_entity(self, *args, **kwargs) -> Any:
+        return self._call("update_entity", self._client.update_entity, *args, **kwargs)
+
+    def get_entity(self, *args, **kwargs) -> Any:
+        return self._call("get_entity", self._client.get_entity, *args, **kwargs)
+
+    def delete_entity(self, *args, **kwargs) -> Any:
+        return self._call("delete_entity", self._client.delete_entity, *args, **kwargs)
+
+    def submit_transaction(self, *args, **kwargs) -> Any:
+        return self._call("submit_transaction", self._client.submit_transaction, *args, **kwargs)
+
+    def query_entities(
+        self,
+        query_filter: str,
+        *args,
+        match: Optional[Callable[[dict], bool]] = None,
+        **kwargs
+    ) -> Iterator[dict]:
+        """
+        Query entities, recording entities scanned vs returned for the filter.
+
+        Args:
+            query_filter: OData filter passed to TableClient.query_entities
+            match: Optional client-side predicate. Entities read from the
+                service count as scanned; only matching ones are returned.
+
+        Yields:
+            Entities returned to the caller
+        """
+        self._count("query_entities")
+        entities = self._client.query_entities(query_filter, *args, **kwargs)
+        return self._scan(query_filter, entities, match)
+
+    def list_entities(self, *args, **kwargs) -> Iterator[dict]:
+        """List all entities, recording the full table scan."""
+        self._count("list_entities")
+        entities = self._client.list_entities(*args, **kwargs)
+        return self._scan("", entities, None)
+
+    def _scan(
+        self,
+        query_filter: str,
+        entities: Iterator[dict],
+        match: Optional[Callable[[dict], bool]]
+    ) -> Iterator[dict]:
+        scanned = 0
+        returned = 0
+        start = time.perf_counter()
+        try:
+            for entity in entities:
+                scanned += 1
+                if match is None or match(entity):
+                    returned += 1
+                    yield entity
+        finally:
+            # Runs on exhaustion and when the caller stops iterating early
+            self._record_query(query_filter, scanned, returned, (time.perf_counter() - start) * 1000)
+
+    def _record_query(self, query_filter: str, scanned: int, returned: int, elapsed_ms: float) -> None:
+        access = classify_filter(query_filter)
+        record = {
+            "table": self._client.table_name,
+            "filter": query_filter,
+            "access": access,
+            "non_key_properties": _non_key_properties(query_filter),
+            "scanned": scanned,
+            "returned": returned,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries.append(record)
+
+        if scanned >= SLOW_QUERY_SCAN_THRESHOLD or elapsed_ms >= SLOW_QUERY_MS_THRESHOLD:
+            logging.warning(
+                f"Slow table query on {record['table']} ({access}): scanned {scanned}, "
+                f"returned {returned} in {elapsed_ms:.0f} ms. Filter: {query_filter or '<none>'}"
+            )
+
+
+class StorageMetricsExtension(func.AppExtensionBase):
+    """
+    Worker extension that scopes table stats to each function invocation.
+
+    Registered automatically when this module is imported; the worker only
+    calls it when PYTHON_ENABLE_WORKER_EXTENSIONS=1.
+    """
+
+    @classmethod
+    def init(cls) -> None:
+        pass
+
+    @classmethod
+    def configure(cls, *args, **kwargs) -> None:
+        pass
+
+    @classmethod
+    def pre_invocation_app_level(cls, logger, context, func_args=None, *args, **kwargs) -> None:
+        begin_invocation(context.function_name)
+
+    @classmethod
+    def post_invocation_app_level(cls, logger, context, func_args=None, func_ret=None, *args, **kwargs) -> None:
+        end_invocation()
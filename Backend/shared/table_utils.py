@@ -2,11 +2,17 @@
 Azure Table Storage utilities for deck report management.
 
 This module provides functions to interact with Azure Table Storage
-for storing and retrieving deck analysis reports. Supports canonical
-deck matching to handle decks with the same cards in different orders.
+for storing and retrieving deck analysis reports. Reports are keyed by the
+packed card-id deck key, so decks with the same cards in different orders
+resolve to the same report with one point read.
 """
 import os
+from typing import Optional
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
 from azure.data.tables import TableServiceClient
+from shared.card_registry import UnknownCardError, format_key, get_registry, pack, parse_deck
+from shared.table_metrics import InstrumentedTableClient
 
 # Azure Storage connection string from environment variable
 _CONNECTION_STRING = os.getenv("STORAGE_CONNECTION_STRING")
@@ -14,16 +20,36 @@ _CONNECTION_STRING = os.getenv("STORAGE_CONNECTION_STRING")
 # Partition key for all report entities
 PARTITION_KEY = "Default"
 
+# Analysis fields of a report and their value before analysis
+REPORT_FIELDS = ("Offense", "Defense", "Synergy", "Versatility", "Optimize")
+_DEFAULT_CATEGORY_VALUE = "no"
+
+# Fall back to scanning for reports keyed by the original deck string
+# (created before reports were keyed by packed card ids). Off by default:
+# every lookup miss would otherwise scan the partition. Enable it only for
+# storage accounts that still hold reports created before the key change.
+_LEGACY_LOOKUP = os.getenv("REPORTS_LEGACY_LOOKUP", "0") == "1"
+
+# Attempts to claim a report field while other fields of the report change
+_CLAIM_RETRIES = 10
+
 # Internal table service client (not exported)
 _service = TableServiceClient.from_connection_string(_CONNECTION_STRING)
 
-# Table clients (exported for use in Azure Function blueprints)
-reports_table = _service.get_table_client("reports")
-accounts_table = _service.get_table_client("accounts")
-player_decks_table = _service.get_table_client("playerdecks")
-categories_table = _service.get_table_client("categories")
-decks_table = _service.get_table_client("decks")
-features_table = _service.get_table_client("features")
+# Table clients (exported for use in Azure Function blueprints).
+# Each is wrapped to count round trips and query scans per invocation.
+reports_table = InstrumentedTableClient(_service.get_table_client("reports"))
+accounts_table = InstrumentedTableClient(_service.get_table_client("accounts"))
+player_decks_table = InstrumentedTableClient(_service.get_table_client("playerdecks"))
+categories_table = InstrumentedTableClient(_service.get_table_client("categories"))
+decks_table = InstrumentedTableClient(_service.get_table_client("decks"))
+features_table = InstrumentedTableClient(_service.get_table_client("features"))
+deck_aggregates_table = InstrumentedTableClient(_service.get_table_client("deckaggregates"))
+player_state_table = InstrumentedTableClient(_service.get_table_client("players"))
+crawl_runs_table = InstrumentedTableClient(_service.get_table_client("crawlruns"))
+analysis_cache_table = InstrumentedTableClient(_service.get_table_client("analysiscache"))
+knowledge_table = InstrumentedTableClient(_service.get_table_client("knowledge"))
+jobs_table = InstrumentedTableClient(_service.get_table_client("jobs"))
 
 # Legacy exports for backward compatibility (deprecated - use new names above)
 _accounts = accounts_table
@@ -38,7 +64,7 @@ def update_report_field(deck: str, field: str, value: str) -> None:
     Update a specific field in a report entity.
     
     Args:
-        deck: RowKey of the deck to update
+        deck: RowKey of the report to update (see get_report_by_deck)
         field: Field name to update
         value: New value for the field
     """
@@ -52,13 +78,59 @@ def update_report_field(deck: str, field: str, value: str) -> None:
     )
 
 
+def claim_report_field(deck: str, field: str, report: Optional[dict] = None) -> tuple[bool, Optional[str]]:
+    """
+    Mark a report field as "loading" if it still holds no result.
+
+    The write is conditional on the report's etag, so of several requests
+    racing for the same field exactly one claims it. A conflict caused by a
+    write to another field is retried with the report read again.
+
+    Args:
+        deck: RowKey of the report (see get_report_by_deck)
+        field: Field to claim
+        report: Report entity as just read (read here if omitted)
+
+    Returns:
+        Tuple of (claimed, value): value is the field's current value when
+        another request holds it ("loading") or it already has a result, and
+        None when this call claimed it or the report no longer exists
+
+    Raises:
+        RuntimeError: If the report kept changing on every attempt
+    """
+    for _ in range(_CLAIM_RETRIES):
+        if report is None:
+            try:
+                report = reports_table.get_entity(partition_key=PARTITION_KEY, row_key=deck)
+            except ResourceNotFoundError:
+                return False, None
+
+        value = report.get(field)
+        if value != _DEFAULT_CATEGORY_VALUE:
+            return False, value
+
+        try:
+            reports_table.update_entity(
+                mode="merge",
+                entity={"PartitionKey": PARTITION_KEY, "RowKey": deck, field: "loading"},
+                etag=report.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return True, None
+        except ResourceModifiedError:
+            report = None
+
+    raise RuntimeError(f"Could not claim {field} of report {deck}: report modified concurrently")
+
+
 def canonicalize(deck: str) -> str:
     """
     Convert a deck string to canonical form for comparison.
     
-    Removes brackets, splits by comma, sorts cards alphabetically,
-    and rejoins. This allows matching decks with the same cards
-    regardless of order.
+    Sorts card names alphabetically and rejoins them. Only used to match
+    legacy reports keyed by the original deck string; new reports are keyed
+    by the packed card-id key (see card_registry).
     
     Args:
         deck: Deck string (e.g., "[Card1, Card2, Card3]")
@@ -66,34 +138,106 @@ def canonicalize(deck: str) -> str:
     Returns:
         Canonical deck string (e.g., "card1,card2,card3")
     """
-    cleaned = deck.replace("[", "").replace("]", "")
-    cards = [c.strip() for c in cleaned.split(",") if c.strip()]
+    cards = parse_deck(deck)
     cards.sort(key=str.lower)
     return ",".join(cards)
 
 
+def report_key(deck: str) -> str:
+    """
+    Get the reports RowKey of a deck: its packed card-id key.
+    
+    Args:
+        deck: Deck string (any order)
+    
+    Returns:
+        16-character hexadecimal deck key
+    
+    Raises:
+        UnknownCardError: If any card is not in the card registry
+    """
+    return get_registry().deck_key(deck)
+
+
 def get_report_by_deck(deck: str) -> tuple[dict | None, str | None]:
     """
     Get a report entity by canonical deck matching.
     
-    Finds the correct report even if the deck cards are in a different order.
-    Uses canonical matching to compare decks regardless of card order.
+    Finds the correct report even if the deck cards are in a different order
+    with a single point read on the packed deck key. Reports created before
+    the key change (RowKey = original deck string) are found with a partition
+    scan while REPORTS_LEGACY_LOOKUP is enabled.
     
     Args:
         deck: Deck string to look up (any order)
     
     Returns:
         Tuple of (report entity dictionary, actual RowKey), or (None, None) if not found.
-        The RowKey is the original deck order as stored in the table.
     """
+    try:
+        key = report_key(deck)
+    except UnknownCardError:
+        key = None
+
+    if key is not None:
+        try:
+            entity = reports_table.get_entity(partition_key=PARTITION_KEY, row_key=key)
+            return entity, key
+        except ResourceNotFoundError:
+            pass
+
+    if not _LEGACY_LOOKUP:
+        return None, None
+
     canonical = canonicalize(deck)
 
-    # Query all reports in partition
+    # Query all reports in partition; matching is done client-side so the
+    # scan (entities read vs matched) is recorded by the table instrumentation
     filter_query = f"PartitionKey eq '{PARTITION_KEY}'"
+    matches = reports_table.query_entities(
+        filter_query,
+        match=lambda entity: canonicalize(entity.get("RowKey", "")) == canonical
+    )
+
+    entity = next(matches, None)
+    matches.close()
+
+    if entity is None:
+        return None, None
+
+    return entity, entity.get("RowKey", "")
+
+
+def ensure_report(deck: str) -> tuple[str, bool]:
+    """
+    Validate a deck and create its report if it does not exist yet.
+    
+    Args:
+        deck: Deck string (e.g., "[Card1, Card2, Card3, ...]")
+    
+    Returns:
+        Tuple of (report RowKey, whether the report was created)
+    
+    Raises:
+        InvalidDeckError: If the deck fails validation (see CardRegistry.validate)
+    """
+    deck_key = format_key(pack(get_registry().validate(parse_deck(deck))))
+
+    # Any card order or spelling (or a legacy report) counts as existing
+    _, existing_key = get_report_by_deck(deck)
+    if existing_key:
+        return existing_key, False
 
-    for entity in reports_table.query_entities(filter_query):
-        existing_deck = entity.get("RowKey", "")
-        if canonicalize(existing_deck) == canonical:
-            return entity, existing_deck
+    entity = {
+        "PartitionKey": PARTITION_KEY,
+        "RowKey": deck_key,
+        "Deck": deck,  # Original order preserved
+    }
+    entity.update({field: _DEFAULT_CATEGORY_VALUE for field in REPORT_FIELDS})
 
-    return None, None
\ No newline at end of file
+    try:
+        reports_table.create_entity(entity)
+    except ResourceExistsError:
+        # A concurrent request created the same deck's report first
+        return deck_key, False
+    return deck_key, True
@@ -0,0 +1,200 @@
+"""
+Telemetry utilities for timing spans and custom metrics.
+
+This module provides a small span/metric API used on the analysis and
+optimization hot paths. When OpenTelemetry is installed and an Application
+Insights connection string is configured, spans and metrics are exported to
+Azure Monitor. Otherwise a no-op local exporter is used that only writes
+DEBUG log lines, so local runs and benchmarks pay almost nothing.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# Application Insights connection string from environment variable
+_CONNECTION_STRING = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+
+# Instrumentation scope name for spans and metrics
+_SCOPE_NAME = "clashops"
+
+# Metric names
+STAGE_DURATION_METRIC = "clashops.stage.duration"
+LLM_TOKENS_METRIC = "clashops.llm.tokens"
+SHADOW_DELTA_METRIC = "clashops.shadow.score_delta"
+
+
+class _LocalExporter:
+    """No-op exporter that writes spans and metrics to the DEBUG log."""
+
+    @contextmanager
+    def start_span(self, name: str, attributes: dict[str, Any]) -> Iterator[None]:
+        yield
+
+    def record_duration(self, name: str, duration_ms: float, attributes: dict[str, Any]) -> None:
+        logging.debug(f"span {name} {duration_ms:.1f} ms {attributes}")
+
+    def record_tokens(self, kind: str, count: int, attributes: dict[str, Any]) -> None:
+        logging.debug(f"tokens {kind}={count} {attributes}")
+
+    def record_score_delta(self, delta: float, attributes: dict[str, Any]) -> None:
+        logging.debug(f"shadow score delta {delta:.2f} {attributes}")
+
+
+class _OpenTelemetryExporter:
+    """Exporter that emits OpenTelemetry spans, a duration histogram and a token counter."""
+
+    def __init__(self, trace_api: Any, metrics_api: Any) -> None:
+        self._tracer = trace_api.get_tracer(_SCOPE_NAME)
+        meter = metrics_api.get_meter(_SCOPE_NAME)
+        self._durations = meter.create_histogram(
+            STAGE_DURATION_METRIC,
+            unit="ms",
+            description="Duration of a hot-path stage"
+        )
+        self._tokens = meter.create_counter(
+            LLM_TOKENS_METRIC,
+            unit="{token}",
+            description="LLM tokens by kind (input, output, cached)"
+        )
+        self._score_deltas = meter.create_histogram(
+            SHADOW_DELTA_METRIC,
+            description="Absolute score difference between a primary and a shadow model result"
+        )
+
+    @contextmanager
+    def start_span(self, name: str, attributes: dict[str, Any]) -> Iterator[None]:
+        with self._tracer.start_as_current_span(name) as otel_span:
+            try:
+                yield
+            finally:
+                # Attributes may be added inside the span block
+                otel_span.set_attributes(_clean(attributes))
+
+    def record_duration(self, name: str, duration_ms: float, attributes: dict[str, Any]) -> None:
+        self._durations.record(duration_ms, {"stage": name, **_clean(attributes)})
+
+    def record_tokens(self, kind: str, count: int, attributes: dict[str, Any]) -> None:
+        self._tokens.add(count, {"kind": kind, **_clean(attributes)})
+
+    def record_score_delta(self, delta: float, attributes: dict[str, Any]) -> None:
+        self._score_deltas.record(delta, _clean(attributes))
+
+
+def _clean(attributes: dict[str, Any]) -> dict[str, Any]:
+    """Keep only attribute values OpenTelemetry accepts (str, bool, int, float)."""
+    return {
+        key: value
+        for key, value in attributes.items()
+        if isinstance(value, (str, bool, int, float))
+    }
+
+
+def _create_exporter() -> Any:
+    """
+    Create the exporter for this process.
+
+    Uses Azure Monitor when both the OpenTelemetry packages and the
+    Application Insights connection string are available, otherwise the
+    local no-op exporter.
+    """
+    if not _CONNECTION_STRING:
+        return _LocalExporter()
+
+    try:
+        from azure.monitor.opentelemetry import configure_azure_monitor
+        from opentelemetry import metrics, trace
+    except ImportError:
+        logging.warning("OpenTelemetry packages not installed; using local telemetry exporter")
+        return _LocalExporter()
+
+    configure_azure_monitor(connection_string=_CONNECTION_STRING)
+    return _OpenTelemetryExporter(trace, metrics)
+
+
+# Exporter shared by every span and metric in this process
+_exporter = _create_exporter()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+    """
+    Time a hot-path stage and emit it as a span and a duration metric.
+
+    The yielded dictionary can be updated inside the block to attach
+    attributes known only after the work is done (e.g. document counts).
+
+    Args:
+        name: Stage name (e.g., "report_lookup", "pinecone_query")
+        **attributes: Dimensions attached to the span and metric
+
+    Yields:
+        Mutable attribute dictionary for the span
+    """
+    start = time.perf_counter()
+    with _exporter.start_span(name, attributes):
+        try:
+            yield attributes
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _exporter.record_duration(name, duration_ms, attributes)
+
+
+def record_duration(name: str, duration_ms: float, **attributes: Any) -> None:
+    """
+    Emit the duration of a stage that was timed outside a span block.
+
+    Args:
+        name: Stage name (e.g., "llm_call")
+        duration_ms: Measured duration in milliseconds
+        **attributes: Dimensions attached to the metric
+    """
+    _exporter.record_duration(name, duration_ms, attributes)
+
+
+def record_token_usage(usage: Optional[dict[str, Any]], **attributes: Any) -> None:
+    """
+    Emit LLM token counts as metrics.
+
+    Args:
+        usage: LangChain usage metadata ({"input_tokens", "output_tokens",
+            "input_token_details": {"cache_read"}}), or None if unavailable
+        **attributes: Dimensions attached to the metric (e.g. model)
+    """
+    if not usage:
+        return
+
+    counts = {
+        "input": usage.get("input_tokens"),
+        "output": usage.get("output_tokens"),
+        "cached": (usage.get("input_token_details") or {}).get("cache_read"),
+    }
+    for kind, count in counts.items():
+        if count:
+            _exporter.record_tokens(kind, int(count), attributes)
+
+
+def record_context_tokens(kept: int, trimmed: int, **attributes: Any) -> None:
+    """
+    Emit the size of assembled retrieval context as token metrics.
+
+    Args:
+        kept: Tokens of context sent to the model
+        trimmed: Tokens of retrieved context dropped as duplicate or over budget
+        **attributes: Dimensions attached to the metric
+    """
+    _exporter.record_tokens("context", kept, attributes)
+    if trimmed:
+        _exporter.record_tokens("context_trimmed", trimmed, attributes)
+
+
+def record_score_delta(delta: float, **attributes: Any) -> None:
+    """
+    Emit the score difference between a primary and a shadow model result.
+
+    Args:
+        delta: Absolute score difference (0.0 - 5.0)
+        **attributes: Dimensions attached to the metric (category, models, scope)
+    """
+    _exporter.record_score_delta(delta, attributes)
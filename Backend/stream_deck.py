@@ -0,0 +1,190 @@
+"""
+Azure Functions that stream deck analyses and optimizations.
+
+These routes return server-sent event streams through the Azure Functions
+FastAPI HTTP extension (see shared/streaming). Once that extension is loaded,
+the worker serves every HTTP trigger of the app through its FastAPI proxy, so
+the streaming routes live in this module only and are registered by the
+"stream" app profile alone: the buffered analyze_deck, optimize_deck and CRUD
+routes never import the extension.
+"""
+import logging
+
+import azure.functions as func
+from azure.functions import Blueprint
+from azurefunctions.extensions.http.fastapi import Request, Response
+
+from analyze_deck import (
+    CATEGORY_CONFIG,
+    check_analysis_request,
+    complete_analysis,
+    prepare_analysis,
+    wait_for_analysis,
+)
+from optimize_deck import build_user_prompt, complete_optimization, prepare_optimization, wait_for_optimize
+from shared.table_utils import get_report_by_deck, update_report_field
+from shared.card_registry import UnknownCardError
+from shared.namespace_registry import get_namespace_registry
+from shared.schemas import optimize_schema
+from shared.langchain_utils import build_chain
+from shared.streaming import chain_events, done_events, sse_response, text_response, wait_events
+
+# Azure Functions Blueprint
+stream_deck_bp = Blueprint()
+
+
+# ---------------------------------------------------------------------------
+# Azure Function Routes
+# ---------------------------------------------------------------------------
+
+@stream_deck_bp.route(route="analyze_deck_stream", methods=["POST"], auth_level=func.AuthLevel.FUNCTION)
+async def analyze_deck_stream(req: Request) -> Response:
+    """
+    HTTP-triggered Azure Function that streams a deck category analysis.
+    
+    Same request body and cases as analyze_deck, but the response is a
+    server-sent event stream (see shared/streaming): model output is
+    forwarded as it is generated and the complete result is stored in the
+    report when generation finishes. Stored and running analyses are sent
+    as a single "done" event.
+    
+    Returns:
+        Streaming response of "token" events followed by "done" or "error"
+    """
+    logging.info("Streaming deck analysis request received")
+
+    try:
+        body = await req.json()
+    except ValueError as e:
+        logging.error(f"Invalid JSON in request: {e}")
+        return text_response("Invalid JSON", 400)
+
+    error, status_code = check_analysis_request(body)
+    if error:
+        return text_response(error, status_code)
+
+    deck = body["deckToAnalyze"]
+    category = body["category"]
+    field = CATEGORY_CONFIG[category]["field"]
+    fast = bool(body.get("fast"))
+
+    report, resolved_rowkey = get_report_by_deck(deck)
+    if not report:
+        logging.warning(f"Report not found for deck: {deck}")
+        return text_response("Report not found", 404)
+
+    current_value = report.get(field)
+
+    # Analysis already running → stream its result when it lands
+    if current_value == "loading" and not fast:
+        return sse_response(wait_events(category, wait_for_analysis(resolved_rowkey, field)))
+
+    # Already analyzed → single event
+    if current_value not in ("no", "loading"):
+        return sse_response(done_events(category, current_value))
+
+    try:
+        job = prepare_analysis(deck, category, fast)
+    except ValueError as e:
+        logging.error(f"Error performing analysis: {e}")
+        return text_response(str(e), 404)
+    except Exception as e:
+        logging.error(f"Unexpected error during analysis: {e}")
+        # Reset loading state on error (fast-mode runs never marked the report)
+        if not fast:
+            update_report_field(resolved_rowkey, field, "no")
+        return text_response("Internal server error", 500)
+
+    if job["result"] is not None:
+        return sse_response(done_events(category, job["result"]))
+
+    # Another request claimed the analysis first → stream its result
+    if job["running"]:
+        return sse_response(wait_events(category, wait_for_analysis(resolved_rowkey, field)))
+
+    def _release() -> None:
+        # Let the next request retry (fast-mode runs never marked the report)
+        if job["persist"]:
+            update_report_field(job["rowkey"], field, "no")
+
+    chain = build_chain(model=job["model"], response_format=CATEGORY_CONFIG[category]["schema"], cache_key=category)
+    return sse_response(chain_events(
+        category,
+        chain,
+        job["chain_inputs"],
+        on_complete=lambda results: complete_analysis(job, results),
+        on_error=_release
+    ))
+
+
+@stream_deck_bp.route(route="optimize_deck_stream", methods=["POST"], auth_level=func.AuthLevel.FUNCTION)
+async def optimize_deck_stream(req: Request) -> Response:
+    """
+    HTTP-triggered Azure Function that streams a deck optimization.
+    
+    Same request body and cases as optimize_deck, but the response is a
+    server-sent event stream (see shared/streaming): model output is
+    forwarded as it is generated and the complete result is stored in the
+    report when generation finishes.
+    
+    Returns:
+        Streaming response of "token" events followed by "done" or "error"
+    """
+    logging.info("Streaming deck optimization request received")
+
+    try:
+        body = await req.json()
+    except ValueError as e:
+        logging.error(f"Invalid JSON in request: {e}")
+        return text_response("Invalid JSON", 400)
+
+    deck = body.get("deckToAnalyze")
+    if not deck:
+        logging.warning("Missing 'deckToAnalyze' in request")
+        return text_response("Missing 'deckToAnalyze'", 400)
+
+    # Reject unknown cards before any table, Pinecone or LLM work
+    try:
+        get_namespace_registry().resolve(deck)
+    except UnknownCardError as e:
+        logging.warning(f"Invalid deck: {e}")
+        return text_response(str(e), 400)
+
+    report, resolved_rowkey = get_report_by_deck(deck)
+    if not report:
+        logging.warning(f"Report not found for deck: {deck}")
+        return text_response("Report not found", 404)
+
+    existing_value = report.get("Optimize")
+
+    # Optimization already running → stream its result when it lands
+    if existing_value == "loading":
+        return sse_response(wait_events("optimize", wait_for_optimize(resolved_rowkey)))
+
+    # Already optimized → single event
+    if existing_value != "no":
+        return sse_response(done_events("optimize", existing_value))
+
+    try:
+        job = prepare_optimization(deck, resolved_rowkey, build_user_prompt(body), report)
+    except Exception as e:
+        logging.error(f"Error during optimization: {e}")
+        # Reset loading state on error
+        update_report_field(resolved_rowkey, "Optimize", "no")
+        return text_response("Internal server error", 500)
+
+    if job["result"] is not None:
+        return sse_response(done_events("optimize", job["result"]))
+
+    # Another request claimed the optimization first → stream its result
+    if job["running"]:
+        return sse_response(wait_events("optimize", wait_for_optimize(resolved_rowkey)))
+
+    chain = build_chain(model=job["model"], response_format=optimize_schema, cache_key="optimize")
+    return sse_response(chain_events(
+        "optimize",
+        chain,
+        job["chain_inputs"],
+        on_complete=lambda results: complete_optimization(job, results),
+        on_error=lambda: update_report_field(resolved_rowkey, "Optimize", "no")
+    ))
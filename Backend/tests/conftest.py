@@ -0,0 +1,23 @@
+"""
+Shared test setup.
+
+Tests run offline against the in-memory storage, LLM, embedding and Pinecone
+stand-ins of benchmarks/stubs, installed once before any backend module is
+imported (blueprint modules bind the shared clients at import time).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubStack, install_stubs  # noqa: E402
+
+_STACK = install_stubs()
+
+
+@pytest.fixture
+def stack() -> StubStack:
+    """The installed in-memory stand-ins."""
+    return _STACK
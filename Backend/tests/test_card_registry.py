@@ -0,0 +1,66 @@
+"""
+Card ids are stable: reloading a reordered or extended cards.csv keeps every
+card's id, so stored deck keys keep resolving to the same decks.
+"""
+import pytest
+
+from shared import card_registry
+from shared.card_registry import get_registry, load_registry, normalize_name
+
+_CSV = b"card_name,rarity,elixer_cost,type\nKnight,Common,3,Troop\nArchers,Common,3,Troop\nFireball,Rare,4,Spell\n"
+_REORDERED = b"card_name,rarity,elixer_cost,type\nZap,Common,2,Spell\nFireball,Rare,4,Spell\nKnight,Common,3,Troop\n"
+
+
+def _ids(registry) -> dict[str, int]:
+    return {name: card_id for card_id, name in registry.items()}
+
+
+def test_reload_keeps_assigned_ids():
+    first = _ids(load_registry(_CSV))
+    assigned = {normalize_name(name): card_id for name, card_id in first.items()}
+
+    second = _ids(load_registry(_REORDERED, assigned))
+
+    assert second["Knight"] == first["Knight"]
+    assert second["Fireball"] == first["Fireball"]
+    # New cards never reuse the id of a removed card (Archers)
+    assert second["Zap"] == max(first.values()) + 1
+
+
+def test_explicit_id_disagreeing_with_the_mapping_is_rejected():
+    assigned = {"knight": 1}
+    csv = b"card_id,card_name,rarity,elixer_cost,type\n2,Knight,Common,3,Troop\n"
+
+    with pytest.raises(ValueError):
+        load_registry(csv, assigned)
+
+
+@pytest.fixture
+def reload_registry(stack, monkeypatch):
+    cards, card_ids = stack.blobs["cards.csv"], stack.blobs["card_ids.csv"]
+    saved = (cards._data, card_ids._data)
+
+    def _reload(csv_bytes: bytes):
+        cards.upload_blob(csv_bytes, overwrite=True)
+        monkeypatch.setattr(card_registry, "_registry", None)
+        return get_registry()
+
+    yield _reload
+
+    cards._data, card_ids._data = saved
+    card_registry._registry = None
+
+
+def test_ids_survive_a_cards_csv_reload(stack, reload_registry):
+    before = reload_registry(stack.blobs["cards.csv"]._data)
+    deck = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+    key = before.deck_key(deck)
+
+    # A new card inserted at the top of cards.csv shifts every row
+    data = stack.blobs["cards.csv"]._data.decode("utf-8")
+    header, rows = data.split("\n", 1)
+    after = reload_registry(f"{header}\nBrand New Card,Epic,5,Troop\n{rows}".encode("utf-8"))
+
+    assert after.deck_key(deck) == key
+    assert after.id_of("Brand New Card") == max(card_id for card_id, _ in before.items()) + 1
+    assert b"Brand New Card" in stack.blobs["card_ids.csv"]._data
@@ -0,0 +1,61 @@
+"""
+Crawl runs stop requesting rankings once enough clans are planned, and
+finalized runs leave no entities or delta blobs behind.
+"""
+import json
+
+import pytest
+
+from benchmarks.stubs import InMemoryBlob
+from shared import crawl_runs
+from shared.deck_store import add_to_delta
+from shared.table_utils import crawl_runs_table
+
+_CARDS = ["Knight", "Archers", "Fireball", "Hog Rider", "Musketeer", "Cannon", "Ice Spirit", "The Log"]
+
+
+def test_planning_stops_requesting_rankings_at_the_limit(monkeypatch):
+    requested = []
+
+    def top_clans(location_id=None, limit=None):
+        requested.append(location_id)
+        return [{"tag": f"#{location_id}-{i}"} for i in range(limit)]
+
+    monkeypatch.setattr(crawl_runs, "get_locations", lambda: [{"id": i, "isCountry": True} for i in range(50)])
+    monkeypatch.setattr(crawl_runs, "get_top_clans", top_clans)
+
+    tags = crawl_runs.plan_clan_tags(max_clans=40)
+
+    assert len(tags) == 40
+    assert len(requested) <= crawl_runs.CRAWL_WORKERS
+
+
+@pytest.fixture
+def blobs(monkeypatch):
+    blobs = {}
+    monkeypatch.setattr(crawl_runs, "get_blob", lambda name: blobs.setdefault(name, InMemoryBlob(name)))
+    return blobs
+
+
+def test_finalized_run_is_deleted(stack, blobs, monkeypatch):
+    # Publishing is not under test and would replace the seeded snapshot
+    for name in ("upload_decks", "upload_snapshot", "upload_synergy"):
+        monkeypatch.setattr(crawl_runs, name, lambda sorted_decks: None)
+    stack.tables["crawlruns"].clear()
+    run_id, messages = crawl_runs.start_run([f"#C{i}" for i in range(8)])
+
+    for message in messages:
+        shard_id = json.loads(message)["shard"]
+        delta = {}
+        add_to_delta(delta, _CARDS)
+        crawl_runs.get_blob(crawl_runs._delta_blob_name(run_id, shard_id)).upload_blob(json.dumps(delta))
+        assert crawl_runs._mark_done(run_id, shard_id)
+
+    assert crawl_runs.finalize_run(run_id) is not None
+
+    assert list(crawl_runs_table.query_entities(f"PartitionKey eq '{run_id}'")) == []
+    assert list(crawl_runs_table.query_entities("PartitionKey eq 'Run'")) == []
+    assert not any(blob.exists() for blob in blobs.values())
+
+    # A late duplicate message for a shard of the deleted run is skipped
+    crawl_runs.process_shard(run_id, 0)
@@ -0,0 +1,54 @@
+"""
+Deck store merges: concurrent merges add their counts instead of overwriting
+each other, and re-merging a run is a no-op.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from shared import deck_store
+from shared.deck_store import PARTITION_KEY, add_to_delta, deck_hash, merge_delta
+from shared.table_utils import deck_aggregates_table
+
+_CARDS = ["Knight", "Archers", "Fireball", "Hog Rider", "Musketeer", "Cannon", "Ice Spirit", "The Log"]
+
+
+def _delta(count: int) -> dict:
+    delta = {}
+    add_to_delta(delta, _CARDS, count=count)
+    return delta
+
+
+def _aggregate() -> dict:
+    return deck_aggregates_table.get_entity(partition_key=PARTITION_KEY, row_key=deck_hash(_CARDS))
+
+
+def test_merge_on_a_stale_store_keeps_the_other_merge(stack, monkeypatch):
+    stack.tables["deckaggregates"].clear()
+    merge_delta(_delta(1), run_id="run-1")
+
+    # Both merges read the store before either writes
+    stale = deck_store.load_store()
+    merge_delta(_delta(2), run_id="run-2")
+    monkeypatch.setattr(deck_store, "load_store", lambda: dict(stale))
+    merge_delta(_delta(3), run_id="run-3")
+
+    aggregate = _aggregate()
+    assert aggregate["TotalCount"] == 6
+    assert aggregate["RunCount"] == 3
+    assert aggregate["LastRunId"] == "run-3"
+
+
+def test_concurrent_merges_of_a_new_deck_all_count(stack):
+    stack.tables["deckaggregates"].clear()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda run: merge_delta(_delta(1), run_id=f"run-{run}"), range(4)))
+
+    assert _aggregate()["TotalCount"] == 4
+
+
+def test_remerging_a_run_is_a_no_op(stack):
+    stack.tables["deckaggregates"].clear()
+    merge_delta(_delta(2), run_id="run-1")
+    merge_delta(_delta(2), run_id="run-1")
+
+    assert _aggregate()["TotalCount"] == 2
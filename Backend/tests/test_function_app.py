@@ -0,0 +1,77 @@
+"""
+App profiles: each profile registers its own routes, and only the streaming
+app loads the FastAPI HTTP extension (which would proxy every HTTP trigger).
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from function_app import get_profile_blueprints, get_profile_settings
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports function_app under a profile in a fresh interpreter, calls one
+# buffered route and reports what was registered and loaded
+_SCRIPT = """
+import json, sys
+from benchmarks.stubs import install_stubs
+stack = install_stubs()
+from shared.table_utils import report_key
+deck = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+stack.tables["reports"].seed([{"PartitionKey": "Default", "RowKey": report_key(deck), "Deck": deck, "Offense": "{}"}])
+import function_app
+from benchmarks.harness import call_handler, make_request
+functions = {f.get_function_name(): f.get_user_function() for f in function_app.app.get_functions()}
+route, body = sys.argv[1], json.loads(sys.argv[2])
+status = call_handler(functions[route], make_request(route, body)).status_code if route in functions else None
+print(json.dumps({
+    "extension": "azurefunctions.extensions.http.fastapi" in sys.modules,
+    "functions": sorted(functions),
+    "status": status,
+}))
+"""
+
+_DECK = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+
+
+def _run_profile(profile: str, route: str, body) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _SCRIPT, route, json.dumps(body)],
+        cwd=_BACKEND_DIR,
+        env=dict(os.environ, CLASHOPS_APP_PROFILE=profile),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("profile, route, body", [
+    ("crud", "get_decks", None),
+    ("ai", "analyze_deck", {"deckToAnalyze": _DECK, "category": "offense"}),
+    ("all", "get_decks", None),
+    ("all", "analyze_deck", {"deckToAnalyze": _DECK, "category": "offense"}),
+])
+def test_buffered_apps_serve_buffered_routes_without_streaming(profile, route, body):
+    result = _run_profile(profile, route, body)
+
+    assert result["status"] == 200
+    assert not result["extension"]
+    assert not {"analyze_deck_stream", "optimize_deck_stream"} & set(result["functions"])
+
+
+def test_stream_app_registers_only_streaming_routes():
+    result = _run_profile("stream", "analyze_deck", None)
+
+    assert result["extension"]
+    assert result["functions"] == ["analyze_deck_stream", "optimize_deck_stream"]
+
+
+def test_single_app_combines_crud_and_ai():
+    assert get_profile_blueprints("all") == get_profile_blueprints("crud") + get_profile_blueprints("ai")
+    assert "PYTHON_ENABLE_INIT_INDEXING" not in get_profile_settings("all")
+    assert get_profile_settings("stream")["PYTHON_ENABLE_INIT_INDEXING"] == "1"
+    assert get_profile_settings("all")["PYTHON_ENABLE_WORKER_EXTENSIONS"] == "1"
@@ -0,0 +1,25 @@
+"""
+Retrieval embeds the query input, not the computed sections appended to the
+user input for the model.
+"""
+from shared import langchain_utils
+from shared.langchain_utils import build_chain
+
+_DECK = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+
+
+def test_retrieval_embeds_the_query_only(stack, monkeypatch):
+    embedded = []
+    embed_query = langchain_utils.embedding_model.embed_query
+    monkeypatch.setattr(
+        langchain_utils.embedding_model, "embed_query", lambda text: embedded.append(text) or embed_query(text)
+    )
+
+    build_chain().invoke({
+        "system_instructions": "Rate the deck.",
+        "user_input": f'{_DECK}\n\nComputed Scores:\n{{"Total": 7.5}}',
+        "query": _DECK,
+        "retrievers": [{"k": 2, "metadata": {"namespace": "Hog Rider"}}],
+    })
+
+    assert embedded == [_DECK]
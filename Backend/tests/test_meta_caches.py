@@ -0,0 +1,56 @@
+"""
+Meta matrix caches keep only successful loads: a failed load is retried after
+a short backoff instead of being cached for the full TTL.
+"""
+import pytest
+
+from shared import card_synergy, deck_similarity
+
+
+@pytest.fixture
+def fresh_matrix(monkeypatch):
+    monkeypatch.setattr(deck_similarity, "_matrix", None)
+    monkeypatch.setattr(deck_similarity, "_loaded_at", 0.0)
+    monkeypatch.setattr(deck_similarity, "_failed_at", 0.0)
+
+
+def _unavailable():
+    raise OSError("snapshot unavailable")
+
+
+def test_failed_matrix_build_is_retried_after_backoff(fresh_matrix, monkeypatch):
+    load_snapshot = deck_similarity.load_snapshot
+    monkeypatch.setattr(deck_similarity, "load_snapshot", _unavailable)
+    assert deck_similarity.get_deck_matrix() is None
+
+    # Within the backoff the failure is not retried
+    monkeypatch.setattr(deck_similarity, "load_snapshot", load_snapshot)
+    assert deck_similarity.get_deck_matrix() is None
+
+    monkeypatch.setattr(deck_similarity, "_failed_at", deck_similarity._failed_at - deck_similarity._MATRIX_RETRY_SECONDS - 1)
+    assert deck_similarity.get_deck_matrix() is not None
+
+
+def test_failed_refresh_keeps_the_previous_matrix(fresh_matrix, monkeypatch):
+    matrix = deck_similarity.get_deck_matrix()
+    assert matrix is not None
+
+    monkeypatch.setattr(deck_similarity, "load_snapshot", _unavailable)
+    monkeypatch.setattr(deck_similarity, "_loaded_at", deck_similarity._loaded_at - deck_similarity._MATRIX_TTL_SECONDS - 1)
+    assert deck_similarity.get_deck_matrix() is matrix
+
+
+def test_failed_synergy_download_is_retried_after_backoff(stack, monkeypatch):
+    monkeypatch.setattr(card_synergy, "_synergy", None)
+    monkeypatch.setattr(card_synergy, "_loaded_at", 0.0)
+    monkeypatch.setattr(card_synergy, "_failed_at", 0.0)
+    attempts = []
+    monkeypatch.setattr(card_synergy.card_synergy, "download_blob", lambda **kwargs: attempts.append(1) or _unavailable())
+
+    assert card_synergy.get_synergy() is None
+    assert card_synergy.get_synergy() is None
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(card_synergy, "_failed_at", card_synergy._failed_at - card_synergy._SYNERGY_RETRY_SECONDS - 1)
+    card_synergy.get_synergy()
+    assert len(attempts) == 2
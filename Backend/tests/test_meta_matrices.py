@@ -0,0 +1,84 @@
+"""
+Meta matrices computed from published deck rows: deck similarity by shared
+cards and card-pair synergy weighted by deck score.
+"""
+import math
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+
+from shared.card_synergy import compute_synergy
+from shared.deck_similarity import DeckMatrix
+from shared.deck_snapshot import SNAPSHOT_SCHEMA, _card_names, _record_batches
+
+_NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _row(deck_id: int, cards: dict[int, str], score: float) -> dict:
+    return {
+        "deck_id": deck_id,
+        "cards": "; ".join(cards.values()),
+        "card_ids": list(cards),
+        "score": score,
+        "runs": 1,
+        "last_run_count": 1,
+        "first_seen": _NOW,
+        "last_entry": _NOW,
+        "archetype": None,
+    }
+
+
+_CARDS = {i: f"Card {i}" for i in range(1, 13)}
+_ROWS = [
+    _row(1, {i: _CARDS[i] for i in range(1, 9)}, 5.0),     # cards 1-8
+    _row(2, {i: _CARDS[i] for i in range(2, 10)}, 3.0),    # shares 7
+    _row(3, {i: _CARDS[i] for i in range(5, 13)}, 9.0),    # shares 4
+    _row(4, {i: _CARDS[i] for i in range(3, 11)}, 1.0),    # shares 6
+]
+
+
+@pytest.fixture
+def matrix() -> DeckMatrix:
+    table = pa.Table.from_batches(list(_record_batches(_ROWS)), schema=SNAPSHOT_SCHEMA)
+    return DeckMatrix(table, _card_names(_ROWS))
+
+
+def test_similar_decks_by_shared_cards(matrix):
+    similar = matrix.similar([_CARDS[i] for i in range(1, 9)], limit=3)
+
+    assert [d["deck_id"] for d in similar] == [1, 2, 4]
+    assert [d["shared"] for d in similar] == [8, 7, 6]
+    assert similar[0]["similarity"] == 1.0
+
+
+def test_similar_ties_go_to_the_higher_score(matrix):
+    # Every deck holds cards 5-8, so all are equally similar
+    similar = matrix.similar([_CARDS[i] for i in (5, 6, 7, 8)], limit=4)
+
+    assert [d["deck_id"] for d in similar] == [3, 1, 2, 4]
+
+
+def test_similar_ignores_unknown_cards_and_disjoint_decks(matrix):
+    assert matrix.similar(["Not A Card"]) == []
+    assert [d["deck_id"] for d in matrix.similar([_CARDS[1]])] == [1]
+
+
+def test_synergy_is_weighted_by_deck_score():
+    synergy = compute_synergy(_ROWS)
+    total = sum(row["score"] for row in _ROWS)
+
+    # Card 1 is only in deck 1, Card 2 in decks 1 and 2
+    a, b = synergy.position("Card 1"), synergy.position("Card 2")
+    assert synergy.frequency[a] == pytest.approx(5.0 / total)
+    assert synergy.cooccurrence[a, b] == pytest.approx(5.0 / total)
+    expected = math.log((5.0 / total) / ((5.0 / total) * (8.0 / total)))
+    assert synergy.pmi[a, b] == pytest.approx(expected, rel=1e-5)
+
+
+def test_synergy_of_pairs_never_played_together_is_unknown():
+    synergy = compute_synergy(_ROWS)
+
+    a, b = synergy.position("Card 1"), synergy.position("Card 12")
+    assert math.isnan(synergy.pmi[a, b])
+    assert synergy.deck_pairs(["Card 1", "Card 12"])[0]["lift"] is None
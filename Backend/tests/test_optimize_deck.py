@@ -0,0 +1,36 @@
+"""
+Optimization result keys follow the prompt actually sent to the model.
+"""
+import pytest
+
+import optimize_deck
+from shared.prompts import optimize_candidates_prompt, optimize_prompt
+from shared.table_utils import PARTITION_KEY, report_key
+
+_DECK = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+
+
+@pytest.fixture
+def prepare(stack):
+    row_key = report_key(_DECK)
+    stack.tables["analysiscache"].clear()
+
+    def _prepare() -> dict:
+        stack.tables["reports"].seed([{
+            "PartitionKey": PARTITION_KEY, "RowKey": row_key, "Deck": _DECK,
+            "Offense": "no", "Defense": "no", "Synergy": "no", "Versatility": "no", "Optimize": "no",
+        }])
+        return optimize_deck.prepare_optimization(_DECK, row_key, optimize_deck.build_user_prompt({"deckToAnalyze": _DECK}))
+
+    return _prepare
+
+
+def test_result_key_follows_the_prompt(prepare, monkeypatch):
+    with_candidates = prepare()
+    assert with_candidates["candidates"]
+    assert with_candidates["chain_inputs"]["system_instructions"] is optimize_candidates_prompt
+
+    monkeypatch.setattr(optimize_deck, "find_swaps", lambda cards: [])
+    without_candidates = prepare()
+    assert without_candidates["chain_inputs"]["system_instructions"] is optimize_prompt
+    assert without_candidates["cache_key"] != with_candidates["cache_key"]
@@ -0,0 +1,53 @@
+"""
+Local rubric scoring: a known deck gets the rubric's scores, and card roles
+follow the rubric text.
+"""
+from shared.scoring import score_deck
+
+_HOG = ["Hog Rider", "Ice Spirit", "Skeletons", "Cannon", "Musketeer", "Fireball", "The Log", "Ice Golem"]
+_XBOW = ["X-Bow", "Tesla", "Archers", "Knight", "Skeletons", "Electro Spirit", "Rocket", "The Log"]
+
+
+def _role(category: str, cards: list[str], role: str) -> dict:
+    scores = score_deck(category, cards)
+    return next(iter(scores.values()))["Roles"][role]
+
+
+def test_known_deck_offense():
+    offense = score_deck("offense", _HOG)["Offense"]
+    roles = {name: (role["Score"], role["Cards"]) for name, role in offense["Roles"].items()}
+
+    # +4.0 primary win condition, no secondary
+    assert roles["Win Conditions"] == (4.0, ["Hog Rider"])
+    # +4.0 big spell, +1.0 it supports the win condition
+    assert roles["Big Damage Spells"] == (5.0, ["Fireball"])
+    # +4.0 small spell, +1.0 utility (knockback)
+    assert roles["Small Damage Spells"] == (5.0, ["The Log"])
+    # +2.0 guaranteed chip source
+    assert roles["Chip Damage"] == (2.0, ["Ice Spirit"])
+    assert offense["Score"] == 4.0
+
+
+def test_card_order_does_not_change_the_scores():
+    def _scores(cards: list[str]) -> dict:
+        defense = score_deck("defense", cards)["Defense"]
+        return {"Total": defense["Score"], **{name: role["Score"] for name, role in defense["Roles"].items()}}
+
+    assert _scores(_HOG) == _scores(list(reversed(_HOG)))
+
+
+def test_unknown_card_is_not_scored_locally():
+    assert score_deck("offense", _HOG[:-1] + ["Not A Card"]) is None
+
+
+def test_dps_buildings_are_tank_killers():
+    assert _role("defense", _XBOW, "Tank Killer")["Cards"] == ["Tesla"]
+    assert _role("defense", _XBOW, "Tank Killer")["Score"] == 5.0
+
+
+def test_ice_golem_resets():
+    assert "Ice Golem" in _role("defense", _HOG, "Reset Mechanics")["Cards"]
+
+
+def test_spirits_are_chip_sources():
+    assert _role("offense", _HOG, "Chip Damage")["Cards"] == ["Ice Spirit"]
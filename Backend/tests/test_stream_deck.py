@@ -0,0 +1,62 @@
+"""
+Streaming routes release the report field when preparing the job fails, so
+later requests do not wait on a "loading" marker nobody will clear.
+"""
+import asyncio
+
+import pytest
+
+import analyze_deck
+import optimize_deck
+import stream_deck
+from benchmarks.harness import resolve_handler
+from shared.table_utils import PARTITION_KEY, report_key
+
+_DECK = "[Hog Rider, Ice Spirit, Skeletons, Cannon, Musketeer, Fireball, The Log, Ice Golem]"
+
+
+class _Request:
+    """Minimal FastAPI request: only the JSON body is read."""
+
+    def __init__(self, body: dict) -> None:
+        self._body = body
+
+    async def json(self) -> dict:
+        return self._body
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def report(stack):
+    row_key = report_key(_DECK)
+    stack.tables["reports"].seed([{
+        "PartitionKey": PARTITION_KEY, "RowKey": row_key, "Deck": _DECK,
+        "Offense": "no", "Defense": "no", "Synergy": "no", "Versatility": "no", "Optimize": "no",
+    }])
+    stack.tables["analysiscache"].clear()
+    return lambda field: stack.tables["reports"].get_entity(PARTITION_KEY, row_key)[field]
+
+
+def _call(route, body: dict):
+    return asyncio.run(resolve_handler(route)(_Request(body)))
+
+
+def test_optimize_stream_resets_field_when_preparation_fails(report, monkeypatch):
+    monkeypatch.setattr(optimize_deck, "classify_deck", _fail)
+
+    response = _call(stream_deck.optimize_deck_stream, {"deckToAnalyze": _DECK, "offenseScore": 7})
+
+    assert response.status_code == 500
+    assert report("Optimize") == "no"
+
+
+def test_analyze_stream_resets_field_when_preparation_fails(report, monkeypatch):
+    monkeypatch.setattr(analyze_deck, "get_result", _fail)
+
+    response = _call(stream_deck.analyze_deck_stream, {"deckToAnalyze": _DECK, "category": "offense"})
+
+    assert response.status_code == 500
+    assert report("Offense") == "no"
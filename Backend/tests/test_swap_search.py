@@ -0,0 +1,48 @@
+"""
+Swap search: candidates keep the win condition and raise the rubric scores,
+and the optimization result is grounded to one of the candidates.
+"""
+import json
+
+from optimize_deck import _ground_swaps
+from shared.scoring import WIN, card_roles
+from shared.swap_search import describe_candidates, find_swaps
+
+_DECK = ["Hog Rider", "Ice Spirit", "Skeletons", "Cannon", "Musketeer", "Fireball", "The Log", "Ice Golem"]
+
+
+def _result(swaps: list[tuple[str, str]]) -> str:
+    return json.dumps({"Optimize": {"Recommended Swaps": {
+        "Swaps": [{"Replaced Card": old, "New Card": new} for old, new in swaps],
+        "Improvement Summary": "Model summary",
+    }}})
+
+
+def test_candidates_keep_win_conditions_and_improve_scores(stack):
+    candidates = find_swaps(_DECK)
+
+    assert candidates
+    for candidate in candidates:
+        assert candidate.rubric_gain > 0
+        for old, new in candidate.swaps:
+            assert old in _DECK and new not in _DECK
+            assert WIN not in card_roles(old)
+    assert [c.gain for c in candidates] == sorted((c.gain for c in candidates), reverse=True)
+
+
+def test_swap_among_the_candidates_is_kept(stack):
+    candidates = describe_candidates(find_swaps(_DECK))
+    chosen = [(s["Replaced Card"], s["New Card"]) for s in candidates[-1]["Swaps"]]
+
+    result = _result(chosen)
+
+    assert _ground_swaps(result, candidates) == result
+
+
+def test_swap_outside_the_candidates_is_replaced_by_the_best(stack):
+    candidates = describe_candidates(find_swaps(_DECK))
+
+    grounded = json.loads(_ground_swaps(_result([("Hog Rider", "Golem")]), candidates))["Optimize"]["Recommended Swaps"]
+
+    assert grounded["Swaps"] == candidates[0]["Swaps"]
+    assert grounded["Improvement Summary"] != "Model summary"
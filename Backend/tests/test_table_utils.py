@@ -0,0 +1,43 @@
+"""
+Report field claims: of several requests racing for one field, exactly one
+claims it, and writes to other fields of the report do not block a claim.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.table_utils import PARTITION_KEY, REPORT_FIELDS, claim_report_field, reports_table
+
+_ROW_KEY = "claim-test"
+
+
+def _seed(stack) -> None:
+    entity = {"PartitionKey": PARTITION_KEY, "RowKey": _ROW_KEY}
+    entity.update({field: "no" for field in REPORT_FIELDS})
+    stack.tables["reports"].seed([entity])
+
+
+def test_only_one_concurrent_request_claims_a_field(stack):
+    _seed(stack)
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda _: claim_report_field(_ROW_KEY, "Offense"), range(20)))
+
+    assert sum(claimed for claimed, _ in results) == 1
+    assert all(value == "loading" for claimed, value in results if not claimed)
+
+
+def test_every_field_is_claimed_despite_concurrent_writes(stack):
+    _seed(stack)
+
+    with ThreadPoolExecutor(max_workers=len(REPORT_FIELDS)) as pool:
+        results = list(pool.map(lambda field: claim_report_field(_ROW_KEY, field), REPORT_FIELDS))
+
+    assert all(claimed for claimed, _ in results)
+    entity = reports_table.get_entity(partition_key=PARTITION_KEY, row_key=_ROW_KEY)
+    assert all(entity[field] == "loading" for field in REPORT_FIELDS)
+
+
+def test_claim_returns_an_existing_result(stack):
+    _seed(stack)
+    reports_table.update_entity(mode="merge", entity={"PartitionKey": PARTITION_KEY, "RowKey": _ROW_KEY, "Offense": "{}"})
+
+    assert claim_report_field(_ROW_KEY, "Offense") == (False, "{}")